@@ -1,5 +1,80 @@
-from django.contrib import admin
+import io
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from .catalog import invalidate_catalog
+from .enrollment_import import import_enrollments
+from .forms import EnrollmentImportForm
 from .models import *
+from .registration import promote_waitlist
+from .timetable import format_report, solve_semester
+
+
+def estimate_row_count(model):
+    """Кількість рядків зі статистики БД без повного сканування таблиці (None, якщо оцінки немає)"""
+    connection = connections[router.db_for_read(model)]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # Найбільший rowid береться з індексу первинного ключа; видалені рядки дають завищення
+            cursor.execute(f'SELECT MAX(rowid) FROM {table}')
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для великих таблиць без фільтрів - оцінка замість COUNT(*) по всій таблиці"""
+
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimate_row_count(self.object_list.model)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список великої таблиці: оцінка кількості рядків і без другого COUNT(*) для «показати всі»"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class AllSemestersMixin:
+    """Адмінка бачить і закриті семестри: all_objects замість менеджера, обмеженого активними"""
+
+    def get_queryset(self, request):
+        queryset = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Архівні дані лише для перегляду"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Faculty)
 class FacultyAdmin(admin.ModelAdmin):
@@ -10,46 +85,233 @@ class FacultyAdmin(admin.ModelAdmin):
 class DepartmentAdmin(admin.ModelAdmin):
     list_display = ('name', 'faculty')
     list_filter = ('faculty',)
+    list_select_related = ('faculty',)
     search_fields = ('name', 'faculty__name')
+    autocomplete_fields = ('faculty',)
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ('code', 'name', 'credits', 'department')
     list_filter = ('department', 'credits')
-    search_fields = ('code', 'name')
+    list_select_related = ('department',)
+    # code унікальний, тож пошук за префіксом іде по індексу
+    search_fields = ('^code', 'name')
+    autocomplete_fields = ('department',)
 
 @admin.register(Student)
-class StudentAdmin(admin.ModelAdmin):
+class StudentAdmin(LargeTableAdmin):
     list_display = ('student_id', 'user', 'faculty', 'enrollment_date')
     list_filter = ('faculty', 'enrollment_date')
-    search_fields = ('student_id', 'user__first_name', 'user__last_name')
+    list_select_related = ('user', 'faculty')
+    search_fields = ('^student_id', '^user__last_name', '^user__first_name')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('faculty',)
 
 @admin.register(Professor)
 class ProfessorAdmin(admin.ModelAdmin):
     list_display = ('user', 'department', 'office')
     list_filter = ('department',)
-    search_fields = ('user__first_name', 'user__last_name')
+    list_select_related = ('user', 'department')
+    search_fields = ('^user__last_name', '^user__first_name')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('department',)
+
+@admin.register(Semester)
+class SemesterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_date', 'end_date', 'is_active', 'archived_at')
+    list_filter = ('is_active',)
+    search_fields = ('^name',)
+    readonly_fields = ('archived_at',)
+    actions = ('close_semesters',)
+
+    @admin.action(description='Закрити семестр (прибрати з активних і дозволити архівацію)')
+    def close_semesters(self, request, queryset):
+        closed = queryset.filter(is_active=True).update(is_active=False)
+        # update() не надсилає post_save: заняття закритих семестрів зникають з каталогу
+        invalidate_catalog()
+        self.message_user(request, f'Закрито семестрів: {closed}. Архівація: manage.py archive_semesters',
+                          messages.SUCCESS)
 
 @admin.register(Class)
-class ClassAdmin(admin.ModelAdmin):
-    list_display = ('course', 'professor', 'semester', 'schedule', 'classroom')
+class ClassAdmin(AllSemestersMixin, admin.ModelAdmin):
+    list_display = ('course', 'professor', 'semester', 'schedule', 'classroom', 'capacity', 'registration_opens_at')
     list_filter = ('semester', 'course__department')
-    search_fields = ('course__code', 'course__name', 'professor__user__first_name')
+    list_select_related = ('course', 'professor__user', 'semester')
+    search_fields = ('^course__code', 'course__name', '^professor__user__last_name')
+    autocomplete_fields = ('course', 'professor')
+    actions = ('solve_timetable',)
+
+    @admin.action(description='Скласти розклад вибраних занять (решта лишається на місці)')
+    def solve_timetable(self, request, queryset):
+        by_semester = {}
+        for class_id, semester in queryset.values_list('id', 'semester'):
+            by_semester.setdefault(semester, []).append(class_id)
+        # Пошук іде просто в HTTP-запиті, тож TIMETABLE_ADMIN_TIME_LIMIT - на всю дію, а не на кожен семестр
+        time_limit = settings.TIMETABLE_ADMIN_TIME_LIMIT / max(len(by_semester), 1)
+        for semester, class_ids in by_semester.items():
+            _, after = solve_semester(semester, class_ids, time_limit=time_limit)
+            level = messages.SUCCESS if not after['students'] and not after['professors'] else messages.WARNING
+            self.message_user(request, f'{semester}: занять {len(class_ids)}; {format_report(after)}', level)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'capacity' in form.changed_data:
+            promoted = promote_waitlist(obj.pk)
+            if promoted:
+                self.message_user(request, f'Записано з черги: {len(promoted)}', messages.SUCCESS)
 
 @admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
+class EnrollmentAdmin(AllSemestersMixin, LargeTableAdmin):
     list_display = ('student', 'class_enrolled', 'enrollment_date', 'grade')
     list_filter = ('class_enrolled__semester', 'grade')
-    search_fields = ('student__student_id', 'student__user__first_name', 'class_enrolled__course__code')
+    list_select_related = ('student__user', 'class_enrolled__course')
+    search_fields = ('^student__student_id', '^student__user__last_name', '^class_enrolled__course__code')
+    autocomplete_fields = ('student', 'class_enrolled')
+    change_list_template = 'admin/lms/enrollment/change_list.html'
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        promote_waitlist(obj.class_enrolled_id)
+
+    def delete_queryset(self, request, queryset):
+        class_ids = set(queryset.values_list('class_enrolled_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for class_id in class_ids:
+            promote_waitlist(class_id)
+
+    def get_urls(self):
+        return [
+            path('import/', self.admin_site.admin_view(self.import_csv), name='lms_enrollment_import'),
+        ] + super().get_urls()
+
+    def import_csv(self, request):
+        """Масовий запис з CSV, як команда import_enrollments"""
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        result = None
+        form = EnrollmentImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            csv_file = io.TextIOWrapper(form.cleaned_data['csv_file'].file, encoding='utf-8-sig', newline='')
+            try:
+                result = import_enrollments(csv_file, dry_run=form.cleaned_data['dry_run'])
+            except (ValueError, UnicodeDecodeError) as error:
+                form.add_error('csv_file', str(error))
+            else:
+                verb = 'Буде створено' if form.cleaned_data['dry_run'] else 'Створено'
+                self.message_user(request, f'{verb} записів: {result.created}', messages.SUCCESS)
+                if result.skipped:
+                    self.message_user(request, f'Пропущено рядків: {len(result.skipped)}', messages.WARNING)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Імпорт записів з CSV',
+            'form': form,
+            'result': result,
+            'skipped': result.skipped[:200] if result else [],
+        }
+        return TemplateResponse(request, 'admin/lms/enrollment/import.html', context)
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(LargeTableAdmin):
+    list_display = ('class_obj', 'student', 'created_at')
+    list_select_related = ('class_obj__course', 'student__user')
+    search_fields = ('^student__student_id', '^student__user__last_name', '^class_obj__course__code')
+    autocomplete_fields = ('student', 'class_obj')
 
 @admin.register(CourseMaterial)
-class CourseMaterialAdmin(admin.ModelAdmin):
+class CourseMaterialAdmin(AllSemestersMixin, admin.ModelAdmin):
     list_display = ('title', 'class_obj', 'uploaded_at')
-    list_filter = ('class_obj', 'uploaded_at')
+    # Фільтр за семестром замість списку всіх занять
+    list_filter = ('class_obj__semester', 'uploaded_at')
+    list_select_related = ('class_obj__course',)
     search_fields = ('title', 'description')
+    autocomplete_fields = ('class_obj',)
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'capacity')
+    search_fields = ('name',)
 
 @admin.register(Schedule)
 class ScheduleAdmin(admin.ModelAdmin):
     list_display = ('class_obj', 'day_of_week', 'start_time', 'end_time', 'classroom')
-    list_filter = ('day_of_week', 'class_obj')
-    search_fields = ('class_obj__course__name', 'classroom')
\ No newline at end of file
+    list_filter = ('day_of_week', 'class_obj__semester')
+    list_select_related = ('class_obj__course',)
+    search_fields = ('^class_obj__course__code', 'class_obj__course__name', 'classroom')
+    autocomplete_fields = ('class_obj',)
+
+@admin.register(Assignment)
+class AssignmentAdmin(AllSemestersMixin, LargeTableAdmin):
+    list_display = ('title', 'class_obj', 'assignment_type', 'due_date', 'max_points')
+    list_filter = ('assignment_type', 'class_obj__semester')
+    list_select_related = ('class_obj__course',)
+    search_fields = ('title', '^class_obj__course__code')
+    autocomplete_fields = ('class_obj',)
+
+@admin.register(StudentSubmission)
+class StudentSubmissionAdmin(AllSemestersMixin, LargeTableAdmin):
+    list_display = ('student', 'assignment', 'submission_date', 'grade', 'raw_grade', 'graded_at')
+    list_filter = (('graded_at', admin.EmptyFieldListFilter), 'assignment__assignment_type')
+    list_select_related = ('student__user', 'assignment__class_obj__course')
+    search_fields = ('^student__student_id', '^student__user__last_name', 'assignment__title')
+    autocomplete_fields = ('student', 'assignment')
+
+@admin.register(GradeCurve)
+class GradeCurveAdmin(admin.ModelAdmin):
+    list_display = ('class_obj', 'cutoff_a', 'cutoff_b', 'cutoff_c', 'cutoff_d', 'updated_at')
+    list_select_related = ('class_obj__course',)
+    autocomplete_fields = ('class_obj',)
+
+@admin.register(AutoGrader)
+class AutoGraderAdmin(admin.ModelAdmin):
+    list_display = ('assignment', 'timeout', 'memory_limit', 'is_enabled')
+    list_filter = ('is_enabled',)
+    list_select_related = ('assignment__class_obj__course',)
+    search_fields = ('assignment__title',)
+    autocomplete_fields = ('assignment',)
+
+@admin.register(GradingJob)
+class GradingJobAdmin(LargeTableAdmin):
+    list_display = ('submission', 'status', 'passed', 'total', 'duration', 'queued_at', 'finished_at')
+    list_filter = ('status',)
+    list_select_related = ('submission__student__user', 'submission__assignment')
+    search_fields = ('^submission__student__student_id',)
+    raw_id_fields = ('submission',)
+    actions = ('requeue',)
+
+    @admin.action(description='Повторити перевірку')
+    def requeue(self, request, queryset):
+        requeued = queryset.exclude(status=GradingJob.RUNNING).update(
+            status=GradingJob.QUEUED, started_at=None, finished_at=None)
+        self.message_user(request, f'Повернуто в чергу: {requeued}', messages.SUCCESS)
+
+@admin.register(Notification)
+class NotificationAdmin(LargeTableAdmin):
+    list_display = ('user', 'event', 'title', 'created_at', 'sent_at')
+    list_filter = ('event', ('sent_at', admin.EmptyFieldListFilter))
+    list_select_related = ('user',)
+    search_fields = ('^user__username', 'title')
+    raw_id_fields = ('user',)
+
+@admin.register(TelegramChat)
+class TelegramChatAdmin(admin.ModelAdmin):
+    list_display = ('user', 'chat_id')
+    list_select_related = ('user',)
+    search_fields = ('^user__username', 'chat_id')
+    raw_id_fields = ('user',)
+
+@admin.register(ArchivedEnrollment)
+class ArchivedEnrollmentAdmin(ReadOnlyAdmin):
+    list_display = ('student', 'course', 'semester', 'professor_name', 'grade', 'points', 'max_points')
+    list_filter = ('semester', 'grade')
+    list_select_related = ('student__user', 'course', 'semester')
+    search_fields = ('^student__student_id', '^student__user__last_name', '^course__code')
+
+@admin.register(ArchivedSubmission)
+class ArchivedSubmissionAdmin(ReadOnlyAdmin):
+    list_display = ('assignment_title', 'enrollment', 'due_date', 'grade', 'max_points')
+    list_filter = ('enrollment__semester', 'assignment_type')
+    list_select_related = ('enrollment',)
+    search_fields = ('assignment_title', '^enrollment__student__student_id')
@@ -0,0 +1,200 @@
+from ..models import (
+    Assignment, Class, Course, CourseMaterial, Enrollment, Schedule, StudentSubmission
+)
+
+
+def _file_url(value):
+    return value.url if value else None
+
+
+class Field:
+    """Поле серіалізатора: шлях до атрибута та зв'язки, які треба підтягнути заздалегідь"""
+
+    def __init__(self, source=None, select=None, transform=None):
+        self.source = source
+        self.select = select
+        self.transform = transform
+
+    def get(self, obj, name):
+        value = obj
+        for attr in (self.source or name).split('.'):
+            value = getattr(value, attr)
+            if value is None:
+                return None
+        if callable(value):
+            value = value()
+        if self.transform:
+            value = self.transform(value)
+        return value
+
+
+class Serializer:
+    """Базовий серіалізатор з підтримкою розріджених наборів полів (?fields=...)"""
+
+    model = None
+    fields = {}
+    # Поле, за яким ресурс фільтрується параметром ?class=<id>
+    class_field = None
+
+    def __init__(self, field_names=None):
+        if field_names:
+            unknown = [name for name in field_names if name not in self.fields]
+            if unknown:
+                raise ValueError(f"Невідомі поля: {', '.join(unknown)}")
+            self.selected = {name: self.fields[name] for name in field_names}
+        else:
+            self.selected = dict(self.fields)
+
+    def get_queryset(self, user, classes):
+        return self.model.objects.all()
+
+    def optimise(self, queryset):
+        """Підтягує лише ті зв'язки, які потрібні для вибраних полів"""
+        related = {field.select for field in self.selected.values() if field.select}
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset
+
+    def to_dict(self, obj):
+        return {name: field.get(obj, name) for name, field in self.selected.items()}
+
+
+class CourseSerializer(Serializer):
+    model = Course
+    fields = {
+        'id': Field(),
+        'code': Field(),
+        'name': Field(),
+        'description': Field(),
+        'credits': Field(),
+        'department': Field('department.name', select='department'),
+        'faculty': Field('department.faculty.name', select='department__faculty'),
+    }
+
+
+class ClassSerializer(Serializer):
+    model = Class
+    fields = {
+        'id': Field(),
+        'course_id': Field(),
+        'course_code': Field('course.code', select='course'),
+        'course_name': Field('course.name', select='course'),
+        'professor': Field('professor.full_name', select='professor__user'),
+        'semester': Field('semester_name'),
+        'schedule': Field(),
+        'classroom': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        return classes
+
+
+class AssignmentSerializer(Serializer):
+    model = Assignment
+    class_field = 'class_obj_id'
+    fields = {
+        'id': Field(),
+        'class_id': Field('class_obj_id'),
+        'course_code': Field('class_obj.course.code', select='class_obj__course'),
+        'title': Field(),
+        'description': Field(),
+        'assignment_type': Field(),
+        'due_date': Field(),
+        'max_points': Field(),
+        'file': Field('assignment_file', transform=_file_url),
+        'created_at': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        return Assignment.objects.filter(class_obj__in=classes)
+
+
+class SubmissionSerializer(Serializer):
+    model = StudentSubmission
+    class_field = 'assignment__class_obj_id'
+    fields = {
+        'id': Field(),
+        'assignment_id': Field(),
+        'assignment_title': Field('assignment.title', select='assignment'),
+        'student_id': Field('student.student_id', select='student'),
+        'submission_date': Field(),
+        'comment': Field(),
+        'file': Field(transform=_file_url),
+        'grade': Field(),
+        'percentage': Field(),
+        'grade_class': Field(),
+        'is_late': Field(),
+        'teacher_feedback': Field(),
+        'graded_at': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        submissions = StudentSubmission.objects.filter(assignment__class_obj__in=classes)
+        if hasattr(user, 'student'):
+            submissions = submissions.filter(student=user.student)
+        return submissions.with_grade_stats()
+
+
+class GradeSerializer(Serializer):
+    model = Enrollment
+    class_field = 'class_enrolled_id'
+    fields = {
+        'id': Field(),
+        'class_id': Field('class_enrolled_id'),
+        'course_code': Field('class_enrolled.course.code', select='class_enrolled__course'),
+        'student_id': Field('student.student_id', select='student'),
+        'student_name': Field('student.full_name', select='student__user'),
+        'grade': Field(),
+        'enrollment_date': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        enrollments = Enrollment.objects.filter(class_enrolled__in=classes)
+        if hasattr(user, 'student'):
+            enrollments = enrollments.filter(student=user.student)
+        return enrollments
+
+
+class MaterialSerializer(Serializer):
+    model = CourseMaterial
+    class_field = 'class_obj_id'
+    fields = {
+        'id': Field(),
+        'class_id': Field('class_obj_id'),
+        'title': Field(),
+        'description': Field(),
+        'file': Field(transform=_file_url),
+        'uploaded_at': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        return CourseMaterial.objects.filter(class_obj__in=classes)
+
+
+class TimetableSerializer(Serializer):
+    model = Schedule
+    class_field = 'class_obj_id'
+    fields = {
+        'id': Field(),
+        'class_id': Field('class_obj_id'),
+        'course_code': Field('class_obj.course.code', select='class_obj__course'),
+        'day_of_week': Field(),
+        'day_name': Field('get_day_of_week_display'),
+        'start_time': Field(),
+        'end_time': Field(),
+        'classroom': Field(),
+    }
+
+    def get_queryset(self, user, classes):
+        return Schedule.objects.filter(class_obj__in=classes)
+
+
+RESOURCES = {
+    'courses': CourseSerializer,
+    'classes': ClassSerializer,
+    'assignments': AssignmentSerializer,
+    'submissions': SubmissionSerializer,
+    'grades': GradeSerializer,
+    'materials': MaterialSerializer,
+    'timetable': TimetableSerializer,
+}
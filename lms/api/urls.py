@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('', views.api_index, name='index'),
+    path('<slug:resource>/', views.resource_list, name='resource'),
+]
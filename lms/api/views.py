@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+import re
+from functools import wraps
+
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_vary_headers, set_response_etag
+from django.utils.text import compress_string
+from django.views.decorators.http import require_GET
+
+from ..db_routing import read_replica
+from ..models import Class
+from .serializers import RESOURCES
+
+try:
+    import brotli
+except ImportError:  # Brotli вказаний у requirements.txt, але без нього працює gzip
+    brotli = None
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Відповіді, менші за цей розмір, не стискаються
+MIN_COMPRESS_LENGTH = 200
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+re_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+def api_error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def visible_classes(user):
+    """Заняття, доступні користувачу: записані для студента, власні для викладача"""
+    if hasattr(user, 'student'):
+        return Class.objects.filter(enrollment__student=user.student)
+    if hasattr(user, 'professor'):
+        return Class.objects.filter(professor=user.professor)
+    if user.is_staff:
+        return Class.objects.all()
+    return Class.objects.none()
+
+
+def encode_cursor(pk):
+    return base64.urlsafe_b64encode(json.dumps({'after': pk}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(padded))['after'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Некоректний курсор")
+
+
+def compress_response(response, request):
+    """Стискає відповідь Brotli або gzip залежно від Accept-Encoding клієнта"""
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.status_code != 200 or len(response.content) < MIN_COMPRESS_LENGTH:
+        return response
+
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and re_accepts_brotli.search(accept_encoding):
+        compressed, encoding = brotli.compress(response.content), 'br'
+    elif re_accepts_gzip.search(accept_encoding):
+        compressed, encoding = compress_string(response.content), 'gzip'
+    else:
+        return response
+
+    if len(compressed) >= len(response.content):
+        return response
+
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = encoding
+    # Стиснене тіло відрізняється побайтово, тому ETag стає слабким
+    if response.has_header('ETag') and not response['ETag'].startswith('W/'):
+        response['ETag'] = 'W/' + response['ETag']
+    return response
+
+
+def api_view(view_func):
+    """GET-only JSON-представлення: сесійна автентифікація, ETag/304 та стиснення"""
+    @require_GET
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return api_error("Потрібна автентифікація", 401)
+
+        # API лише читає дані, тож запити можна віддати репліці
+        with read_replica():
+            response = view_func(request, *args, **kwargs)
+        if response.status_code == 200:
+            set_response_etag(response)
+            response['Cache-Control'] = 'private, no-cache'
+            response = get_conditional_response(request, etag=response['ETag'], response=response)
+        patch_vary_headers(response, ('Cookie',))
+        return compress_response(response, request)
+    return wrapper
+
+
+@api_view
+def api_index(request):
+    """Перелік ресурсів API"""
+    return JsonResponse({
+        'version': 'v1',
+        'resources': {name: request.build_absolute_uri(reverse('api_v1:resource', args=[name]))
+                      for name in RESOURCES},
+    })
+
+
+@api_view
+def resource_list(request, resource):
+    """Список об'єктів ресурсу з курсорною пагінацією та розрідженими полями"""
+    serializer_class = RESOURCES.get(resource)
+    if serializer_class is None:
+        return api_error("Ресурс не знайдено", 404)
+
+    fields = [name for name in request.GET.get('fields', '').split(',') if name]
+    try:
+        serializer = serializer_class(fields)
+        limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        after = decode_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        class_id = int(request.GET['class']) if request.GET.get('class') else None
+    except ValueError as e:
+        return api_error(str(e), 400)
+    if limit < 1:
+        return api_error("limit має бути додатним", 400)
+
+    queryset = serializer.get_queryset(request.user, visible_classes(request.user))
+    if class_id is not None and serializer.class_field:
+        queryset = queryset.filter(**{serializer.class_field: class_id})
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+
+    # Беремо на один рядок більше, щоб дізнатися, чи є наступна сторінка
+    rows = list(serializer.optimise(queryset).order_by('pk')[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_url = None
+    if has_next:
+        params = request.GET.copy()
+        params['cursor'] = encode_cursor(rows[-1].pk)
+        next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+    return JsonResponse({
+        'results': [serializer.to_dict(obj) for obj in rows],
+        'next': next_url,
+    })
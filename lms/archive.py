@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .grade_stats import letter_grade
+from .models import (
+    ArchivedEnrollment, ArchivedSubmission, Assignment, Class, Enrollment, GradeCurve, StudentSubmission
+)
+
+
+def archive_class(class_obj, batch_size=1000):
+    """
+    Переносить записи й роботи заняття в архівні таблиці та видаляє заняття
+    разом з усім, що на нього посилається. Усе в одній транзакції: або заняття
+    вже в архіві, або ще в гарячих таблицях. Повертає (записів, робіт).
+    """
+    with transaction.atomic():
+        max_points = Assignment.all_objects.filter(class_obj=class_obj).aggregate(
+            total=Sum('max_points'))['total'] or 0
+        points = dict(
+            StudentSubmission.all_objects.filter(assignment__class_obj=class_obj, grade__isnull=False)
+            .values('student').annotate(points=Sum('grade')).values_list('student', 'points')
+        )
+        professor_name = class_obj.professor.full_name
+        # Шкала заняття видаляється разом із ним, тож літеру за нею фіксуємо в архіві
+        curve = GradeCurve.objects.filter(class_obj=class_obj).first()
+
+        def archived_grade(enrollment):
+            student_points = points.get(enrollment.student_id)
+            if enrollment.grade or curve is None or student_points is None or not max_points:
+                return enrollment.grade
+            return letter_grade(student_points / max_points * 100, curve.cutoffs())
+
+        archived = ArchivedEnrollment.objects.bulk_create([
+            ArchivedEnrollment(
+                student_id=enrollment.student_id,
+                semester_id=class_obj.semester.pk,
+                course_id=class_obj.course_id,
+                professor_name=professor_name,
+                grade=archived_grade(enrollment),
+                points=points.get(enrollment.student_id),
+                max_points=max_points,
+                enrollment_date=enrollment.enrollment_date,
+            )
+            for enrollment in Enrollment.all_objects.filter(class_enrolled=class_obj).iterator(batch_size)
+        ], batch_size=batch_size)
+        by_student = {enrollment.student_id: enrollment.pk for enrollment in archived}
+
+        # Роботи студентів, яких уже виписали з заняття, до залікової книжки не потрапляють
+        submissions = (
+            StudentSubmission.all_objects.filter(assignment__class_obj=class_obj, student_id__in=by_student)
+            .select_related('assignment').iterator(batch_size)
+        )
+        archived_submissions = ArchivedSubmission.objects.bulk_create([
+            ArchivedSubmission(
+                enrollment_id=by_student[submission.student_id],
+                assignment_title=submission.assignment.title,
+                assignment_type=submission.assignment.assignment_type,
+                due_date=submission.assignment.due_date,
+                max_points=submission.assignment.max_points,
+                submission_date=submission.submission_date,
+                grade=submission.grade,
+                graded_at=submission.graded_at,
+            )
+            for submission in submissions
+        ], batch_size=batch_size)
+
+        # Каскад прибирає записи, завдання, роботи, матеріали й розклад; сигнали скидають кеші стрічок
+        class_obj.delete()
+    return len(archived), len(archived_submissions)
+
+
+def closed_semester_classes(semester):
+    return Class.all_objects.filter(semester=semester).select_related('semester', 'professor__user')
+
+
+def finish_semester(semester):
+    """Позначає семестр архівованим, коли в гарячих таблицях від нього нічого не лишилося"""
+    if not Class.all_objects.filter(semester=semester).exists():
+        semester.archived_at = timezone.now()
+        semester.save(update_fields=['archived_at'])
+        return True
+    return False
@@ -0,0 +1,22 @@
+from functools import cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.views.static import serve
+
+# Хешовані імена ніколи не змінюють вмісту - кешуються браузером на рік без перевірок
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+
+
+@cache
+def hashed_names():
+    """Імена файлів з маніфесту ManifestStaticFilesStorage (порожньо для інших сховищ)"""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def serve_static(request, path):
+    """Статика з STATIC_ROOT з довгостроковим кешуванням хешованих файлів"""
+    response = serve(request, path, document_root=settings.STATIC_ROOT)
+    response['Cache-Control'] = IMMUTABLE if path in hashed_names() else REVALIDATE
+    return response
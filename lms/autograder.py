@@ -0,0 +1,262 @@
+import json
+import logging
+import os
+import shlex
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from functools import cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .feed import invalidate_assignment_feed
+from .models import GradingJob, StudentSubmission
+from .signals import announce_grade
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_RUNNER = Path(__file__).with_name('sandbox_runner.py')
+OUTPUT_LIMIT_MB = 4  # RLIMIT_FSIZE у пісочниці: і файли роботи, і її вивід
+MAX_UNPACKED_SIZE = 20 * 1024 * 1024
+# Завдання в стані «виконується» довше за це вважаються покинутими впалим воркером
+STALE_AFTER = timedelta(minutes=15)
+
+
+# Непривілейований uid усередині пісочниці (nobody)
+SANDBOX_UID = 65534
+SYSTEM_DIRS = ('/usr', '/bin', '/sbin', '/lib', '/lib64', '/etc/alternatives', '/etc/ld.so.cache')
+
+
+@cache
+def bwrap_available():
+    bwrap = shutil.which('bwrap')
+    # Простори імен користувачів можуть бути вимкнені ядром чи контейнером
+    if bwrap and subprocess.run([bwrap, '--unshare-all', '--ro-bind', '/', '/', 'true'],
+                                capture_output=True).returncode == 0:
+        return bwrap
+    return None
+
+
+def sandbox_prefix():
+    """
+    Обгортка команди пісочниці: LMS_AUTOGRADER_SANDBOX або bwrap - окремі простори імен (зокрема мережі),
+    uid nobody, лише системні каталоги й Python для читання. Без справжньої ізоляції автоперевірка
+    не запускається: ImproperlyConfigured.
+    """
+    if settings.AUTOGRADER_SANDBOX:
+        return shlex.split(settings.AUTOGRADER_SANDBOX)
+    bwrap = bwrap_available()
+    if not bwrap:
+        raise ImproperlyConfigured(
+            'Автоперевірці потрібна пісочниця: встановіть bubblewrap (bwrap) або задайте LMS_AUTOGRADER_SANDBOX')
+    command = [
+        bwrap, '--unshare-all', '--die-with-parent', '--new-session',
+        '--uid', str(SANDBOX_UID), '--gid', str(SANDBOX_UID),
+        '--proc', '/proc', '--dev', '/dev', '--tmpfs', '/tmp',
+    ]
+    for path in dict.fromkeys(SYSTEM_DIRS + (sys.base_prefix, sys.prefix, str(SANDBOX_RUNNER))):
+        command += ['--ro-bind-try', path, path]
+    return command
+
+
+def sandbox_command(workdir):
+    """Для bwrap: тести викладача - лише для читання, запис - тільки в каталог роботи й /tmp пісочниці"""
+    command = sandbox_prefix()
+    if not settings.AUTOGRADER_SANDBOX:
+        submission = str(workdir / 'submission')
+        command += ['--ro-bind', str(workdir), str(workdir), '--bind', submission, submission,
+                    '--chdir', str(workdir)]
+    return command
+
+
+class SandboxResult:
+    def __init__(self, duration=0.0, report=None, timed_out=False, returncode=None, output='', error=''):
+        self.duration = duration
+        self.report = report
+        self.timed_out = timed_out
+        self.returncode = returncode
+        self.output = output
+        self.error = error
+
+    def outcome(self, job):
+        """(стан завдання, оцінка або None, відгук)"""
+        # Автоперевірку могли видалити, поки завдання чекало в черзі: тоді оцінювати нічим
+        grader = getattr(job.submission.assignment, 'autograder', None)
+        if self.error or grader is None:
+            return GradingJob.FAILED, None, ''
+        max_points = job.submission.assignment.max_points
+        if self.timed_out:
+            return GradingJob.DONE, 0, f'Автоперевірка: перевищено ліміт часу ({grader.timeout} с).'
+        if self.report is None:
+            if self.returncode and self.returncode < 0:
+                reason = f"процес зупинено сигналом {-self.returncode} (ліміт CPU чи пам'яті {grader.memory_limit} МБ)"
+            else:
+                reason = f'процес завершився з кодом {self.returncode} до підсумку тестів'
+            return GradingJob.DONE, 0, f'Автоперевірка: {reason}.\n{self.output[-1000:]}'.rstrip()
+        if self.report.get('error'):
+            return GradingJob.DONE, 0, f"Автоперевірка: не вдалося завантажити роботу.\n{self.report['error'][-1500:]}"
+        total, passed = self.report['total'], self.report['passed']
+        if not total:
+            # У тестах немає жодного тесту - проблема завдання, а не роботи
+            return GradingJob.FAILED, None, ''
+        feedback = f'Автоперевірка: пройдено {passed} з {total} тестів.'
+        if self.report['failed']:
+            feedback += '\nНе пройдено: ' + ', '.join(self.report['failed'][:20])
+        return GradingJob.DONE, round(max_points * passed / total), feedback
+
+
+def _unpack_submission(field_file, workdir):
+    """.zip розпаковується (з обмеженням розміру), будь-який інший файл стає solution.py"""
+    with field_file.storage.open(field_file.name, 'rb') as source:
+        if not field_file.name.lower().endswith('.zip'):
+            with open(workdir / 'solution.py', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            return
+        with zipfile.ZipFile(source) as archive:
+            if sum(info.file_size for info in archive.infolist()) > MAX_UNPACKED_SIZE:
+                raise ValueError('Архів роботи завеликий')
+            # extractall відкидає абсолютні шляхи та '..'
+            archive.extractall(workdir)
+
+
+def run_sandbox(workdir, timeout, memory_limit):
+    command = sandbox_command(workdir) + [
+        sys.executable, '-I', str(SANDBOX_RUNNER), str(workdir), str(timeout), str(memory_limit), str(OUTPUT_LIMIT_MB),
+    ]
+    env = {'PATH': os.defpath, 'HOME': str(workdir / 'submission'), 'LANG': 'C.UTF-8'}
+    # Підсумок приходить лише зі stdout запускача; процес роботи пише в журнал (stderr)
+    with tempfile.TemporaryFile() as summary, tempfile.TemporaryFile() as output:
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=summary, stderr=output,
+                                   cwd=workdir, env=env, start_new_session=True)
+        try:
+            process.wait(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            # Уся група процесів: дочірні процеси роботи теж не переживуть тайм-аут
+            if hasattr(os, 'killpg'):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+            process.wait()
+            timed_out = True
+        duration = time.perf_counter() - started
+        output.seek(0)
+        text = output.read(OUTPUT_LIMIT_MB * 1024 * 1024).decode('utf-8', 'replace')
+        summary.seek(0)
+        try:
+            report = json.loads(summary.read(OUTPUT_LIMIT_MB * 1024 * 1024) or 'null')
+        except ValueError:
+            report = None
+    return SandboxResult(duration, report, timed_out, process.returncode, text)
+
+
+def run_job(job):
+    """Виконується в потоці пулу: лише файли й підпроцес, без звернень до БД"""
+    grader = job.submission.assignment.autograder
+    try:
+        with tempfile.TemporaryDirectory(prefix='lms-grader-') as directory:
+            workdir = Path(directory)
+            with grader.harness.open('rb') as source, open(workdir / 'harness.py', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            # Окремий каталог: файли роботи не можуть підмінити harness.py
+            (workdir / 'submission').mkdir()
+            _unpack_submission(job.submission.file, workdir / 'submission')
+            return run_sandbox(workdir, grader.timeout, grader.memory_limit)
+    except Exception as error:
+        logger.exception('Автоперевірка роботи %s', job.submission_id)
+        return SandboxResult(error=f'{type(error).__name__}: {error}')
+
+
+def claim_jobs(limit):
+    """Забирає з черги до limit завдань; skip_locked дозволяє кільком воркерам працювати з PostgreSQL"""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(GradingJob.objects.select_for_update(skip_locked=True).filter(
+            status=GradingJob.QUEUED).order_by('queued_at').values_list('pk', flat=True)[:limit])
+        GradingJob.objects.filter(pk__in=ids).update(status=GradingJob.RUNNING, started_at=now)
+    return list(GradingJob.objects.filter(pk__in=ids).select_related('submission__assignment__autograder'))
+
+
+def requeue_stale(now=None):
+    now = now or timezone.now()
+    return GradingJob.objects.filter(status=GradingJob.RUNNING, started_at__lt=now - STALE_AFTER).update(
+        status=GradingJob.QUEUED, started_at=None)
+
+
+def save_results(results):
+    """Записує пакет результатів двома bulk_update в одній транзакції; сповіщення - після коміту"""
+    now = timezone.now()
+    jobs, graded = [], []
+    for job, result in results:
+        job.status, grade, feedback = result.outcome(job)
+        job.finished_at = now
+        job.duration = result.duration
+        if result.report:
+            job.passed, job.total = result.report['passed'], result.report['total']
+        job.log = (result.error or result.output)[-4000:]
+        jobs.append(job)
+        if grade is not None:
+            submission = job.submission
+            submission.grade, submission.teacher_feedback, submission.graded_at = grade, feedback, now
+            submission.raw_grade = None
+            graded.append(submission)
+
+    with transaction.atomic():
+        GradingJob.objects.bulk_update(jobs, ['status', 'finished_at', 'duration', 'passed', 'total', 'log'])
+        # bulk_update не надсилає post_save, тож кеші й сповіщення оновлюються явно
+        StudentSubmission.all_objects.bulk_update(graded, ['grade', 'raw_grade', 'teacher_feedback', 'graded_at'])
+        transaction.on_commit(lambda: _announce(graded))
+    return len(graded)
+
+
+def _announce(submissions):
+    invalidate_assignment_feed({submission.student_id for submission in submissions})
+    for submission in submissions:
+        announce_grade(submission)
+
+
+def enqueue_submissions(submissions):
+    """Ставить роботи в чергу, крім тих, що вже чекають чи виконуються. Повертає кількість"""
+    active = GradingJob.objects.filter(
+        submission=OuterRef('pk'), status__in=[GradingJob.QUEUED, GradingJob.RUNNING])
+    ids = submissions.exclude(Exists(active)).values_list('pk', flat=True)
+    return len(GradingJob.objects.bulk_create([GradingJob(submission_id=pk) for pk in ids]))
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def queue_metrics(window=timedelta(hours=1)):
+    """Глибина черги та час виконання/очікування завдань, завершених за останнє вікно"""
+    now = timezone.now()
+    finished = GradingJob.objects.filter(finished_at__gte=now - window).values_list(
+        'duration', 'queued_at', 'started_at')
+    durations, waits = [], []
+    for duration, queued_at, started_at in finished:
+        durations.append(duration or 0)
+        if started_at:
+            waits.append((started_at - queued_at).total_seconds())
+    return {
+        'queued': GradingJob.objects.filter(status=GradingJob.QUEUED).count(),
+        'running': GradingJob.objects.filter(status=GradingJob.RUNNING).count(),
+        'finished': len(durations),
+        'per_hour': len(durations) * timedelta(hours=1) / window,
+        'run_p50': _percentile(durations, 50),
+        'run_p95': _percentile(durations, 95),
+        'wait_p50': _percentile(waits, 50),
+    }
@@ -0,0 +1,187 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import CharField, Count, Q, Value
+from django.db.models.functions import Cast
+
+from .models import Class, Course, Department, Faculty, Professor
+
+FACETS = ('faculty', 'department', 'credits', 'semester', 'professor')
+# Фільтри з числовим значенням (id або кредити); semester - назва семестру
+NUMERIC_FACETS = {'faculty', 'department', 'credits', 'professor'}
+PAGE_SIZE = 20
+CACHE_TIMEOUT = 10 * 60  # підписи фасетів (імена викладачів) оновлюються не пізніше
+VERSION_KEY = 'course_catalog:version'
+
+
+def catalog_version():
+    """Поточна версія каталогу; нове значення після рестарту кешу не збігається зі старими ключами"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_catalog():
+    """Усі закешовані фасети стають недійсними: їхні ключі містять стару версію"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+
+
+def parse_filters(params):
+    """Допустимі фільтри з GET-параметрів як рядки; некоректні значення ігноруються"""
+    filters = {}
+    for name in FACETS:
+        value = params.get(name, '').strip()
+        if value and (name not in NUMERIC_FACETS or value.isdigit()):
+            filters[name] = value
+    search = params.get('q', '').strip()
+    if search:
+        filters['q'] = search[:100]
+    return filters
+
+
+def _prefix_range(field, prefix):
+    """
+    Префікс як діапазон [prefix, prefix з наступним останнім символом): обидві межі йдуть
+    по B-tree індексу на будь-якій БД, на відміну від LIKE 'prefix%'
+    """
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)})
+
+
+def _course_filter(filters, skip=None):
+    """Умова на Course для всіх фільтрів, крім skip (фасет рахується без власного фільтра)"""
+    condition = Q()
+    if 'faculty' in filters and skip != 'faculty':
+        condition &= Q(department__faculty_id=filters['faculty'])
+    if 'department' in filters and skip != 'department':
+        condition &= Q(department_id=filters['department'])
+    if 'credits' in filters and skip != 'credits':
+        condition &= Q(credits=filters['credits'])
+    # Семестр і викладач - властивості занять курсу; IN з підзапитом, а не Exists, бо SQLite для
+    # корельованого підзапиту обирає індекс семестру й переглядає його заняття для кожного курсу
+    classes = {}
+    if 'semester' in filters and skip != 'semester':
+        classes['semester'] = filters['semester']
+    if 'professor' in filters and skip != 'professor':
+        classes['professor_id'] = filters['professor']
+    if classes:
+        condition &= Q(pk__in=Class.objects.filter(**classes).values('course_id'))
+    if 'q' in filters:
+        condition &= _prefix_range('code', filters['q'].upper()) | _prefix_range('search_name', filters['q'].lower())
+    return condition
+
+
+def _facet_query(filters):
+    """
+    Один запит - UNION ALL згрупованих підзапитів: кількість курсів для кожного значення кожного
+    фасету (без урахування фільтра самого фасету, щоб можна було змінити вибір) і загальна кількість
+    """
+    def grouped(queryset, facet, field, count):
+        return queryset.values(facet=Value(facet), value=Cast(field, CharField())).annotate(count=count).order_by()
+
+    def courses(skip=None):
+        return Course.objects.filter(_course_filter(filters, skip))
+
+    def classes(facet):
+        other = {'semester': 'professor', 'professor': 'semester'}[facet]
+        queryset = Class.objects.filter(course__in=courses(skip=facet).values('pk'))
+        if other in filters:
+            queryset = queryset.filter(**{'semester' if other == 'semester' else 'professor_id': filters[other]})
+        return queryset
+
+    distinct_courses = Count('course_id', distinct=True)
+    parts = [
+        grouped(courses(), '', Value(''), Count('pk')),
+        grouped(courses('faculty'), 'faculty', 'department__faculty_id', Count('pk')),
+        grouped(courses('department'), 'department', 'department_id', Count('pk')),
+        grouped(courses('credits'), 'credits', 'credits', Count('pk')),
+        grouped(classes('semester'), 'semester', 'semester_id', distinct_courses),
+        grouped(classes('professor'), 'professor', 'professor_id', distinct_courses),
+    ]
+    return parts[0].union(*parts[1:], all=True).values_list('facet', 'value', 'count')
+
+
+def _labels(counts):
+    """Підписи значень фасетів; викладачі - лише ті, що трапились у фасеті"""
+    return {
+        'faculty': {str(pk): name for pk, name in Faculty.objects.values_list('pk', 'name').cached()},
+        'department': {str(pk): name for pk, name in Department.objects.values_list('pk', 'name').cached()},
+        'credits': {value: value for value in counts['credits']},
+        'semester': {value: value for value in counts['semester']},
+        'professor': {
+            str(professor.pk): professor.user.get_full_name() or professor.user.username
+            for professor in Professor.objects.filter(pk__in=list(counts['professor'])).select_related('user')
+        },
+    }
+
+
+def build_facets(filters):
+    """(кількість курсів, {фасет: [{'value', 'label', 'count'}]}) без кешу"""
+    counts = {facet: {} for facet in FACETS}
+    total = 0
+    for facet, value, count in _facet_query(filters):
+        if facet:
+            counts[facet][value] = count
+        else:
+            total = count
+    labels = _labels(counts)
+    facets = {}
+    for facet in FACETS:
+        options = [{'value': value, 'label': labels[facet].get(value, value), 'count': count}
+                   for value, count in counts[facet].items()]
+        options.sort(key=(lambda option: int(option['value'])) if facet == 'credits'
+                     else (lambda option: option['label']))
+        facets[facet] = options
+    return total, facets
+
+
+def cache_key(filters, *parts):
+    """Ключ містить версію каталогу, тож зміна курсу чи заняття скидає все закешоване разом"""
+    digest = hashlib.md5(urlencode(sorted(filters.items())).encode()).hexdigest()
+    return ':'.join(['course_catalog', str(catalog_version()), digest, *map(str, parts)])
+
+
+def get_facets(filters):
+    """build_facets з кешем"""
+    key = cache_key(filters)
+    cached = cache.get(key)
+    if cached is None:
+        cached = build_facets(filters)
+        cache.set(key, cached, CACHE_TIMEOUT)
+    return cached
+
+
+class KnownCountPaginator(Paginator):
+    """Кількість курсів уже порахована в запиті фасетів - без окремого COUNT(*)"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @property
+    def count(self):
+        return self._count
+
+
+def catalog_page(filters, page_number):
+    """
+    Сторінка курсів за фільтрами в порядку коду і фасети. Кешуються id курсів сторінки:
+    із фільтром за семестром чи пошуком сам запит сторінки помітно дорожчий за вибірку 20 рядків за pk
+    """
+    total, facets = get_facets(filters)
+    courses = Course.objects.select_related('department__faculty').order_by('code')
+    page = KnownCountPaginator(courses.filter(_course_filter(filters)), PAGE_SIZE, total).get_page(page_number)
+    key = cache_key(filters, page.number)
+    course_ids = cache.get(key)
+    if course_ids is None:
+        course_ids = list(page.object_list.values_list('pk', flat=True))
+        cache.set(key, course_ids, CACHE_TIMEOUT)
+    page.object_list = list(courses.filter(pk__in=course_ids).cached())
+    return page, facets
@@ -0,0 +1,113 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.db.models import Count, Exists, F, Max, OuterRef, Subquery
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .models import Assignment, Class, CourseMaterial, Enrollment, StudentSubmission
+
+# Часи змін у class_freshness, з яких береться Last-Modified
+CHANGED_FIELDS = ('class_changed', 'course_changed', 'materials_changed', 'assignments_changed', 'submitted', 'graded')
+
+
+def _aggregate(queryset, link, aggregate):
+    """Корельований підзапит з агрегатом по рядках, пов'язаних із заняттям"""
+    return Subquery(
+        queryset.filter(**{link: OuterRef('pk')})
+        .order_by().values(link)
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def class_freshness(request, class_id):
+    """
+    Стан заняття для умовних GET-запитів, отриманий одним запитом до БД: доступ студента,
+    час зміни заняття й курсу (updated_at), останні зміни та кількості матеріалів, завдань і робіт.
+    Результат запам'ятовується на request, щоб ETag і Last-Modified не робили два запити.
+    """
+    cache_attr = f'_class_freshness_{class_id}'
+    if hasattr(request, cache_attr):
+        return getattr(request, cache_attr)
+
+    queryset = Class.objects.filter(pk=class_id).annotate(
+        class_changed=F('updated_at'),
+        course_changed=F('course__updated_at'),
+        materials_changed=_aggregate(CourseMaterial.objects, 'class_obj', Max('updated_at')),
+        materials_count=_aggregate(CourseMaterial.objects, 'class_obj', Count('pk')),
+        assignments_changed=_aggregate(Assignment.objects, 'class_obj', Max('updated_at')),
+        assignments_count=_aggregate(Assignment.objects, 'class_obj', Count('pk')),
+        submitted=_aggregate(StudentSubmission.objects, 'assignment__class_obj', Max('submission_date')),
+        graded=_aggregate(StudentSubmission.objects, 'assignment__class_obj', Max('graded_at')),
+        submissions_count=_aggregate(StudentSubmission.objects, 'assignment__class_obj', Count('pk')),
+    )
+    if hasattr(request.user, 'student'):
+        queryset = queryset.annotate(has_access=Exists(
+            Enrollment.objects.filter(student=request.user.student, class_enrolled=OuterRef('pk'))
+        ))
+
+    freshness = queryset.values(
+        'class_changed', 'course_changed', 'materials_changed', 'materials_count', 'assignments_changed', 'assignments_count',
+        'submitted', 'graded', 'submissions_count', *(['has_access'] if hasattr(request.user, 'student') else [])
+    ).first()
+
+    # Для неіснуючого заняття або студента без доступу умовна обробка не застосовується:
+    # представлення саме поверне 404/403
+    if freshness is not None and not freshness.pop('has_access', True):
+        freshness = None
+
+    setattr(request, cache_attr, freshness)
+    return freshness
+
+
+def class_validators(request, class_id):
+    """ETag і Last-Modified сторінки заняття; обчислюються один раз на запит"""
+    cache_attr = f'_class_validators_{class_id}'
+    if hasattr(request, cache_attr):
+        return getattr(request, cache_attr)
+
+    etag = last_modified = None
+    freshness = class_freshness(request, class_id)
+    if freshness is not None:
+        timestamps = [freshness[key] for key in CHANGED_FIELDS if freshness[key] is not None]
+        last_modified = max(timestamps) if timestamps else None
+
+        # Повідомлення показуються один раз, тож сторінку з ними не можна віддавати з кешу
+        if not len(messages.get_messages(request)):
+            user = request.user
+            # Сторінка залежить від користувача та CSRF-токена у формі виходу з base.html
+            parts = [
+                request.path, user.pk, user.get_full_name(), request.META.get('CSRF_COOKIE', ''),
+                *(str(freshness[key]) for key in sorted(freshness)),
+            ]
+            etag = hashlib.md5('|'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+    setattr(request, cache_attr, (etag, last_modified))
+    return etag, last_modified
+
+
+def class_etag(request, class_id, **kwargs):
+    return class_validators(request, class_id)[0]
+
+
+def class_last_modified(request, class_id, **kwargs):
+    return class_validators(request, class_id)[1]
+
+
+def class_condition(view_func):
+    """Сторінки заняття: 304 без рендерингу шаблону, якщо нічого не змінилося"""
+    conditional_view = condition(etag_func=class_etag, last_modified_func=class_last_modified)(view_func)
+
+    if iscoroutinefunction(view_func):
+        # condition() викликає etag_func синхронно навіть для async-представлень,
+        # тому значення обчислюються заздалегідь у потоці, де дозволені запити до БД
+        @wraps(view_func)
+        async def conditional_view_async(request, class_id, *args, **kwargs):
+            await sync_to_async(class_validators)(request, class_id)
+            return await conditional_view(request, class_id, *args, **kwargs)
+        return cache_control(private=True, no_cache=True)(conditional_view_async)
+
+    # Браузер зберігає сторінку лише для себе і щоразу перевіряє її актуальність
+    return cache_control(private=True, no_cache=True)(conditional_view)
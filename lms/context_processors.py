@@ -0,0 +1,18 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.utils import timezone
+
+
+def get_request_now(request):
+    """Один момент "зараз" на запит: усі терміни на сторінці рахуються від нього"""
+    if not hasattr(request, '_lms_now'):
+        request._lms_now = timezone.now()
+    return request._lms_now
+
+
+def request_now(request):
+    return {'request_now': get_request_now(request)}
+
+
+def push_notifications(request):
+    """Потік сповіщень (SSE) підключається лише під ASGI: під WSGI кожна відкрита сторінка тримала б робочий потік"""
+    return {'push_notifications': isinstance(request, ASGIRequest)}
@@ -0,0 +1,117 @@
+import logging
+from collections import namedtuple
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+
+from .feed import BUCKETS as FEED_BUCKETS, get_assignment_feed
+from .models import Assignment, Class, Enrollment, Professor, Student, StudentSubmission
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'dashboard:{}:{}'
+GRADING_QUEUE_SIZE = 10
+RECENT_GRADES = 5
+
+# profile_model - чий це фрагмент; ttl - секунд у кеші (0 - не кешувати HTML);
+# query_budget - скільки запитів до БД дозволено при рендерингу без кешу
+Fragment = namedtuple('Fragment', 'profile_model template ttl query_budget context')
+
+
+class QueryCounter:
+    """execute_wrapper, що рахує запити до БД"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _student_courses(student):
+    enrollments = Enrollment.objects.filter(student=student).select_related(
+        'class_enrolled__course', 'class_enrolled__professor__user')
+    return {'classes': [enrollment.class_enrolled for enrollment in enrollments]}
+
+
+def _student_deadlines(student):
+    # Стрічка має власний кеш до наступної межі кошиків і скидається при зміні завдань і робіт
+    feed = get_assignment_feed(student)
+    return {
+        'pending_count': feed['total'],
+        'feed_buckets': [
+            {'key': key, 'label': label, 'assignments': feed['buckets'][key]}
+            for key, label in FEED_BUCKETS
+        ],
+    }
+
+
+def _student_grades(student):
+    submissions = StudentSubmission.objects.filter(student=student)
+    return {
+        'submitted_count': submissions.count(),
+        'recent_grades': submissions.filter(grade__isnull=False).select_related(
+            'assignment__class_obj__course').with_grade_class().order_by('-graded_at', '-pk')[:RECENT_GRADES],
+    }
+
+
+def _professor_classes(professor):
+    return {'classes': Class.objects.filter(professor=professor).select_related('course')}
+
+
+def _professor_grading(professor):
+    submissions = StudentSubmission.objects.filter(assignment__class_obj__professor=professor)
+    return {
+        'assignments_count': Assignment.objects.filter(class_obj__professor=professor).count(),
+        **submissions.aggregate(submissions_count=Count('id'), pending_count=Count('id', filter=Q(grade__isnull=True))),
+        'pending_submissions': submissions.filter(grade__isnull=True).select_related(
+            'student__user', 'assignment__class_obj__course').order_by('submission_date')[:GRADING_QUEUE_SIZE],
+    }
+
+
+FRAGMENTS = {
+    'courses': Fragment(Student, 'lms/dashboard_courses.html', 10 * 60, 1, _student_courses),
+    'deadlines': Fragment(Student, 'lms/assignment_feed_widget.html', 0, 1, _student_deadlines),
+    'grades': Fragment(Student, 'lms/dashboard_grades.html', 5 * 60, 2, _student_grades),
+    'classes': Fragment(Professor, 'lms/dashboard_classes.html', 10 * 60, 1, _professor_classes),
+    'grading': Fragment(Professor, 'lms/dashboard_grading.html', 60, 3, _professor_grading),
+}
+STUDENT_FRAGMENTS = [name for name, fragment in FRAGMENTS.items() if fragment.profile_model is Student]
+PROFESSOR_FRAGMENTS = [name for name, fragment in FRAGMENTS.items() if fragment.profile_model is Professor]
+
+
+def build_fragment(name, profile):
+    """HTML фрагмента без кешу; перевищення бюджету запитів записується в лог"""
+    fragment = FRAGMENTS[name]
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(counter))
+        # Без request: у кешований HTML не потрапляють CSRF-токен і дані контекст-процесорів
+        html = render_to_string(fragment.template, fragment.context(profile))
+    if counter.count > fragment.query_budget:
+        logger.warning('Фрагмент панелі %s: %d запитів до БД при бюджеті %d',
+                       name, counter.count, fragment.query_budget)
+    return html
+
+
+def render_fragment(name, profile):
+    """build_fragment з кешем на ttl фрагмента"""
+    fragment = FRAGMENTS[name]
+    if not fragment.ttl:
+        return build_fragment(name, profile)
+    key = CACHE_KEY.format(name, profile.pk)
+    html = cache.get(key)
+    if html is None:
+        html = build_fragment(name, profile)
+        cache.set(key, html, fragment.ttl)
+    return html
+
+
+def invalidate_fragments(name, profile_ids):
+    """Скидає кеш фрагмента для вказаних студентів чи викладачів"""
+    cache.delete_many([CACHE_KEY.format(name, profile_id) for profile_id in profile_ids])
@@ -0,0 +1,129 @@
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+# Чи дозволено поточному коду читати з репліки
+_use_replica = ContextVar('lms_use_replica', default=False)
+# Чи прив'язаний поточний запит до основної БД (після нещодавнього запису користувача)
+_pinned = ContextVar('lms_pinned_to_primary', default=False)
+# Чи був запис в основну БД у поточному запиті
+_wrote = ContextVar('lms_wrote_to_primary', default=False)
+
+STICKY_COOKIE = 'lms_primary_until'
+
+
+def replica_configured():
+    return REPLICA in connections.databases
+
+
+class ReplicaRouter:
+    """
+    Читання в межах read_replica() йдуть на репліку, усе інше - на основну БД.
+    Після запису запит і наступні запити користувача (див. ReplicaStickinessMiddleware)
+    читають з основної БД, щоб бачити власні зміни.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and not _pinned.get() and not _wrote.get() and replica_configured():
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Репліка містить ту саму схему й дані, що й основна БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
+
+
+class read_replica(ContextDecorator):
+    """Контекстний менеджер і декоратор (синхронних та async) представлень: читання з репліки"""
+
+    def _recreate_cm(self):
+        # Кожен виклик декорованого представлення отримує власний екземпляр з власним токеном:
+        # один спільний _token ламався б на одночасних запитах
+        return type(self)()
+
+    def __call__(self, func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def inner(*args, **kwargs):
+                with self._recreate_cm():
+                    return await func(*args, **kwargs)
+            return inner
+        return super().__call__(func)
+
+    def __enter__(self):
+        self._token = _use_replica.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+        return False
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes: якщо запит щось записав, cookie прив'язує користувача
+    до основної БД на LMS_REPLICA_STICKY_SECONDS (час відставання репліки).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self.process_request(request)
+        try:
+            response = self.get_response(request)
+            self.process_response(request, response)
+        finally:
+            self.reset(tokens)
+        return response
+
+    async def __acall__(self, request):
+        tokens = self.process_request(request)
+        try:
+            response = await self.get_response(request)
+            self.process_response(request, response)
+        finally:
+            self.reset(tokens)
+        return response
+
+    def process_request(self, request):
+        try:
+            pinned = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return _pinned.set(pinned), _wrote.set(False)
+
+    def process_response(self, request, response):
+        if _wrote.get() or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            sticky_seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                STICKY_COOKIE, str(time.time() + sticky_seconds),
+                max_age=sticky_seconds, httponly=True, samesite='Lax',
+            )
+
+    def reset(self, tokens):
+        pinned_token, wrote_token = tokens
+        _pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
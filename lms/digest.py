@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import CharField, Exists, F, OuterRef, Value
+from django.db.models.functions import Cast, Concat
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Enrollment, Notification, Student, StudentSubmission
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(user_ids, event, title, url='', dedup_key=''):
+    """Додає подію в чергу користувачів; повтори з тим самим dedup_key ігноруються"""
+    Notification.objects.bulk_create([
+        Notification(user_id=user_id, event=event, title=title, url=url, dedup_key=dedup_key)
+        for user_id in user_ids
+    ], ignore_conflicts=True, batch_size=500)
+
+
+def enqueue_for_students(student_ids, event, title, url='', dedup_key=''):
+    user_ids = Student.objects.filter(pk__in=student_ids).values_list('user_id', flat=True)
+    enqueue(user_ids, event, title, url, dedup_key)
+
+
+def enqueue_deadline_reminders(now=None):
+    """Нагадування студентам, які ще не здали завдання з терміном у найближчі 24 години"""
+    now = now or timezone.now()
+    submitted = StudentSubmission.objects.filter(student=OuterRef('student'), assignment=OuterRef('assignment_id'))
+    # Вже поставлені в чергу нагадування не вибираються повторно на кожному циклі
+    queued = Notification.objects.filter(
+        user=OuterRef('student__user'),
+        dedup_key=Concat(Value('deadline:'), Cast(OuterRef('assignment_id'), CharField())),
+    )
+    # Анотації в одному annotate() спираються на одне з'єднання із завданнями,
+    # тож фільтри й підзапити нижче стосуються того самого завдання
+    rows = Enrollment.objects.annotate(
+        assignment_id=F('class_enrolled__assignment__id'),
+        assignment_title=F('class_enrolled__assignment__title'),
+        assignment_due=F('class_enrolled__assignment__due_date'),
+    ).filter(
+        assignment_due__gt=now, assignment_due__lte=now + timedelta(hours=24),
+    ).exclude(Exists(submitted)).exclude(Exists(queued)).values_list(
+        'student__user_id', 'assignment_id', 'assignment_title',
+    )
+
+    notifications = [
+        Notification(
+            user_id=user_id, event=Notification.DEADLINE,
+            title=f'Термін здачі через 24 години: {title}',
+            url=reverse('assignment_detail', args=[assignment_id]),
+            dedup_key=f'deadline:{assignment_id}',
+        )
+        for user_id, assignment_id, title in rows
+    ]
+    Notification.objects.bulk_create(notifications, ignore_conflicts=True, batch_size=500)
+    return len(notifications)
+
+
+class Digest:
+    """Усі непрочитані події одного користувача, що йдуть одним повідомленням"""
+
+    def __init__(self, user):
+        self.user = user
+        self.notifications = []
+
+    @property
+    def subject(self):
+        return f'Університетська система: нових сповіщень - {len(self.notifications)}'
+
+    def as_text(self, base_url=''):
+        lines = [f'Вітаємо, {self.user.get_full_name() or self.user.username}!', '']
+        for notification in self.notifications:
+            line = f'- {notification.title}'
+            if notification.url:
+                line += f' ({base_url}{notification.url})'
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+class EmailChannel:
+    """Дайджести поштою через EMAIL_BACKEND одним з'єднанням на пакет"""
+
+    name = 'email'
+
+    def send(self, digests):
+        messages = [
+            EmailMessage(digest.subject, digest.as_text(settings.SITE_URL), to=[digest.user.email])
+            for digest in digests if digest.user.email
+        ]
+        with get_connection() as connection:
+            connection.send_messages(messages)
+        return len(messages)
+
+
+class TelegramChannel:
+    """
+    Дайджести в Telegram. Повідомлення надсилаються конкурентно, але не частіше
+    TELEGRAM_RATE_LIMIT на секунду (обмеження Bot API)
+    """
+
+    name = 'telegram'
+
+    def __init__(self, transport=None, rate_limit=None):
+        self.transport = transport or import_string(settings.TELEGRAM_TRANSPORT)()
+        self.rate_limit = settings.TELEGRAM_RATE_LIMIT if rate_limit is None else rate_limit
+
+    def send(self, digests):
+        messages = []
+        for digest in digests:
+            chat = getattr(digest.user, 'telegram_chat', None)
+            if chat is not None:
+                messages.append((chat.chat_id, digest.as_text(settings.SITE_URL)))
+        if messages:
+            asyncio.run(self.send_all(messages))
+        return len(messages)
+
+    async def send_all(self, messages):
+        interval = 1 / self.rate_limit if self.rate_limit else 0
+
+        async def send_one(position, chat_id, text):
+            await asyncio.sleep(position * interval)
+            await self.transport.send_message(chat_id, text)
+
+        async with self.transport:
+            results = await asyncio.gather(
+                *(send_one(position, chat_id, text) for position, (chat_id, text) in enumerate(messages)),
+                return_exceptions=True,
+            )
+        # Недоступний чат (бота заблоковано тощо) не повинен зупиняти розсилку іншим
+        for (chat_id, _), result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.warning('Не вдалося надіслати дайджест у чат %s: %s', chat_id, result)
+
+
+class BotApiTransport:
+    """Справжній Bot API через python-telegram-bot"""
+
+    def __init__(self):
+        from telegram import Bot
+
+        self.bot = Bot(settings.TELEGRAM_BOT_TOKEN)
+
+    async def __aenter__(self):
+        await self.bot.initialize()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.bot.shutdown()
+        return False
+
+    async def send_message(self, chat_id, text):
+        await self.bot.send_message(chat_id=chat_id, text=text)
+
+
+class FakeTelegramTransport:
+    """Локальний транспорт для тестів і навантажувальних прогонів: повідомлення зберігаються в outbox"""
+
+    outbox = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def send_message(self, chat_id, text):
+        self.outbox.append((chat_id, text))
+
+
+def get_channels():
+    return [import_string(path)() for path in settings.NOTIFICATION_CHANNELS]
+
+
+def _delivered(notification):
+    return set(filter(None, notification.delivered_channels.split(',')))
+
+
+def dispatch_batch(channels, batch_size=1000, now=None):
+    """
+    Надсилає дайджести наступним batch_size користувачам з непрочитаними подіями.
+    Користувач, якому дайджест ішов менше ніж DIGEST_MIN_INTERVAL тому, пропускається:
+    його події накопичуються до наступного дайджесту. Повертає кількість отримувачів.
+
+    Доставка записується окремо для кожного каналу: якщо Telegram впав після пошти, подія лишається
+    в черзі лише для Telegram, і наступний цикл не надсилає лист удруге. Помилка каналу
+    піднімається після запису доставлених, щоб воркер зачекав до наступного циклу.
+    """
+    now = now or timezone.now()
+    recently_sent = Notification.objects.filter(
+        user=OuterRef('user'),
+        sent_at__gt=now - timedelta(seconds=settings.DIGEST_MIN_INTERVAL),
+    )
+    user_ids = list(
+        Notification.objects.filter(sent_at__isnull=True)
+        .exclude(Exists(recently_sent))
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+        .distinct()[:batch_size]
+    )
+    if not user_ids:
+        return 0
+
+    pending = list(Notification.objects.filter(
+        user_id__in=user_ids, sent_at__isnull=True
+    ).select_related('user', 'user__telegram_chat').order_by('user_id', 'created_at'))
+
+    succeeded, failure = set(), None
+    for channel in channels:
+        digests = {}
+        for notification in pending:
+            if channel.name in _delivered(notification):
+                continue
+            if notification.user_id not in digests:
+                digests[notification.user_id] = Digest(notification.user)
+            digests[notification.user_id].notifications.append(notification)
+        try:
+            channel.send(digests.values())
+        except Exception as e:
+            # Наприклад, SMTP недоступний: події лишаються в черзі цього каналу до наступного циклу
+            logger.exception('Канал %s не надіслав дайджести', channel.name)
+            failure = failure or e
+        else:
+            succeeded.add(channel.name)
+
+    # Зазвичай усі події пакета отримують однаковий стан, тож оновлень - кілька, а не по одному на рядок
+    channel_names = {channel.name for channel in channels}
+    updates = defaultdict(list)
+    for notification in pending:
+        delivered = _delivered(notification) | succeeded
+        sent_at = now if channel_names <= delivered else None
+        updates[','.join(sorted(delivered)), sent_at].append(notification.pk)
+    for (delivered, sent_at), notification_ids in updates.items():
+        for start in range(0, len(notification_ids), 500):
+            Notification.objects.filter(pk__in=notification_ids[start:start + 500]).update(
+                delivered_channels=delivered, sent_at=sent_at)
+
+    if failure is not None:
+        raise failure
+    return len(user_ids)
@@ -0,0 +1,143 @@
+import csv
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+
+from .dashboard import invalidate_fragments
+from .feed import invalidate_assignment_feed
+from .models import Class, Enrollment, Semester, Student, WaitlistEntry
+
+CSV_COLUMNS = ('student_id', 'course_code', 'semester')
+
+# Причини пропуску рядків у звіті
+MISSING_FIELDS = 'не заповнені поля'
+UNKNOWN_STUDENT = 'невідомий студент'
+UNKNOWN_CLASS = 'немає заняття для курсу та семестру'
+CLOSED_SEMESTER = 'семестр закрито'
+AMBIGUOUS_CLASS = 'кілька занять для курсу та семестру'
+DUPLICATE_ROW = 'повтор у файлі'
+ALREADY_ENROLLED = 'вже записаний'
+NO_SEATS = 'немає вільних місць'
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.skipped = []  # (номер рядка, рядок CSV, причина)
+
+    def skip(self, line, row, reason):
+        self.skipped.append((line, row, reason))
+
+    def summary(self):
+        return Counter(reason for _, _, reason in self.skipped)
+
+
+def _class_lookup():
+    """
+    (код курсу, семестр) -> id заняття одним запитом; None, якщо занять кілька.
+    Навмисно лише активні семестри (Class.objects): закритий семестр переноситься в архівні таблиці,
+    і нові записи в ньому оминули б архівацію, тож такі рядки йдуть у звіт як CLOSED_SEMESTER.
+    """
+    lookup = {}
+    for code, semester, class_id in Class.objects.values_list('course__code', 'semester', 'pk'):
+        key = (code.strip().upper(), semester.strip())
+        lookup[key] = None if key in lookup else class_id
+    return lookup
+
+
+def _free_seats(class_ids):
+    """{id заняття: вільні місця} для занять з обмеженою місткістю"""
+    classes = Class.all_objects.filter(pk__in=class_ids, capacity__isnull=False).annotate(
+        taken=Count('enrollment')).values_list('pk', 'capacity', 'taken')
+    return {class_pk: max(capacity - taken, 0) for class_pk, capacity, taken in classes}
+
+
+def import_enrollments(csv_file, batch_size=5000, dry_run=False):
+    """
+    Записує студентів на заняття з CSV (student_id, course_code, semester).
+    Ключі розв'язуються через словники, побудовані кількома запитами, вставка -
+    bulk_create(ignore_conflicts=True) пакетами в одній транзакції.
+    Місткість занять дотримується, як і в registration.register(): рядки понад вільні місця
+    потрапляють у звіт (у черзу очікування імпорт не ставить).
+    """
+    reader = csv.DictReader(csv_file)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"У CSV бракує колонок: {', '.join(sorted(missing))}")
+
+    students = dict(Student.objects.values_list('student_id', 'pk'))
+    classes = _class_lookup()
+    closed_semesters = set(Semester.objects.filter(is_active=False).values_list('name', flat=True))
+
+    result = ImportResult()
+    seen = set()
+    pending = []
+    for line, row in enumerate(reader, start=2):
+        student_id = (row['student_id'] or '').strip()
+        code = (row['course_code'] or '').strip().upper()
+        semester = (row['semester'] or '').strip()
+        if not (student_id and code and semester):
+            result.skip(line, row, MISSING_FIELDS)
+            continue
+        student_pk = students.get(student_id)
+        if student_pk is None:
+            result.skip(line, row, UNKNOWN_STUDENT)
+            continue
+        if (code, semester) not in classes:
+            result.skip(line, row, CLOSED_SEMESTER if semester in closed_semesters else UNKNOWN_CLASS)
+            continue
+        class_pk = classes[(code, semester)]
+        if class_pk is None:
+            result.skip(line, row, AMBIGUOUS_CLASS)
+            continue
+        if (student_pk, class_pk) in seen:
+            result.skip(line, row, DUPLICATE_ROW)
+            continue
+        seen.add((student_pk, class_pk))
+        pending.append((line, row, student_pk, class_pk))
+
+    class_ids = {class_pk for _, _, _, class_pk in pending}
+    with transaction.atomic():
+        if not dry_run:
+            # Те саме блокування, що й у registration: місця не розходяться з одночасною реєстрацією
+            list(Class.all_objects.select_for_update().filter(pk__in=class_ids).values_list('pk', flat=True))
+        free = _free_seats(class_ids)
+        # Наявні записи потрібні лише для звіту: unique_together і так відсіче їх при вставці
+        existing = set(Enrollment.objects.filter(class_enrolled_id__in=class_ids).values_list(
+            'student_id', 'class_enrolled_id'))
+
+        enrollments = []
+        for line, row, student_pk, class_pk in pending:
+            if (student_pk, class_pk) in existing:
+                result.skip(line, row, ALREADY_ENROLLED)
+            elif free.get(class_pk) == 0:
+                result.skip(line, row, NO_SEATS)
+            else:
+                enrollments.append(Enrollment(student_id=student_pk, class_enrolled_id=class_pk))
+                if class_pk in free:
+                    free[class_pk] -= 1
+
+        result.created = len(enrollments)
+        if dry_run or not enrollments:
+            return result
+
+        Enrollment.objects.bulk_create(enrollments, batch_size=batch_size, ignore_conflicts=True)
+        # Записаний студент виходить з черги, як і в register(): інакше _promote віддав би йому вільне місце ще раз
+        pairs = {(enrollment.student_id, enrollment.class_enrolled_id) for enrollment in enrollments}
+        student_ids = list({student_pk for student_pk, _ in pairs})
+        waitlisted = WaitlistEntry.objects.filter(class_obj_id__in=class_ids, student_id__in=student_ids).values_list(
+            'pk', 'student_id', 'class_obj_id')
+        WaitlistEntry.objects.filter(pk__in=[pk for pk, *pair in waitlisted if tuple(pair) in pairs]).delete()
+        # bulk_create не надсилає post_save, тож стрічки завдань і блоки курсів скидаються явно
+        transaction.on_commit(lambda: invalidate_assignment_feed(student_ids))
+        transaction.on_commit(lambda: invalidate_fragments('courses', student_ids))
+    return result
+
+
+def write_skipped(result, output):
+    """Звіт про пропущені рядки у форматі CSV"""
+    writer = csv.writer(output)
+    writer.writerow(('line',) + CSV_COLUMNS + ('reason',))
+    for line, row, reason in result.skipped:
+        writer.writerow([line] + [row.get(column, '') for column in CSV_COLUMNS] + [reason])
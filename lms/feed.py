@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, DateTimeField, Exists, F, OuterRef, Value, When
+from django.utils import timezone
+
+from .models import Assignment, Enrollment, StudentSubmission
+
+OVERDUE = 'overdue'
+DUE_TODAY = 'today'
+THIS_WEEK = 'week'
+LATER = 'later'
+
+BUCKETS = [
+    (OVERDUE, 'Прострочені'),
+    (DUE_TODAY, 'Сьогодні'),
+    (THIS_WEEK, 'Цього тижня'),
+    (LATER, 'Пізніше'),
+]
+
+CACHE_KEY = 'assignment_feed:{}'
+
+
+def bucket_boundaries(now):
+    """Межі кошиків: кінець сьогоднішнього дня та кінець тижня (за місцевим часом)"""
+    today_start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    end_of_today = today_start + timedelta(days=1)
+    end_of_week = today_start + timedelta(days=7)
+    return end_of_today, end_of_week
+
+
+def due_bucket(due_date, now, boundaries):
+    """Кошик терміну в Python - та сама умова, що й Case у _query_feed"""
+    end_of_today, end_of_week = boundaries
+    if due_date < now:
+        return OVERDUE
+    if due_date < end_of_today:
+        return DUE_TODAY
+    if due_date < end_of_week:
+        return THIS_WEEK
+    return LATER
+
+
+def _query_feed(student, now):
+    """Один запит: невиконані завдання студента з кошиком та часом до терміну, обчисленими в БД"""
+    end_of_today, end_of_week = bucket_boundaries(now)
+    now_value = Value(now, output_field=DateTimeField())
+
+    submitted = StudentSubmission.objects.filter(student=student, assignment=OuterRef('pk'))
+    enrolled = Enrollment.objects.filter(student=student, class_enrolled=OuterRef('class_obj'))
+
+    return Assignment.objects.filter(
+        Exists(enrolled), ~Exists(submitted)
+    ).annotate(
+        bucket=Case(
+            When(due_date__lt=now_value, then=Value(OVERDUE)),
+            When(due_date__lt=end_of_today, then=Value(DUE_TODAY)),
+            When(due_date__lt=end_of_week, then=Value(THIS_WEEK)),
+            default=Value(LATER),
+            output_field=CharField(),
+        ),
+        time_left=F('due_date') - now_value,
+    ).values(
+        'id', 'title', 'assignment_type', 'due_date', 'max_points', 'bucket', 'time_left',
+        course_code=F('class_obj__course__code'),
+        course_name=F('class_obj__course__name'),
+    ).order_by('due_date')
+
+
+def _seconds_until_next_boundary(now, rows):
+    """Кеш живе до найближчої зміни кошиків: опівночі або до найближчого терміну здачі"""
+    next_boundary, _ = bucket_boundaries(now)
+    for row in rows:
+        if row['due_date'] >= now:
+            next_boundary = min(next_boundary, row['due_date'])
+            break
+    return max(int((next_boundary - now).total_seconds()) + 1, 1)
+
+
+def _assemble_feed(rows, now):
+    buckets = {key: [] for key, _ in BUCKETS}
+    for row in rows:
+        row['days_left'] = row.pop('time_left').days
+        buckets[row.pop('bucket')].append(row)
+
+    return {
+        'generated_at': now,
+        'total': len(rows),
+        'buckets': buckets,
+    }, _seconds_until_next_boundary(now, rows)
+
+
+def build_assignment_feed(student, now=None):
+    """Розкладає невиконані завдання студента по кошиках без кешу"""
+    now = now or timezone.now()
+    return _assemble_feed(list(_query_feed(student, now)), now)
+
+
+def get_assignment_feed(student):
+    """Стрічка завдань студента з кешем до наступної межі кошиків"""
+    key = CACHE_KEY.format(student.pk)
+    feed = cache.get(key)
+    if feed is None:
+        feed, timeout = build_assignment_feed(student)
+        cache.set(key, feed, timeout)
+    return feed
+
+
+async def aget_assignment_feed(student):
+    """Асинхронна версія get_assignment_feed для async-представлень"""
+    key = CACHE_KEY.format(student.pk)
+    feed = await cache.aget(key)
+    if feed is None:
+        now = timezone.now()
+        feed, timeout = _assemble_feed([row async for row in _query_feed(student, now)], now)
+        await cache.aset(key, feed, timeout)
+    return feed
+
+
+def invalidate_assignment_feed(student_ids):
+    """Скидає кеш стрічки для вказаних студентів"""
+    cache.delete_many([CACHE_KEY.format(student_id) for student_id in student_ids])
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
-from .models import CourseMaterial, Assignment, StudentSubmission
+from .models import CourseMaterial, Assignment, AutoGrader, StudentSubmission
 
 
 class UserEditForm(forms.ModelForm):
@@ -97,4 +97,80 @@ class GradeSubmissionForm(forms.ModelForm):
         labels = {
             'grade': 'Оцінка',
             'teacher_feedback': 'Відгук викладача'
-        }
\ No newline at end of file
+        }
+
+class AutoGraderForm(forms.ModelForm):
+    class Meta:
+        model = AutoGrader
+        fields = ['harness', 'timeout', 'memory_limit', 'is_enabled']
+        widgets = {
+            'harness': forms.FileInput(attrs={'class': 'form-control', 'accept': '.py'}),
+            'timeout': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 300}),
+            'memory_limit': forms.NumberInput(attrs={'class': 'form-control', 'min': 32, 'max': 4096}),
+            'is_enabled': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
+        help_texts = {
+            'harness': 'Модуль unittest; робота студента доступна як solution.py (або вміст zip-архіву).',
+        }
+
+    def clean_timeout(self):
+        timeout = self.cleaned_data['timeout']
+        if not 1 <= timeout <= 300:
+            raise forms.ValidationError("Ліміт часу має бути від 1 до 300 секунд")
+        return timeout
+
+
+class EnrollmentImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label='CSV-файл',
+        help_text='Колонки: student_id, course_code, semester. Кодування UTF-8.'
+    )
+    dry_run = forms.BooleanField(required=False, label='Лише перевірити, нічого не записувати')
+
+
+class LinearCurveForm(forms.Form):
+    assignment = forms.ModelChoiceField(
+        queryset=Assignment.objects.none(), label='Завдання',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    target_mean = forms.FloatField(
+        min_value=0, label='Цільове середнє, балів',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'})
+    )
+    target_stdev = forms.FloatField(
+        required=False, min_value=0, label='Цільове стандартне відхилення',
+        help_text='Порожнє - лише зсув усіх балів.',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1'})
+    )
+
+    def __init__(self, *args, class_obj=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['assignment'].queryset = Assignment.objects.filter(class_obj=class_obj).select_related('class_obj__course')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        assignment, target_mean = cleaned_data.get('assignment'), cleaned_data.get('target_mean')
+        if assignment and target_mean is not None and target_mean > assignment.max_points:
+            raise forms.ValidationError(f"Середнє не може перевищувати максимальний бал ({assignment.max_points})")
+        return cleaned_data
+
+
+class LetterSharesForm(forms.Form):
+    share_a = forms.IntegerField(min_value=0, max_value=100, label='A, % студентів',
+                                 widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    share_b = forms.IntegerField(min_value=0, max_value=100, label='B, % студентів',
+                                 widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    share_c = forms.IntegerField(min_value=0, max_value=100, label='C, % студентів',
+                                 widget=forms.NumberInput(attrs={'class': 'form-control'}))
+    share_d = forms.IntegerField(min_value=0, max_value=100, label='D, % студентів',
+                                 widget=forms.NumberInput(attrs={'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        shares = [cleaned_data.get(f'share_{letter}') for letter in 'abcd']
+        if None not in shares and sum(shares) > 100:
+            raise forms.ValidationError("Сума часток A-D не може перевищувати 100%")
+        return cleaned_data
+
+    def shares(self):
+        return {letter.upper(): self.cleaned_data[f'share_{letter}'] for letter in 'abcd'}
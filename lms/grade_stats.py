@@ -0,0 +1,194 @@
+import math
+from array import array
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .feed import invalidate_assignment_feed
+from .models import LETTER_CUTOFFS, GradeCurve, StudentSubmission
+from .signals import announce_grade
+
+HISTOGRAM_BINS = 10
+PERCENTILES = (10, 25, 50, 75, 90)
+# Частки студентів (у відсотках) для кожної літери кривої за процентилями; решта отримує F
+DEFAULT_LETTER_SHARES = {'A': 10, 'B': 25, 'C': 30, 'D': 20}
+
+
+def assignment_scores(class_obj):
+    """Бали всіх оцінених робіт заняття одним запитом: {id завдання: array('d')}"""
+    scores = defaultdict(lambda: array('d'))
+    rows = StudentSubmission.all_objects.filter(
+        assignment__class_obj=class_obj, grade__isnull=False
+    ).values_list('assignment_id', 'grade').order_by()
+    for assignment_id, grade in rows.iterator():
+        scores[assignment_id].append(grade)
+    return scores
+
+
+def class_percentages(class_obj):
+    """Підсумковий відсоток кожного студента заняття за оціненими роботами: (id студентів, array('d'))"""
+    rows = StudentSubmission.all_objects.filter(
+        assignment__class_obj=class_obj, grade__isnull=False
+    ).values('student_id').annotate(
+        achieved=Sum('grade'), possible=Sum('assignment__max_points'),
+    ).filter(possible__gt=0).order_by('student_id')
+    student_ids, values = [], array('d')
+    for row in rows:
+        student_ids.append(row['student_id'])
+        values.append(row['achieved'] * 100 / row['possible'])
+    return student_ids, values
+
+
+def percentile(ordered, percent):
+    """Процентиль відсортованої послідовності з лінійною інтерполяцією між сусідніми значеннями"""
+    position = (len(ordered) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def mean_stdev(values):
+    """Середнє та стандартне відхилення сукупності: оцінені всі роботи, а не вибірка з них"""
+    mean = math.fsum(values) / len(values)
+    return mean, math.sqrt(math.fsum((value - mean) ** 2 for value in values) / len(values))
+
+
+def histogram(values, low, high, bins=HISTOGRAM_BINS):
+    """Кількість значень у bins рівних інтервалах [low, high]; значення поза межами - у крайніх"""
+    counts = array('l', bytes(array('l').itemsize * bins))
+    width = (high - low) / bins or 1
+    for value in values:
+        counts[min(max(int((value - low) / width), 0), bins - 1)] += 1
+    return counts
+
+
+def describe(values, low=0, high=100):
+    """Зведена статистика розподілу або None для порожнього"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    mean, stdev = mean_stdev(ordered)
+    return {
+        'count': len(ordered),
+        'mean': mean,
+        'median': percentile(ordered, 50),
+        'stdev': stdev,
+        'min': ordered[0],
+        'max': ordered[-1],
+        'percentiles': {f'p{percent}': percentile(ordered, percent) for percent in PERCENTILES},
+        'histogram': histogram(ordered, low, high),
+    }
+
+
+def z_scores(values):
+    """Відхилення кожного значення від середнього в одиницях стандартного відхилення"""
+    if not values:
+        return array('d')
+    mean, stdev = mean_stdev(values)
+    if not stdev:
+        return array('d', bytes(array('d').itemsize * len(values)))
+    return array('d', ((value - mean) / stdev for value in values))
+
+
+def linear_curve(values, target_mean, target_stdev=None):
+    """
+    Коефіцієнти (scale, shift) перетворення x -> scale * x + shift, після якого середнє
+    дорівнює target_mean, а за заданого target_stdev - і стандартне відхилення.
+    Без target_stdev розподіл лише зсувається.
+    """
+    mean, stdev = mean_stdev(values)
+    scale = target_stdev / stdev if target_stdev is not None and stdev else 1.0
+    return scale, target_mean - scale * mean
+
+
+def percentile_cutoffs(values, shares=None):
+    """Межі A-D за частками студентів: при частці A 10% межа A - 90-й процентиль розподілу"""
+    shares = shares or DEFAULT_LETTER_SHARES
+    ordered = sorted(values)
+    cutoffs, cumulative = [], 0
+    for _, letter in LETTER_CUTOFFS:
+        cumulative += shares[letter]
+        cutoffs.append((round(percentile(ordered, max(100 - cumulative, 0)), 2), letter))
+    return cutoffs
+
+
+def letter_grade(percentage, cutoffs=LETTER_CUTOFFS):
+    """Буквена оцінка за відсотком і межами (від найвищої до найнижчої)"""
+    for threshold, letter in cutoffs:
+        if percentage >= threshold:
+            return letter
+    return 'F'
+
+
+def apply_linear_curve(assignment, target_mean, target_stdev=None):
+    """
+    Криву завжди рахує від оцінки до кривої (raw_grade), тож повторне застосування не накопичується.
+    Нові бали округлюються й обмежуються [0, max_points]; запис - одним bulk_update.
+    Повертає кількість змінених робіт.
+    """
+    submissions = list(
+        StudentSubmission.all_objects.filter(assignment=assignment, grade__isnull=False)
+        .select_related('assignment').order_by('pk')
+    )
+    if not submissions:
+        return 0
+    raw = array('d', (
+        submission.grade if submission.raw_grade is None else submission.raw_grade for submission in submissions
+    ))
+    scale, shift = linear_curve(raw, target_mean, target_stdev)
+
+    changed = []
+    for submission, value in zip(submissions, raw):
+        grade = min(max(round(scale * value + shift), 0), assignment.max_points)
+        if submission.raw_grade is None:
+            submission.raw_grade = submission.grade
+        if grade != submission.grade:
+            submission.grade = grade
+            changed.append(submission)
+
+    with transaction.atomic():
+        StudentSubmission.all_objects.bulk_update(submissions, ['grade', 'raw_grade'], batch_size=1000)
+        # bulk_update не надсилає post_save: стрічки й сповіщення - явно
+        transaction.on_commit(lambda: _announce(changed))
+    return len(changed)
+
+
+def reset_linear_curve(assignment):
+    """Повертає оцінки до кривої одним UPDATE; змінені оцінки оголошуються, як і в apply_linear_curve"""
+    submissions = StudentSubmission.all_objects.filter(assignment=assignment, raw_grade__isnull=False)
+    changed = []
+    for submission in submissions.select_related('assignment').order_by('pk'):
+        if submission.grade != submission.raw_grade:
+            submission.grade = submission.raw_grade
+            changed.append(submission)
+    with transaction.atomic():
+        restored = submissions.update(grade=F('raw_grade'), raw_grade=None)
+        # update() не надсилає post_save: стрічки, блоки оцінок і сповіщення - явно
+        transaction.on_commit(lambda: _announce(changed))
+    return restored
+
+
+def apply_percentile_cutoffs(class_obj, shares=None):
+    """Зберігає межі за процентилями в GradeCurve заняття; None, якщо оцінених робіт ще немає"""
+    _, values = class_percentages(class_obj)
+    if not values:
+        return None
+    (cutoff_a, _), (cutoff_b, _), (cutoff_c, _), (cutoff_d, _) = percentile_cutoffs(values, shares)
+    curve, _ = GradeCurve.objects.update_or_create(class_obj=class_obj, defaults={
+        'cutoff_a': cutoff_a, 'cutoff_b': cutoff_b, 'cutoff_c': cutoff_c, 'cutoff_d': cutoff_d,
+    })
+    return curve
+
+
+def curved_assignments(class_obj):
+    """id завдань заняття, до яких застосовано криву"""
+    return set(StudentSubmission.all_objects.filter(
+        assignment__class_obj=class_obj, raw_grade__isnull=False,
+    ).values_list('assignment_id', flat=True).distinct())
+
+
+def _announce(submissions):
+    invalidate_assignment_feed({submission.student_id for submission in submissions})
+    for submission in submissions:
+        announce_grade(submission)
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from lms.archive import archive_class, closed_semester_classes, finish_semester
+from lms.models import Semester
+
+
+class Command(BaseCommand):
+    help = ('Переносить дані закритих семестрів в архівні таблиці по одному заняттю за транзакцію. '
+            'Залікові книжки лишаються доступними для перегляду')
+
+    def add_arguments(self, parser):
+        parser.add_argument('semesters', nargs='*', help='Назви семестрів (за замовчуванням - усі закриті)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Рядків в одному INSERT')
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help='Пауза між заняттями в секундах, щоб пропустити інші записи')
+        parser.add_argument('--dry-run', action='store_true', help='Лише показати, що буде перенесено')
+
+    def handle(self, *args, **options):
+        semesters = Semester.objects.filter(is_active=False, archived_at__isnull=True)
+        if options['semesters']:
+            semesters = Semester.objects.filter(name__in=options['semesters'])
+            active = semesters.filter(is_active=True).values_list('name', flat=True)
+            if active:
+                raise CommandError(f"Активні семестри не архівуються: {', '.join(active)}")
+
+        for semester in semesters:
+            classes = list(closed_semester_classes(semester))
+            if options['dry_run']:
+                self.stdout.write(f'{semester}: занять до архівації - {len(classes)}')
+                continue
+
+            enrollments = submissions = 0
+            for class_obj in classes:
+                archived = archive_class(class_obj, options['batch_size'])
+                enrollments += archived[0]
+                submissions += archived[1]
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+            finish_semester(semester)
+            self.stdout.write(self.style.SUCCESS(
+                f'{semester}: занять {len(classes)}, записів {enrollments}, робіт {submissions}'
+            ))
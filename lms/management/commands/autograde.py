@@ -0,0 +1,89 @@
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from lms.autograder import claim_jobs, queue_metrics, requeue_stale, run_job, sandbox_prefix, save_results
+
+logger = logging.getLogger(__name__)
+
+
+def seconds(value):
+    return '-' if value is None else f'{value:.2f} с'
+
+
+class Command(BaseCommand):
+    help = ('Воркер автоперевірки: запускає роботи з черги в ізольованих підпроцесах '
+            '(не більше --workers одночасно) і пакетами записує оцінки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Одночасних пісочниць')
+        parser.add_argument('--batch-size', type=int, default=50, help='Результатів в одному записі в БД')
+        parser.add_argument('--interval', type=float, default=5.0, help='Пауза, коли черга порожня, в секундах')
+        parser.add_argument('--once', action='store_true', help='Розібрати чергу і завершитись')
+        parser.add_argument('--stats', action='store_true', help='Лише показати метрики черги')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.write_metrics()
+            return
+
+        try:
+            self.stdout.write(f"Пісочниця: {' '.join(sandbox_prefix())}")
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        # Потоки лише чекають на підпроцеси, тож пул потоків обмежує кількість одночасних пісочниць
+        with ThreadPoolExecutor(options['workers']) as executor:
+            while True:
+                try:
+                    processed = self.run_cycle(executor, options)
+                except Exception:
+                    if options['once']:
+                        raise
+                    logger.exception('Помилка автоперевірки')
+                    processed = 0
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+
+    def run_cycle(self, executor, options):
+        started = time.perf_counter()
+        requeue_stale()
+        in_flight, results = {}, []
+        processed = graded = 0
+        while True:
+            # Черга пулу тримається заповненою, щойно звільняється пісочниця
+            free = options['workers'] - len(in_flight)
+            if free > 0:
+                for job in claim_jobs(free):
+                    in_flight[executor.submit(run_job, job)] = job
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                results.append((in_flight.pop(future), future.result()))
+            if len(results) >= options['batch_size'] or not in_flight:
+                graded += save_results(results)
+                processed += len(results)
+                results = []
+
+        if processed:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Перевірено: {processed} (оцінено {graded}) за {elapsed:.1f} с, '
+                f'{processed / elapsed * 3600:.0f} робіт/год'
+            )
+            self.write_metrics()
+        return processed
+
+    def write_metrics(self):
+        metrics = queue_metrics()
+        self.stdout.write(
+            f"Черга: {metrics['queued']}, виконується: {metrics['running']}, "
+            f"за годину: {metrics['finished']}; час у пісочниці p50 {seconds(metrics['run_p50'])}, "
+            f"p95 {seconds(metrics['run_p95'])}; очікування p50 {seconds(metrics['wait_p50'])}"
+        )
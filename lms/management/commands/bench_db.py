@@ -0,0 +1,107 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, OperationalError
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from lms.models import Assignment, Class, Notification, StudentSubmission
+
+BENCH_PREFIX = '[bench]'
+
+
+class Command(BaseCommand):
+    help = ('Навантажувальний тест поточного профілю БД: паралельні читання (звіти оцінок) '
+            'та записи (сплеск здачі робіт перед дедлайном)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Кількість паралельних клієнтів')
+        parser.add_argument('--duration', type=float, default=10.0, help='Тривалість у секундах')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Частка операцій запису (0..1)')
+
+    def handle(self, *args, **options):
+        class_obj = Class.objects.first()
+        if class_obj is None:
+            raise CommandError('У базі немає занять. Спочатку виконайте populate_db.')
+
+        db = settings.DATABASES['default']
+        self.stdout.write(f"Профіль: {connection.vendor} ({db['NAME']}), OPTIONS={db.get('OPTIONS', {})}")
+        if connection.vendor == 'sqlite':
+            self.stdout.write(f"PRAGMA: {getattr(settings, 'SQLITE_PRAGMAS', {}) or 'за замовчуванням'}")
+
+        deadline = time.monotonic() + options['duration']
+        results = {'read': [], 'write': [], 'errors': 0}
+        lock = threading.Lock()
+
+        def worker():
+            rng = random.Random()
+            latencies = {'read': [], 'write': []}
+            errors = 0
+            try:
+                while time.monotonic() < deadline:
+                    kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    started = time.perf_counter()
+                    try:
+                        if kind == 'write':
+                            self.write_op(class_obj)
+                        else:
+                            self.read_op()
+                    except OperationalError:
+                        # "database is locked" та подібні помилки конкуренції
+                        errors += 1
+                        continue
+                    latencies[kind].append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                results['read'].extend(latencies['read'])
+                results['write'].extend(latencies['write'])
+                results['errors'] += errors
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        Assignment.all_objects.filter(title__startswith=BENCH_PREFIX).delete()
+        # Про всяк випадок: сповіщення про тестові завдання не повинні піти в дайджести
+        Notification.objects.filter(title__contains=BENCH_PREFIX).delete()
+
+        for kind in ('read', 'write'):
+            self.report(kind, results[kind], options['duration'])
+        style = self.style.ERROR if results['errors'] else self.style.SUCCESS
+        self.stdout.write(style(f"Помилок блокування: {results['errors']}"))
+
+    def read_op(self):
+        """Агрегація оцінок, як у professor_grades/student_grades"""
+        list(StudentSubmission.objects.with_grade_stats().values('assignment__class_obj').annotate(
+            average=Avg('grade'),
+            late=Count('id', filter=Q(is_late=True)),
+        ))
+
+    def write_op(self, class_obj):
+        """
+        Короткий запис, що імітує здачу роботи. bulk_create не надсилає post_save: інакше кожне тестове
+        завдання ставило б у чергу сповіщення й push для справжніх студентів заняття
+        """
+        Assignment.objects.bulk_create([Assignment(
+            title=f'{BENCH_PREFIX} {threading.get_ident()}',
+            description='',
+            class_obj=class_obj,
+            due_date=timezone.now(),
+        )])
+
+    def report(self, kind, latencies, duration):
+        if not latencies:
+            self.stdout.write(f'{kind}: немає вдалих операцій')
+            return
+        latencies = sorted(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f'{kind}: {len(latencies) / duration:.1f} оп/с, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, p95 {p95 * 1000:.1f} мс'
+        )
@@ -0,0 +1,85 @@
+import asyncio
+import statistics
+import time
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from lms.models import CourseMaterial
+
+
+class Command(BaseCommand):
+    help = ('Порівняння WSGI та ASGI розгортання: багато повільних клієнтів завантажують матеріал, '
+            'а паралельно вимірюється затримка легкої сторінки. Сервер запускається окремо.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адреса запущеного сервера')
+        parser.add_argument('--username', default='student1', help='Користувач, від імені якого йдуть запити')
+        parser.add_argument('--material', type=int, help='ID матеріалу (за замовчуванням - перший доступний)')
+        parser.add_argument('--clients', type=int, default=50, help='Кількість повільних завантажень')
+        parser.add_argument('--chunk-delay', type=float, default=0.05,
+                            help='Пауза клієнта після кожного прочитаного блоку, с')
+        parser.add_argument('--probes', type=int, default=20, help='Кількість запитів до легкої сторінки')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Користувача {options['username']} не знайдено. Виконайте populate_db.")
+
+        material = CourseMaterial.objects.filter(pk=options['material']).first() if options['material'] else \
+            CourseMaterial.objects.filter(class_obj__enrollment__student__user=user).first()
+        if material is None:
+            raise CommandError('Немає доступного матеріалу для завантаження.')
+
+        cookies = {settings.SESSION_COOKIE_NAME: self.create_session(user)}
+        download_url = options['url'] + reverse('download_material', args=[material.pk])
+        probe_url = options['url'] + reverse('student_assignments')
+
+        downloads, probes = asyncio.run(self.run(cookies, download_url, probe_url, options))
+
+        self.stdout.write(f"Завантажень: {len(downloads)}, повільний клієнт: {options['chunk_delay']} с/блок")
+        self.stdout.write(f"  тривалість: медіана {statistics.median(downloads):.2f} с, макс {max(downloads):.2f} с")
+        self.stdout.write(f"Легка сторінка під час завантажень ({len(probes)} запитів):")
+        self.stdout.write(f"  затримка: медіана {statistics.median(probes) * 1000:.0f} мс, "
+                          f"макс {max(probes) * 1000:.0f} мс")
+
+    def create_session(self, user):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session.session_key
+
+    async def run(self, cookies, download_url, probe_url, options):
+        limits = httpx.Limits(max_connections=options['clients'] + 10)
+        async with httpx.AsyncClient(cookies=cookies, limits=limits, timeout=300) as client:
+            async def slow_download():
+                started = time.perf_counter()
+                async with client.stream('GET', download_url) as response:
+                    response.raise_for_status()
+                    async for _ in response.aiter_bytes(16 * 1024):
+                        await asyncio.sleep(options['chunk_delay'])
+                return time.perf_counter() - started
+
+            async def probe():
+                # Даємо завантаженням зайняти сервер, потім вимірюємо легкі запити
+                await asyncio.sleep(0.5)
+                latencies = []
+                for _ in range(options['probes']):
+                    started = time.perf_counter()
+                    response = await client.get(probe_url)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                    await asyncio.sleep(0.1)
+                return latencies
+
+            tasks = [asyncio.create_task(slow_download()) for _ in range(options['clients'])]
+            probes = await probe()
+            downloads = await asyncio.gather(*tasks)
+        return downloads, probes
@@ -0,0 +1,154 @@
+import queue
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.urls import reverse
+from django.utils import timezone
+from lms.models import Class, Course, Enrollment, Faculty, Professor, Semester, Student, WaitlistEntry
+from lms.registration import DROPPED, ENROLLED, WAITLISTED, drop, register
+
+BENCH_PREFIX = 'bench_reg_'
+
+
+class Command(BaseCommand):
+    help = ('Навантажувальний тест відкриття реєстрації: студенти одночасно записуються на одне заняття '
+            'з обмеженою кількістю місць, частина потім скасовує запис. Перевіряє, що місць не продано '
+            'більше, ніж є, і що черга просувається по порядку')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help='Кількість студентів, що реєструються')
+        parser.add_argument('--capacity', type=int, default=300, help='Кількість місць на занятті')
+        parser.add_argument('--threads', type=int, default=16, help='Кількість паралельних клієнтів')
+        parser.add_argument('--drops', type=int, default=50, help='Скільки записаних потім скасують запис')
+
+    def handle(self, *args, **options):
+        semester = Semester.objects.filter(is_active=True).first()
+        course, professor, faculty = Course.objects.first(), Professor.objects.first(), Faculty.objects.first()
+        if None in (semester, course, professor, faculty):
+            raise CommandError('У базі немає семестру, курсу чи викладача. Спочатку виконайте populate_db.')
+
+        db = settings.DATABASES['default']
+        self.stdout.write(f"Профіль: {connection.vendor} ({db['NAME']}), OPTIONS={db.get('OPTIONS', {})}")
+
+        # Резолвер URL будується при першому reverse(); на сервері це відбувається до піку навантаження
+        reverse('class_registration')
+        class_obj = Class.objects.create(
+            course=course, professor=professor, semester=semester, schedule='[bench]', classroom='-',
+            capacity=options['capacity'], registration_opens_at=timezone.now() - timedelta(minutes=1),
+        )
+        students = self.create_students(options['students'], faculty)
+        try:
+            registered = self.run_phase('Реєстрація', students, register, class_obj.id, options['threads'])
+            ok = self.check_registration(class_obj, registered, options['capacity'])
+
+            waitlist_before = list(WaitlistEntry.objects.filter(class_obj=class_obj).values_list('student_id', flat=True))
+            enrolled = list(Enrollment.objects.filter(class_enrolled=class_obj).values_list('student', flat=True))
+            leaving = random.sample(enrolled, min(options['drops'], len(enrolled)))
+            dropped = self.run_phase('Скасування', Student.objects.filter(pk__in=leaving), drop, class_obj.id,
+                                     options['threads'])
+            ok &= self.check_promotion(class_obj, dropped, len(enrolled), waitlist_before, options['capacity'])
+        finally:
+            class_obj.delete()
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+
+        if ok:
+            self.stdout.write(self.style.SUCCESS('Перевірку пройдено: місць не перепродано, черга впорядкована'))
+        else:
+            raise CommandError('Перевірку не пройдено')
+
+    def create_students(self, count, faculty):
+        User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        users = User.objects.bulk_create(
+            [User(username=f'{BENCH_PREFIX}{index}') for index in range(count)], batch_size=1000)
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__startswith=BENCH_PREFIX).order_by('pk'))
+        Student.objects.bulk_create([
+            Student(user=user, student_id=f'BR{index:06d}', faculty=faculty, enrollment_date=date.today())
+            for index, user in enumerate(users)
+        ], batch_size=1000)
+        return list(Student.objects.filter(user__username__startswith=BENCH_PREFIX))
+
+    def run_phase(self, title, students, action, class_id, threads):
+        """Усі клієнти стартують одночасно; повертає Counter результатів"""
+        pending = queue.SimpleQueue()
+        for student in students:
+            pending.put(student)
+        start = threading.Barrier(threads)
+        lock = threading.Lock()
+        latencies, outcomes = [], Counter()
+
+        def worker():
+            local_latencies, local_outcomes = [], Counter()
+            try:
+                start.wait()
+                while True:
+                    try:
+                        student = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    started = time.perf_counter()
+                    try:
+                        local_outcomes[action(student, class_id)] += 1
+                    except OperationalError:
+                        # "database is locked": запит відхилено, але стан заняття не зіпсовано
+                        local_outcomes['error'] += 1
+                        continue
+                    local_latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_latencies)
+                outcomes.update(local_outcomes)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        if latencies:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f'{title}: {len(latencies)} запитів за {elapsed:.2f} с, {len(latencies) / elapsed:.0f} оп/с, '
+                f'p50 {statistics.median(latencies) * 1000:.1f} мс, p95 {p95 * 1000:.1f} мс'
+            )
+        self.stdout.write(f'  результати: {dict(outcomes)}')
+        return outcomes
+
+    def check_registration(self, class_obj, outcomes, capacity):
+        enrolled = Enrollment.objects.filter(class_enrolled=class_obj).count()
+        waitlisted = WaitlistEntry.objects.filter(class_obj=class_obj).count()
+        accepted = outcomes[ENROLLED] + outcomes[WAITLISTED]
+        self.stdout.write(f'  записано {enrolled} з {capacity} місць, у черзі {waitlisted}')
+        return self.expect(
+            enrolled == outcomes[ENROLLED] == min(capacity, accepted) and waitlisted == outcomes[WAITLISTED],
+            'кількість записів не збігається з місткістю та відповідями клієнтам',
+        )
+
+    def check_promotion(self, class_obj, outcomes, enrolled_before, waitlist_before, capacity):
+        promoted = waitlist_before[:outcomes[DROPPED]]
+        enrolled = set(Enrollment.objects.filter(class_enrolled=class_obj).values_list('student', flat=True))
+        waitlist_after = list(WaitlistEntry.objects.filter(class_obj=class_obj).values_list('student_id', flat=True))
+        self.stdout.write(f'  з черги записано {len(promoted)}, записано {len(enrolled)} з {capacity}')
+        return self.expect(
+            len(enrolled) == enrolled_before - outcomes[DROPPED] + len(promoted) <= capacity
+            and enrolled.issuperset(promoted)
+            and waitlist_after == waitlist_before[len(promoted):],
+            'черга просунулася не по порядку або місць перепродано',
+        )
+
+    def expect(self, condition, message):
+        if not condition:
+            self.stdout.write(self.style.ERROR(f'  ПОМИЛКА: {message}'))
+        return condition
@@ -0,0 +1,124 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, RequestFactory
+from django.test.utils import ContextList, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from lms.models import Assignment
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+CACHED_LOADERS = [('django.template.loaders.cached.Loader', UNCACHED_LOADERS)]
+
+# (користувач, сторінка, аргументи URL)
+PAGES = [
+    ('student1', 'home', []),
+    ('student1', 'student_dashboard', []),
+    ('student1', 'student_assignments', []),
+    ('student1', 'student_grades', []),
+    ('student1', 'class_materials', [1]),
+    ('professor1', 'professor_dashboard', []),
+    ('professor1', 'professor_grades', []),
+]
+
+# Таблиця термінів: фільтри на кожен рядок (кожен викликає timezone.now()) проти пакетного тегу
+PER_ROW_TABLE = '''{% load lms_filters %}<table>{% for a in assignments %}<tr>
+<td>{{ a.title }}</td><td>{{ a.due_date|date:"d.m.Y H:i" }}</td>
+<td>{% if a.due_date|is_past_due %}Прострочено{% else %}{{ a.due_date|days_until }} дн.{% endif %}</td>
+</tr>{% endfor %}</table>'''
+BATCH_TABLE = '''{% load lms_filters %}{% due_states assignments as rows %}<table>{% for a in rows %}<tr>
+<td>{{ a.title }}</td><td>{{ a.due_date|date:"d.m.Y H:i" }}</td>
+<td>{% if a.is_past_due %}Прострочено{% else %}{{ a.days_left }} дн.{% endif %}</td>
+</tr>{% endfor %}</table>'''
+
+
+class Command(BaseCommand):
+    help = ('Час рендерингу шаблонів сторінок з cached.Loader, який Django 4.1+ використовує за замовчуванням, '
+            'проти завантажувачів без кешу, тобто скільки коштувала б компіляція шаблону на кожен запит. '
+            'Контекст знімається зі справжніх відповідей, тож запити до БД у замір не входять')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Рендерів кожної сторінки')
+        parser.add_argument('--rows', type=int, default=1000, help='Рядків у таблиці термінів')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            captured = [self.capture(*page) for page in PAGES]
+        finally:
+            teardown_test_environment()
+
+        backends = {
+            'без кешу': self.make_backend(UNCACHED_LOADERS),
+            'cached.Loader': self.make_backend(CACHED_LOADERS),
+        }
+        self.stdout.write(f"{'сторінка':<24}{'HTML':>10}" + ''.join(f'{name:>16}' for name in backends))
+        totals = {name: 0.0 for name in backends}
+        for name, template_name, context, request in captured:
+            size = len(backends['без кешу'].get_template(template_name).render(context, request).encode())
+            row = f'{name:<24}{size // 1024:>7} КБ'
+            for backend_name, backend in backends.items():
+                timing = self.measure(backend, template_name, context, request, options['iterations'])
+                totals[backend_name] += timing
+                row += f'{timing * 1000:>13.2f} мс'
+            self.stdout.write(row)
+        self.stdout.write(f"{'разом':<34}" + ''.join(f'{totals[name] * 1000:>13.2f} мс' for name in backends))
+
+        self.bench_due_table(options['rows'], max(options['iterations'] // 10, 5))
+
+    def bench_due_table(self, rows, iterations):
+        now = timezone.now()
+        assignments = [
+            Assignment(title=f'Завдання {i}', due_date=now + timedelta(hours=i - rows // 2))
+            for i in range(rows)
+        ]
+        request = RequestFactory().get('/')
+        engine = engines['django']
+        self.stdout.write(f'\nТаблиця термінів, {rows} рядків:')
+        for label, source in (('фільтри на рядок', PER_ROW_TABLE), ('тег due_states', BATCH_TABLE)):
+            template = engine.from_string(source)
+            timings = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                template.render({'assignments': assignments}, request)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(f'  {label:<20}{statistics.median(timings) * 1000:>10.2f} мс')
+
+    def capture(self, username, url_name, args):
+        """Виконує запит і повертає шаблон сторінки та контекст, з яким його рендерили"""
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f'Користувача {username} не знайдено. Виконайте populate_db.')
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse(url_name, args=args))
+        if response.status_code != 200 or not response.templates:
+            raise CommandError(f'{url_name}: відповідь {response.status_code}')
+        contexts = response.context
+        context = (contexts[0] if isinstance(contexts, ContextList) else contexts).flatten()
+        return url_name, response.templates[0].name, context, response.wsgi_request
+
+    def make_backend(self, loaders):
+        options = dict(settings.TEMPLATES[0]['OPTIONS'], loaders=loaders)
+        return DjangoTemplates({
+            'NAME': 'bench', 'DIRS': settings.TEMPLATES[0]['DIRS'], 'APP_DIRS': False, 'OPTIONS': options,
+        })
+
+    def measure(self, backend, template_name, context, request, iterations):
+        # Як render(): шаблон щоразу береться з завантажувача
+        backend.get_template(template_name).render(context, request)
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            backend.get_template(template_name).render(context, request)
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings)
@@ -0,0 +1,66 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from lms.models import Assignment
+from lms.similarity import fingerprint_submissions, pending_submissions, rebuild_pairs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Воркер пошуку схожих робіт: рахує MinHash-підписи нових робіт у пулі процесів '
+            'і перебудовує LSH-звіти завдань, до яких вони належать')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Робіт в одному пакеті')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процесів для обчислення підписів (1 - без пулу)')
+        parser.add_argument('--interval', type=float, default=60.0, help='Пауза між циклами в секундах')
+        parser.add_argument('--once', action='store_true', help='Виконати один цикл і завершитись')
+        parser.add_argument('--assignment', type=int, action='append',
+                            help='Лише перебудувати звіт цього завдання (можна кілька разів)')
+
+    def handle(self, *args, **options):
+        if options['assignment']:
+            for assignment in Assignment.all_objects.filter(pk__in=options['assignment']).select_related('class_obj'):
+                self.stdout.write(f'{assignment}: пар {rebuild_pairs(assignment)}')
+            return
+
+        executor = ProcessPoolExecutor(options['workers']) if options['workers'] > 1 else None
+        try:
+            while True:
+                try:
+                    self.run_cycle(executor, options)
+                except Exception:
+                    if options['once']:
+                        raise
+                    # Роботи без підпису лишаються в черзі, наступний цикл спробує ще раз
+                    logger.exception('Помилка пошуку схожих робіт')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def run_cycle(self, executor, options):
+        started = time.perf_counter()
+        map_func = (lambda func, items: executor.map(func, items, chunksize=8)) if executor else map
+        assignment_ids = set()
+        fingerprinted = 0
+        while submissions := pending_submissions(options['batch_size']):
+            assignment_ids |= fingerprint_submissions(submissions, map_func)
+            fingerprinted += len(submissions)
+
+        pairs = 0
+        for assignment in Assignment.all_objects.filter(pk__in=assignment_ids).select_related('class_obj'):
+            pairs += rebuild_pairs(assignment)
+
+        if fingerprinted or options['verbosity'] > 1:
+            self.stdout.write(
+                f'Підписів: {fingerprinted}, звітів: {len(assignment_ids)}, пар: {pairs} '
+                f'за {time.perf_counter() - started:.2f} с'
+            )
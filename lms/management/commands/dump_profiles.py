@@ -0,0 +1,70 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from lms.profiling import load_profiles, make_token, top_functions
+
+
+class Command(BaseCommand):
+    help = ('Зведені профілі запитів (lms.profiling.ProfilingMiddleware) усіх процесів за іменем URL: '
+            'найдорожчі функції та collapsed stacks для flamegraph.pl чи speedscope')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help="Лише це ім'я URL (напр. professor_grades)")
+        parser.add_argument('--limit', type=int, default=20, help='Скільки функцій показати')
+        parser.add_argument('--output', metavar='DIR',
+                            help="Записати в каталог <ім'я URL>.collapsed (семплер; flamegraph.pl x.collapsed > x.svg, "
+                                 "speedscope) або зведений <ім'я URL>.prof (cProfile; snakeviz, flameprof)")
+        parser.add_argument('--clear', action='store_true', help='Видалити зібрані профілі після виводу')
+        parser.add_argument('--token', action='store_true',
+                            help='Вивести заголовок, з яким запит профілюється поза вибіркою, і завершитись')
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(f'X-Profile: {make_token()}')
+            return
+
+        stacks, stats, requests = load_profiles(options['view'])
+        if not requests:
+            raise CommandError(f'У {settings.PROFILING_DIR} немає профілів. Увімкніть LMS_PROFILING=1.')
+
+        if options['output']:
+            os.makedirs(options['output'], exist_ok=True)
+
+        for view_name, totals in sorted(requests.items(), key=lambda item: -item[1]['seconds']):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{view_name}: запитів {totals['requests']}, "
+                f"у середньому {totals['seconds'] / totals['requests'] * 1000:.1f} мс"
+            ))
+            # cProfile зберігає лише пари виклик-викликаний, тож collapsed stacks дає тільки семплер
+            if stacks[view_name]:
+                self.write_samples(stacks[view_name], options['limit'])
+                if options['output']:
+                    path = os.path.join(options['output'], f'{view_name}.collapsed')
+                    with open(path, 'w', encoding='utf-8') as file:
+                        file.writelines(f'{stack} {count}\n' for stack, count in sorted(stacks[view_name].items()))
+                    self.stdout.write(f'  -> {path}')
+            if view_name in stats:
+                self.write_cprofile(stats[view_name], options['limit'])
+                if options['output']:
+                    path = os.path.join(options['output'], f'{view_name}.prof')
+                    stats[view_name].dump_stats(path)
+                    self.stdout.write(f'  -> {path}')
+
+        if options['clear']:
+            shutil.rmtree(settings.PROFILING_DIR, ignore_errors=True)
+
+    def write_samples(self, stacks, limit):
+        total = sum(stacks.values())
+        if not total:
+            return
+        self.stdout.write(f'  семплів {total} (кожні {settings.PROFILING_INTERVAL * 1000:g} мс); власні / з викликаними:')
+        for frame, own, inclusive in top_functions(stacks, limit):
+            self.stdout.write(f'  {own / total:6.1%} {inclusive / total:6.1%}  {frame}')
+
+    def write_cprofile(self, stats, limit):
+        self.stdout.write('  cProfile, с; власний час / з викликаними / викликів:')
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:limit]
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows:
+            self.stdout.write(f'  {own:8.4f} {cumulative:8.4f} {calls:7d}  {name} ({filename}:{line})')
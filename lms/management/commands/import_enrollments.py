@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from lms.enrollment_import import import_enrollments, write_skipped
+
+
+class Command(BaseCommand):
+    help = 'Масовий запис студентів на заняття з CSV (колонки: student_id, course_code, semester)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Шлях до CSV-файлу в UTF-8')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Рядків в одному INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Лише перевірити файл, нічого не записувати')
+        parser.add_argument('--skipped', help='Зберегти пропущені рядки в цей CSV')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                result = import_enrollments(csv_file, options['batch_size'], options['dry_run'])
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        verb = 'Буде створено' if options['dry_run'] else 'Створено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} записів: {result.created} за {time.perf_counter() - started:.1f} с'
+        ))
+        for reason, count in result.summary().most_common():
+            self.stdout.write(self.style.WARNING(f'Пропущено ({reason}): {count}'))
+
+        if options['skipped'] and result.skipped:
+            with open(options['skipped'], 'w', newline='', encoding='utf-8') as output:
+                write_skipped(result, output)
+            self.stdout.write(f"Пропущені рядки збережено в {options['skipped']}")
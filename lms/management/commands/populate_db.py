@@ -1,3 +1,5 @@
+from datetime import date
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from lms.models import *
@@ -208,12 +210,17 @@ class Command(BaseCommand):
             }
         )
 
-        # Створення занять
+        # Створення семестру та занять
+        spring_2024, created = Semester.objects.get_or_create(
+            name="Весна 2024",
+            defaults={'start_date': date(2024, 2, 1), 'end_date': date(2024, 6, 30)}
+        )
+
         class1, created = Class.objects.get_or_create(
             course=course1,
             professor=professor1,
             defaults={
-                'semester': "Весна 2024",
+                'semester': spring_2024,
                 'schedule': "Пн 10:00-11:30, Ср 10:00-11:30",
                 'classroom': "Ауд. 101"
             }
@@ -223,7 +230,7 @@ class Command(BaseCommand):
             course=course2,
             professor=professor1,
             defaults={
-                'semester': "Весна 2024",
+                'semester': spring_2024,
                 'schedule': "Вт 14:00-15:30, Чт 14:00-15:30",
                 'classroom': "Ауд. 102"
             }
@@ -233,7 +240,7 @@ class Command(BaseCommand):
             course=course3,
             professor=professor2,
             defaults={
-                'semester': "Весна 2024",
+                'semester': spring_2024,
                 'schedule': "Пн 12:00-13:30, Ср 12:00-13:30",
                 'classroom': "Ауд. 103"
             }
@@ -243,7 +250,7 @@ class Command(BaseCommand):
             course=course5,
             professor=professor3,
             defaults={
-                'semester': "Весна 2024",
+                'semester': spring_2024,
                 'schedule': "Пт 10:00-12:30",
                 'classroom': "Ауд. 201"
             }
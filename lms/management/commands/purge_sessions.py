@@ -0,0 +1,29 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Видаляє прострочені сесії пакетами, не блокуючи таблицю надовго'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Кількість рядків в одному DELETE')
+        parser.add_argument('--sleep', type=float, default=0.05,
+                            help='Пауза між пакетами в секундах, щоб пропустити інші записи')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        total = 0
+        while True:
+            keys = list(Session.objects.filter(expire_date__lt=now).values_list(
+                'session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total += deleted
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Видалено прострочених сесій: {total}'))
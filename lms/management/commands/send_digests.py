@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from lms.digest import (
+    FakeTelegramTransport, TelegramChannel, dispatch_batch, enqueue_deadline_reminders, get_channels
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = ('Воркер сповіщень: ставить у чергу нагадування про терміни та розсилає '
+            'накопичені події пакетними дайджестами (пошта, Telegram)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Отримувачів в одному пакеті')
+        parser.add_argument('--interval', type=float, default=60.0, help='Пауза між циклами в секундах')
+        parser.add_argument('--once', action='store_true', help='Виконати один цикл і завершитись')
+        parser.add_argument('--fake-telegram', action='store_true',
+                            help='Додати Telegram-канал з локальним транспортом (для тестів і замірів)')
+
+    def handle(self, *args, **options):
+        channels = get_channels()
+        if options['fake_telegram']:
+            channels = [c for c in channels if not isinstance(c, TelegramChannel)]
+            channels.append(TelegramChannel(FakeTelegramTransport(), rate_limit=0))
+
+        while True:
+            try:
+                self.run_cycle(channels, options)
+            except Exception:
+                if options['once']:
+                    raise
+                # Непрочитані події лишаються в черзі, наступний цикл спробує ще раз
+                logger.exception('Помилка розсилки дайджестів')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def run_cycle(self, channels, options):
+        started = time.perf_counter()
+        reminders = enqueue_deadline_reminders()
+        recipients = 0
+        while True:
+            sent = dispatch_batch(channels, options['batch_size'])
+            recipients += sent
+            if sent < options['batch_size']:
+                break
+
+        elapsed = time.perf_counter() - started
+        if recipients or reminders or options['verbosity'] > 1:
+            self.stdout.write(
+                f'Нагадувань у черзі: {reminders}, дайджестів: {recipients} '
+                f'за {elapsed:.2f} с ({recipients / elapsed:.0f} отримувачів/с)'
+            )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from lms.models import Semester
+from lms.timetable import format_report, solve_semester, unscheduled_classes
+
+
+class Command(BaseCommand):
+    help = ('Складає розклад семестру: розподіляє пари занять по слотах сітки й аудиторіях так, '
+            'щоб студенти й викладачі не мали збігів. За замовчуванням інкрементально - переставляє '
+            'лише заняття без повного розкладу, решта лишається на місці')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semester', action='append',
+                            help='Назва семестру (можна кілька разів); за замовчуванням - активні')
+        parser.add_argument('--classes', type=int, nargs='+', help='Переставити лише ці заняття')
+        parser.add_argument('--full', action='store_true', help='Переставити всі заняття семестру')
+        parser.add_argument('--time-limit', type=float, default=120.0, help='Секунд на семестр')
+        parser.add_argument('--seed', type=int, help='Зерно випадковості для відтворюваних результатів')
+        parser.add_argument('--dry-run', action='store_true', help='Лише показати результат, не зберігати')
+
+    def handle(self, *args, **options):
+        if options['classes'] and options['full']:
+            raise CommandError('--classes і --full не поєднуються')
+        semesters = Semester.objects.all()
+        semesters = semesters.filter(name__in=options['semester']) if options['semester'] else semesters.filter(
+            is_active=True)
+        if not semesters:
+            raise CommandError('Семестрів не знайдено')
+
+        for semester in semesters:
+            if options['full']:
+                class_ids = None
+            else:
+                class_ids = options['classes'] or unscheduled_classes(semester)
+                if not class_ids:
+                    self.stdout.write(f'{semester}: усі заняття вже мають розклад (--full, щоб скласти заново)')
+                    continue
+            started = time.perf_counter()
+            before, after = solve_semester(semester, class_ids, time_limit=options['time_limit'],
+                                           seed=options['seed'], dry_run=options['dry_run'])
+            moved = 'усі заняття' if class_ids is None else f'занять: {len(class_ids)}'
+            self.stdout.write(f'{semester}, {moved}, {time.perf_counter() - started:.1f} с')
+            self.stdout.write(f'  до:    {format_report(before)}')
+            self.stdout.write(f'  після: {format_report(after)}')
+        if options['dry_run']:
+            self.stdout.write('Нічого не збережено (--dry-run)')
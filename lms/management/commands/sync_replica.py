@@ -0,0 +1,41 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from lms.db_routing import PRIMARY, REPLICA
+
+
+class Command(BaseCommand):
+    help = 'Копіює основну SQLite-БД у локальну репліку (замінник реплікації для розробки)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторювати синхронізацію кожні N секунд (0 - один раз)')
+
+    def handle(self, *args, **options):
+        if REPLICA not in connections.databases:
+            raise CommandError('Репліку не налаштовано: задайте LMS_SQLITE_REPLICA_PATH.')
+        primary = connections.databases[PRIMARY]
+        replica = connections.databases[REPLICA]
+        if 'sqlite' not in primary['ENGINE'] or 'sqlite' not in replica['ENGINE']:
+            raise CommandError('Команда працює лише з SQLite; для PostgreSQL використовуйте потокову реплікацію.')
+
+        while True:
+            started = time.perf_counter()
+            self.sync(primary['NAME'], replica['NAME'])
+            self.stdout.write(f'Репліку оновлено за {(time.perf_counter() - started) * 1000:.1f} мс')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, primary_path, replica_path):
+        # Backup API SQLite робить узгоджений знімок без зупинки записів в основну БД
+        source = sqlite3.connect(primary_path)
+        target = sqlite3.connect(replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
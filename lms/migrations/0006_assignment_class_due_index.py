@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0005_assignment_assignment_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['class_obj', 'due_date'], name='lms_assign_class_due_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0006_assignment_class_due_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramChat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=50, verbose_name='ID чату')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='telegram_chat', to=settings.AUTH_USER_MODEL, verbose_name='Користувач')),
+            ],
+            options={
+                'verbose_name': 'Чат Telegram',
+                'verbose_name_plural': 'Чати Telegram',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('assignment', 'Нове завдання'), ('deadline', 'Термін здачі через 24 години'), ('grade', 'Виставлено оцінку')], max_length=20, verbose_name='Подія')),
+                ('dedup_key', models.CharField(max_length=100, verbose_name='Ключ дедуплікації')),
+                ('title', models.CharField(max_length=255, verbose_name='Текст')),
+                ('url', models.CharField(blank=True, max_length=255, verbose_name='Посилання')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Надіслано')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Отримувач')),
+            ],
+            options={
+                'verbose_name': 'Сповіщення',
+                'verbose_name_plural': 'Сповіщення',
+                'indexes': [models.Index(fields=['sent_at', 'user'], name='lms_notification_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'dedup_key'), name='lms_notification_dedup')],
+            },
+        ),
+    ]
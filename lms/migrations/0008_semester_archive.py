@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_semesters(apps, schema_editor):
+    """Семестр для кожної назви, що вже є в lms_class.semester"""
+    Class = apps.get_model('lms', 'Class')
+    Semester = apps.get_model('lms', 'Semester')
+    names = Class.objects.values_list('semester', flat=True).distinct()
+    Semester.objects.bulk_create([Semester(name=name) for name in names], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0007_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Semester',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, unique=True, verbose_name='назва')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='початок')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='кінець')),
+                ('is_active', models.BooleanField(db_index=True, default=True, verbose_name='активний')),
+                ('archived_at', models.DateTimeField(blank=True, null=True, verbose_name='архівовано')),
+            ],
+            options={
+                'verbose_name': 'семестр',
+                'verbose_name_plural': 'семестри',
+                'ordering': ['-start_date', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEnrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('professor_name', models.CharField(max_length=150, verbose_name='викладач')),
+                ('grade', models.CharField(blank=True, max_length=2, null=True, verbose_name='оцінка')),
+                ('points', models.IntegerField(blank=True, null=True, verbose_name='набрано балів')),
+                ('max_points', models.IntegerField(default=0, verbose_name='максимум балів')),
+                ('enrollment_date', models.DateField(verbose_name='дата запису')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='lms.course', verbose_name='курс')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_enrollments', to='lms.student', verbose_name='студент')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='lms.semester', verbose_name='семестр')),
+            ],
+            options={
+                'verbose_name': 'архівний запис',
+                'verbose_name_plural': 'архівні записи',
+                'ordering': ['semester__start_date', 'course__code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignment_title', models.CharField(max_length=200, verbose_name='завдання')),
+                ('assignment_type', models.CharField(max_length=10, verbose_name='тип завдання')),
+                ('due_date', models.DateTimeField(verbose_name='термін здачі')),
+                ('max_points', models.IntegerField(verbose_name='максимальний бал')),
+                ('submission_date', models.DateTimeField(verbose_name='дата здачі')),
+                ('grade', models.IntegerField(blank=True, null=True, verbose_name='оцінка')),
+                ('graded_at', models.DateTimeField(blank=True, null=True, verbose_name='дата оцінювання')),
+                ('enrollment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submissions', to='lms.archivedenrollment', verbose_name='архівний запис')),
+            ],
+            options={
+                'verbose_name': 'архівна робота',
+                'verbose_name_plural': 'архівні роботи',
+                'ordering': ['due_date'],
+            },
+        ),
+        migrations.RunPython(create_semesters, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='class',
+            name='semester',
+            field=models.ForeignKey(db_column='semester', on_delete=django.db.models.deletion.PROTECT, to='lms.semester', to_field='name', verbose_name='семестр'),
+        ),
+    ]
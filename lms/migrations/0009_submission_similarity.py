@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0008_semester_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('signature', models.BinaryField()),
+                ('shingle_count', models.PositiveIntegerField(verbose_name='Кількість шинглів')),
+                ('computed_at', models.DateTimeField(auto_now=True, verbose_name='Обчислено')),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint', to='lms.studentsubmission', verbose_name='Робота')),
+            ],
+            options={
+                'verbose_name': 'Відбиток роботи',
+                'verbose_name_plural': 'Відбитки робіт',
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarityPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField(verbose_name='Схожість')),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarity_pairs', to='lms.assignment', verbose_name='Завдання')),
+                ('matched', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lms.studentsubmission', verbose_name='Схожа робота')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='lms.studentsubmission', verbose_name='Робота')),
+            ],
+            options={
+                'verbose_name': 'Схожі роботи',
+                'verbose_name_plural': 'Схожі роботи',
+                'ordering': ['-similarity'],
+                'indexes': [models.Index(fields=['assignment', '-similarity'], name='lms_similarity_report_idx')],
+            },
+        ),
+    ]
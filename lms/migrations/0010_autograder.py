@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0009_submission_similarity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoGrader',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('harness', models.FileField(upload_to='autograders/', verbose_name='Тести (unittest, імпортують solution)')),
+                ('timeout', models.PositiveIntegerField(default=10, verbose_name='Ліміт часу, с')),
+                ('memory_limit', models.PositiveIntegerField(default=256, verbose_name="Ліміт пам'яті, МБ")),
+                ('is_enabled', models.BooleanField(default=True, verbose_name='Перевіряти нові роботи')),
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='autograder', to='lms.assignment', verbose_name='Завдання')),
+            ],
+            options={
+                'verbose_name': 'Автоперевірка',
+                'verbose_name_plural': 'Автоперевірки',
+            },
+        ),
+        migrations.CreateModel(
+            name='GradingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'У черзі'), ('running', 'Виконується'), ('done', 'Оцінено'), ('failed', 'Помилка')], default='queued', max_length=10, verbose_name='Стан')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='У черзі з')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Початок')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('duration', models.FloatField(blank=True, null=True, verbose_name='Час у пісочниці, с')),
+                ('passed', models.PositiveIntegerField(blank=True, null=True, verbose_name='Пройдено тестів')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Усього тестів')),
+                ('log', models.TextField(blank=True, verbose_name='Журнал')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_jobs', to='lms.studentsubmission', verbose_name='Робота')),
+            ],
+            options={
+                'verbose_name': 'Завдання автоперевірки',
+                'verbose_name_plural': 'Черга автоперевірки',
+                'indexes': [models.Index(fields=['status', 'queued_at'], name='lms_gradingjob_queue_idx')],
+            },
+        ),
+    ]
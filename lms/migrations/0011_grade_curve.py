@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0010_autograder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentsubmission',
+            name='raw_grade',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Оцінка до кривої'),
+        ),
+        migrations.CreateModel(
+            name='GradeCurve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff_a', models.FloatField(verbose_name='Межа A, %')),
+                ('cutoff_b', models.FloatField(verbose_name='Межа B, %')),
+                ('cutoff_c', models.FloatField(verbose_name='Межа C, %')),
+                ('cutoff_d', models.FloatField(verbose_name='Межа D, %')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+                ('class_obj', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grade_curve', to='lms.class', verbose_name='заняття')),
+            ],
+            options={
+                'verbose_name': 'Шкала оцінок',
+                'verbose_name_plural': 'Шкали оцінок',
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0011_grade_curve'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, help_text='Порожнє - без обмежень', null=True, verbose_name='кількість місць'),
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='registration_closes_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='реєстрація закривається'),
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='registration_opens_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='реєстрація відкривається'),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='у черзі з')),
+                ('class_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='lms.class', verbose_name='заняття')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lms.student', verbose_name='студент')),
+            ],
+            options={
+                'verbose_name': 'місце в черзі',
+                'verbose_name_plural': 'черга на заняття',
+                'ordering': ['id'],
+                'unique_together': {('student', 'class_obj')},
+            },
+        ),
+    ]
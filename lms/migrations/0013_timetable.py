@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0012_registration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='назва')),
+                ('capacity', models.PositiveIntegerField(verbose_name='кількість місць')),
+            ],
+            options={
+                'verbose_name': 'аудиторія',
+                'verbose_name_plural': 'аудиторії',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='sessions_per_week',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Скільки слотів виділяє складання розкладу', verbose_name='пар на тиждень'),
+        ),
+    ]
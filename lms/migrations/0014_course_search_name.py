@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 15:47
+
+from django.db import migrations, models
+
+
+def fill_search_name(apps, schema_editor):
+    """search_name для наявних курсів; Python lower(), бо LOWER() у SQLite не знає кирилиці"""
+    Course = apps.get_model('lms', 'Course')
+    courses = list(Course.objects.only('name'))
+    for course in courses:
+        course.search_name = course.name.lower()
+    Course.objects.bulk_update(courses, ['search_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0013_timetable'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+    ]
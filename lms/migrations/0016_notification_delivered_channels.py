@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0015_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='delivered_channels',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Доставлено каналами'),
+        ),
+    ]
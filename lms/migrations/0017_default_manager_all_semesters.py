@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:34
+
+import django.db.models.manager
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0016_notification_delivered_channels'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='assignment',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Завдання', 'verbose_name_plural': 'Завдання'},
+        ),
+        migrations.AlterModelOptions(
+            name='class',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'заняття', 'verbose_name_plural': 'заняття'},
+        ),
+        migrations.AlterModelOptions(
+            name='coursematerial',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Матеріал курсу', 'verbose_name_plural': 'Матеріали курсу'},
+        ),
+        migrations.AlterModelOptions(
+            name='enrollment',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'запис', 'verbose_name_plural': 'записи'},
+        ),
+        migrations.AlterModelOptions(
+            name='studentsubmission',
+            options={'default_manager_name': 'all_objects', 'verbose_name': 'Робота студента', 'verbose_name_plural': 'Роботи студентів'},
+        ),
+        migrations.AlterModelManagers(
+            name='assignment',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='class',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='coursematerial',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='enrollment',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.AlterModelManagers(
+            name='studentsubmission',
+            managers=[
+                ('all_objects', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -1,13 +1,19 @@
 from django.db import models
+from django.db.models import BooleanField, Case, CharField, ExpressionWrapper, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, NullIf
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 
+from .querycache import CachedQuerySet
+
 
 class Faculty(models.Model):
     name = models.CharField(max_length=100, verbose_name=_("назва"))
     description = models.TextField(blank=True, verbose_name=_("опис"))
 
+    objects = CachedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("факультет")
         verbose_name_plural = _("факультети")
@@ -20,6 +26,8 @@ class Department(models.Model):
     name = models.CharField(max_length=100, verbose_name=_("назва"))
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, verbose_name=_("факультет"))
 
+    objects = CachedQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("кафедра")
         verbose_name_plural = _("кафедри")
@@ -37,11 +45,23 @@ class Course(models.Model):
         verbose_name=_("кредити")
     )
     department = models.ForeignKey(Department, on_delete=models.CASCADE, verbose_name=_("кафедра"))
+    # Назва в нижньому регістрі для пошуку за префіксом індексом (lms.catalog): LIKE у SQLite
+    # не зводить регістр кирилиці, а istartswith у PostgreSQL не використовує звичайний індекс
+    search_name = models.CharField(max_length=100, db_index=True, default='', editable=False)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("оновлено"))
+
+    objects = CachedQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("курс")
         verbose_name_plural = _("курси")
 
+    def save(self, *args, **kwargs):
+        self.search_name = self.name.lower()
+        if kwargs.get('update_fields') is not None and 'name' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'search_name'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -83,19 +103,84 @@ class Professor(models.Model):
         return self.full_name
 
 
+class Semester(models.Model):
+    name = models.CharField(max_length=20, unique=True, verbose_name=_("назва"))
+    start_date = models.DateField(null=True, blank=True, verbose_name=_("початок"))
+    end_date = models.DateField(null=True, blank=True, verbose_name=_("кінець"))
+    # Закриті семестри зникають з менеджерів за замовчуванням і підлягають архівації
+    is_active = models.BooleanField(default=True, db_index=True, verbose_name=_("активний"))
+    archived_at = models.DateTimeField(null=True, blank=True, verbose_name=_("архівовано"))
+
+    class Meta:
+        verbose_name = _("семестр")
+        verbose_name_plural = _("семестри")
+        ordering = ['-start_date', 'name']
+
+    def __str__(self):
+        return self.name
+
+
+class SemesterScopedManager(models.Manager):
+    """
+    Менеджер objects: лише рядки активних семестрів. Менеджер за замовчуванням (Meta.default_manager_name) -
+    all_objects: форми й перевірки унікальності адмінки та менеджери зв'язків бачать і закриті семестри
+    """
+
+    semester_path = None
+
+    @classmethod
+    def scoped_to(cls, semester_path):
+        """Підклас зі шляхом до семестру: екземпляр створюється без аргументів, як звичайний менеджер"""
+        return type(cls.__name__, (cls,), {'semester_path': semester_path})
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{f'{self.semester_path}__is_active': True})
+
+
 class Class(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, verbose_name=_("курс"))
     professor = models.ForeignKey(Professor, on_delete=models.CASCADE, verbose_name=_("викладач"))
-    semester = models.CharField(max_length=20, verbose_name=_("семестр"))
+    # Колонка зберігає назву семестру, як і раніше, тож semester_id - це рядок на кшталт "Весна 2024"
+    semester = models.ForeignKey(Semester, on_delete=models.PROTECT, to_field='name', db_column='semester',
+                                 verbose_name=_("семестр"))
     schedule = models.CharField(max_length=100, verbose_name=_("розклад"))
     classroom = models.CharField(max_length=50, verbose_name=_("аудиторія"))
+    capacity = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("кількість місць"),
+                                           help_text=_("Порожнє - без обмежень"))
+    registration_opens_at = models.DateTimeField(null=True, blank=True, verbose_name=_("реєстрація відкривається"))
+    registration_closes_at = models.DateTimeField(null=True, blank=True, verbose_name=_("реєстрація закривається"))
+    sessions_per_week = models.PositiveSmallIntegerField(default=1, verbose_name=_("пар на тиждень"),
+                                                         help_text=_("Скільки слотів виділяє складання розкладу"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("оновлено"))
+
+    objects = SemesterScopedManager.from_queryset(CachedQuerySet).scoped_to('semester')()
+    all_objects = CachedQuerySet.as_manager()
 
     class Meta:
+        default_manager_name = 'all_objects'
         verbose_name = _("заняття")
         verbose_name_plural = _("заняття")
 
+    @property
+    def semester_name(self):
+        """Назва семестру без запиту до Semester"""
+        return self.semester_id
+
+    @property
+    def letter_cutoffs(self):
+        """Межі буквених оцінок заняття; без GradeCurve - стандартні LETTER_CUTOFFS"""
+        try:
+            return self.grade_curve.cutoffs()
+        except GradeCurve.DoesNotExist:
+            return LETTER_CUTOFFS
+
+    def is_registration_open(self, now):
+        if self.registration_opens_at is None or now < self.registration_opens_at:
+            return False
+        return self.registration_closes_at is None or now < self.registration_closes_at
+
     def __str__(self):
-        return f"{self.course.code} - {self.semester}"
+        return f"{self.course.code} - {self.semester_name}"
 
 
 class Enrollment(models.Model):
@@ -104,7 +189,11 @@ class Enrollment(models.Model):
     enrollment_date = models.DateField(auto_now_add=True, verbose_name=_("дата запису"))
     grade = models.CharField(max_length=2, blank=True, null=True, verbose_name=_("оцінка"))
 
+    objects = SemesterScopedManager.scoped_to('class_enrolled__semester')()
+    all_objects = models.Manager()
+
     class Meta:
+        default_manager_name = 'all_objects'
         unique_together = ('student', 'class_enrolled')
         verbose_name = _("запис")
         verbose_name_plural = _("записи")
@@ -113,17 +202,38 @@ class Enrollment(models.Model):
         return f"{self.student} - {self.class_enrolled}"
 
 
+class WaitlistEntry(models.Model):
+    """Черга на заповнене заняття; порядок - за id (lms.registration)"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, verbose_name=_("студент"))
+    class_obj = models.ForeignKey(Class, on_delete=models.CASCADE, related_name='waitlist', verbose_name=_("заняття"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("у черзі з"))
+
+    class Meta:
+        unique_together = ('student', 'class_obj')
+        ordering = ['id']
+        verbose_name = _("місце в черзі")
+        verbose_name_plural = _("черга на заняття")
+
+    def __str__(self):
+        return f"{self.student} - {self.class_obj_id}"
+
+
 class CourseMaterial(models.Model):
     title = models.CharField(max_length=200, verbose_name=_("Назва матеріалу"))
     description = models.TextField(blank=True, verbose_name=_("Опис"))
     file = models.FileField(upload_to='course_materials/', verbose_name=_("Файл"))
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Оновлено"))
     class_obj = models.ForeignKey(Class, on_delete=models.CASCADE, verbose_name=_("Заняття"))
 
+    objects = SemesterScopedManager.from_queryset(CachedQuerySet).scoped_to('class_obj__semester')()
+    all_objects = CachedQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
     class Meta:
+        default_manager_name = 'all_objects'
         verbose_name = _("Матеріал курсу")
         verbose_name_plural = _("Матеріали курсу")
 
@@ -157,6 +267,20 @@ class Schedule(models.Model):
         return f"{self.class_obj.course.code} - {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
 
 
+class Room(models.Model):
+    """Аудиторія, яку розподіляє складання розкладу (lms.timetable)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name=_("назва"))
+    capacity = models.PositiveIntegerField(verbose_name=_("кількість місць"))
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = _("аудиторія")
+        verbose_name_plural = _("аудиторії")
+
+    def __str__(self):
+        return self.name
+
+
 class Assignment(models.Model):
     ASSIGNMENT_TYPES = [
         ('LAB', 'Лабораторна робота'),
@@ -174,13 +298,73 @@ class Assignment(models.Model):
     max_points = models.IntegerField(default=100, verbose_name="Максимальний бал")
     assignment_file = models.FileField(upload_to='assignments/', blank=True, null=True, verbose_name="Файл завдання")  # ДОБАВЛЕНО
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    objects = SemesterScopedManager.from_queryset(CachedQuerySet).scoped_to('class_obj__semester')()
+    all_objects = CachedQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.title} - {self.class_obj.course.name}"
 
     class Meta:
+        default_manager_name = 'all_objects'
         verbose_name = "Завдання"
         verbose_name_plural = "Завдання"
+        indexes = [
+            models.Index(fields=['class_obj', 'due_date'], name='lms_assign_class_due_idx'),
+        ]
+
+
+# Пороги відсотків для CSS-класів оцінок (від найвищого до найнижчого)
+GRADE_CLASS_THRESHOLDS = [
+    (90, 'success'),
+    (80, 'primary'),
+    (70, 'info'),
+    (60, 'warning'),
+]
+
+# Нижні межі буквених оцінок у відсотках за замовчуванням (від найвищої до найнижчої, нижче - F)
+LETTER_CUTOFFS = [
+    (90, 'A'),
+    (80, 'B'),
+    (70, 'C'),
+    (60, 'D'),
+]
+
+
+class StudentSubmissionQuerySet(models.QuerySet):
+    """Запити до робіт студентів з анотаціями, які обчислюються в БД"""
+
+    def with_is_late(self):
+        return self.annotate(is_late=ExpressionWrapper(
+            Q(submission_date__gt=F('assignment__due_date')),
+            output_field=BooleanField()
+        ))
+
+    def with_percentage(self):
+        return self.annotate(percentage=ExpressionWrapper(
+            Cast('grade', FloatField()) * 100 / NullIf(F('assignment__max_points'), 0),
+            output_field=FloatField()
+        ))
+
+    def with_grade_class(self):
+        if 'percentage' not in self.query.annotations:
+            return self.with_percentage().with_grade_class()
+        whens = [When(percentage__gte=threshold, then=Value(css_class))
+                 for threshold, css_class in GRADE_CLASS_THRESHOLDS]
+        return self.annotate(grade_class=Case(
+            When(percentage__isnull=True, then=Value('secondary')),
+            *whens,
+            default=Value('danger'),
+            output_field=CharField()
+        ))
+
+    def with_grade_stats(self):
+        """Додає is_late, percentage та grade_class одним запитом"""
+        return self.with_is_late().with_percentage().with_grade_class()
+
+    def late(self):
+        return self.filter(submission_date__gt=F('assignment__due_date'))
 
 
 class StudentSubmission(models.Model):
@@ -190,14 +374,31 @@ class StudentSubmission(models.Model):
     submission_date = models.DateTimeField(auto_now_add=True, verbose_name="Дата здачі")
     comment = models.TextField(blank=True, verbose_name="Коментар студента")
     grade = models.IntegerField(null=True, blank=True, verbose_name="Оцінка")
+    # Оцінка до кривої (lms.grade_stats): повторна крива рахується від неї, скидання її повертає
+    raw_grade = models.IntegerField(null=True, blank=True, verbose_name="Оцінка до кривої")
     teacher_feedback = models.TextField(blank=True, verbose_name="Відгук викладача")
     graded_at = models.DateTimeField(null=True, blank=True, verbose_name="Дата оцінювання")
 
-    def is_late(self):
+    objects = SemesterScopedManager.from_queryset(StudentSubmissionQuerySet).scoped_to(
+        'assignment__class_obj__semester')()
+    all_objects = StudentSubmissionQuerySet.as_manager()
+
+    # Значення is_late/percentage можуть прийти з анотацій StudentSubmissionQuerySet,
+    # тоді звернення до self.assignment (і зайвий запит) не потрібне.
+    def _get_is_late(self):
+        if '_is_late' in self.__dict__:
+            return self.__dict__['_is_late']
         return self.submission_date > self.assignment.due_date
 
+    def _set_is_late(self, value):
+        self.__dict__['_is_late'] = value
+
+    is_late = property(_get_is_late, _set_is_late)
+
     def get_grade_percentage(self):
-        if self.grade and self.assignment.max_points:
+        if 'percentage' in self.__dict__:
+            return self.percentage
+        if self.grade is not None and self.assignment.max_points:
             return (self.grade / self.assignment.max_points) * 100
         return None
 
@@ -205,6 +406,202 @@ class StudentSubmission(models.Model):
         return f"{self.student.user.get_full_name()} - {self.assignment.title}"
 
     class Meta:
+        default_manager_name = 'all_objects'
         verbose_name = "Робота студента"
         verbose_name_plural = "Роботи студентів"
-        unique_together = ('student', 'assignment')
\ No newline at end of file
+        unique_together = ('student', 'assignment')
+
+class GradeCurve(models.Model):
+    """Межі буквених оцінок заняття, розраховані за процентилями розподілу (lms.grade_stats)"""
+    class_obj = models.OneToOneField(Class, on_delete=models.CASCADE, related_name='grade_curve',
+                                     verbose_name=_("заняття"))
+    cutoff_a = models.FloatField(verbose_name="Межа A, %")
+    cutoff_b = models.FloatField(verbose_name="Межа B, %")
+    cutoff_c = models.FloatField(verbose_name="Межа C, %")
+    cutoff_d = models.FloatField(verbose_name="Межа D, %")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Оновлено")
+
+    class Meta:
+        verbose_name = "Шкала оцінок"
+        verbose_name_plural = "Шкали оцінок"
+
+    def cutoffs(self):
+        return [(self.cutoff_a, 'A'), (self.cutoff_b, 'B'), (self.cutoff_c, 'C'), (self.cutoff_d, 'D')]
+
+    def __str__(self):
+        return f"Шкала оцінок: {self.class_obj_id}"
+
+
+class AutoGrader(models.Model):
+    """Набір тестів unittest, яким автоматично перевіряються роботи завдання (lms.autograder)"""
+    assignment = models.OneToOneField(Assignment, on_delete=models.CASCADE, related_name='autograder',
+                                      verbose_name="Завдання")
+    harness = models.FileField(upload_to='autograders/', verbose_name="Тести (unittest, імпортують solution)")
+    timeout = models.PositiveIntegerField(default=10, verbose_name="Ліміт часу, с")
+    memory_limit = models.PositiveIntegerField(default=256, verbose_name="Ліміт пам'яті, МБ")
+    is_enabled = models.BooleanField(default=True, verbose_name="Перевіряти нові роботи")
+
+    class Meta:
+        verbose_name = "Автоперевірка"
+        verbose_name_plural = "Автоперевірки"
+
+    def __str__(self):
+        return f"Автоперевірка: {self.assignment_id}"
+
+
+class GradingJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'У черзі'),
+        (RUNNING, 'Виконується'),
+        (DONE, 'Оцінено'),
+        (FAILED, 'Помилка'),
+    ]
+
+    submission = models.ForeignKey(StudentSubmission, on_delete=models.CASCADE, related_name='grading_jobs',
+                                   verbose_name="Робота")
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED, verbose_name="Стан")
+    queued_at = models.DateTimeField(auto_now_add=True, verbose_name="У черзі з")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Початок")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+    duration = models.FloatField(null=True, blank=True, verbose_name="Час у пісочниці, с")
+    passed = models.PositiveIntegerField(null=True, blank=True, verbose_name="Пройдено тестів")
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Усього тестів")
+    log = models.TextField(blank=True, verbose_name="Журнал")
+
+    class Meta:
+        verbose_name = "Завдання автоперевірки"
+        verbose_name_plural = "Черга автоперевірки"
+        indexes = [models.Index(fields=['status', 'queued_at'], name='lms_gradingjob_queue_idx')]
+
+    def __str__(self):
+        return f"{self.submission_id}: {self.get_status_display()}"
+
+
+class SubmissionFingerprint(models.Model):
+    """MinHash-підпис тексту роботи (lms.similarity): масив uint32, по 4 байти на перестановку"""
+    submission = models.OneToOneField(StudentSubmission, on_delete=models.CASCADE, related_name='fingerprint',
+                                      verbose_name="Робота")
+    # Підпис перераховується, якщо файл роботи замінили
+    file_name = models.CharField(max_length=255)
+    signature = models.BinaryField()
+    shingle_count = models.PositiveIntegerField(verbose_name="Кількість шинглів")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="Обчислено")
+
+    class Meta:
+        verbose_name = "Відбиток роботи"
+        verbose_name_plural = "Відбитки робіт"
+
+
+class SimilarityPair(models.Model):
+    """Пара схожих робіт у звіті завдання; matched може належати тому ж завданню в іншому семестрі"""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE, related_name='similarity_pairs',
+                                   verbose_name="Завдання")
+    submission = models.ForeignKey(StudentSubmission, on_delete=models.CASCADE, related_name='+',
+                                   verbose_name="Робота")
+    matched = models.ForeignKey(StudentSubmission, on_delete=models.CASCADE, related_name='+',
+                                verbose_name="Схожа робота")
+    similarity = models.FloatField(verbose_name="Схожість")
+
+    class Meta:
+        verbose_name = "Схожі роботи"
+        verbose_name_plural = "Схожі роботи"
+        ordering = ['-similarity']
+        indexes = [models.Index(fields=['assignment', '-similarity'], name='lms_similarity_report_idx')]
+
+    def __str__(self):
+        return f"{self.submission_id} ~ {self.matched_id}: {self.similarity:.0%}"
+
+
+class Notification(models.Model):
+    """Черга вихідних сповіщень; розсилаються пакетними дайджестами командою send_digests"""
+    ASSIGNMENT = 'assignment'
+    DEADLINE = 'deadline'
+    GRADE = 'grade'
+    EVENTS = [
+        (ASSIGNMENT, 'Нове завдання'),
+        (DEADLINE, 'Термін здачі через 24 години'),
+        (GRADE, 'Виставлено оцінку'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Отримувач")
+    event = models.CharField(max_length=20, choices=EVENTS, verbose_name="Подія")
+    # Одна й та сама подія не потрапляє в чергу користувача двічі
+    dedup_key = models.CharField(max_length=100, verbose_name="Ключ дедуплікації")
+    title = models.CharField(max_length=255, verbose_name="Текст")
+    url = models.CharField(max_length=255, blank=True, verbose_name="Посилання")
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Надіслано")
+    # Канали (lms.digest), через які подію вже доставлено, через кому; sent_at - коли доставлено всіма
+    delivered_channels = models.CharField(max_length=100, blank=True, default='', verbose_name="Доставлено каналами")
+
+    def __str__(self):
+        return f"{self.user} - {self.title}"
+
+    class Meta:
+        verbose_name = "Сповіщення"
+        verbose_name_plural = "Сповіщення"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'dedup_key'], name='lms_notification_dedup'),
+        ]
+        indexes = [
+            models.Index(fields=['sent_at', 'user'], name='lms_notification_pending_idx'),
+        ]
+
+
+class TelegramChat(models.Model):
+    """Прив'язка користувача до чату Telegram для дайджестів"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='telegram_chat',
+                                verbose_name="Користувач")
+    chat_id = models.CharField(max_length=50, verbose_name="ID чату")
+
+    def __str__(self):
+        return f"{self.user} - {self.chat_id}"
+
+    class Meta:
+        verbose_name = "Чат Telegram"
+        verbose_name_plural = "Чати Telegram"
+
+
+class ArchivedEnrollment(models.Model):
+    """Запис закритого семестру в архіві: лише дані залікової книжки, без зв'язку з гарячими таблицями"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_enrollments',
+                                verbose_name=_("студент"))
+    semester = models.ForeignKey(Semester, on_delete=models.PROTECT, verbose_name=_("семестр"))
+    course = models.ForeignKey(Course, on_delete=models.PROTECT, verbose_name=_("курс"))
+    professor_name = models.CharField(max_length=150, verbose_name=_("викладач"))
+    grade = models.CharField(max_length=2, blank=True, null=True, verbose_name=_("оцінка"))
+    points = models.IntegerField(null=True, blank=True, verbose_name=_("набрано балів"))
+    max_points = models.IntegerField(default=0, verbose_name=_("максимум балів"))
+    enrollment_date = models.DateField(verbose_name=_("дата запису"))
+
+    class Meta:
+        verbose_name = _("архівний запис")
+        verbose_name_plural = _("архівні записи")
+        ordering = ['semester__start_date', 'course__code']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.course_id} ({self.semester_id})"
+
+
+class ArchivedSubmission(models.Model):
+    enrollment = models.ForeignKey(ArchivedEnrollment, on_delete=models.CASCADE, related_name='submissions',
+                                   verbose_name=_("архівний запис"))
+    assignment_title = models.CharField(max_length=200, verbose_name=_("завдання"))
+    assignment_type = models.CharField(max_length=10, verbose_name=_("тип завдання"))
+    due_date = models.DateTimeField(verbose_name=_("термін здачі"))
+    max_points = models.IntegerField(verbose_name=_("максимальний бал"))
+    submission_date = models.DateTimeField(verbose_name=_("дата здачі"))
+    grade = models.IntegerField(null=True, blank=True, verbose_name=_("оцінка"))
+    graded_at = models.DateTimeField(null=True, blank=True, verbose_name=_("дата оцінювання"))
+
+    class Meta:
+        verbose_name = _("архівна робота")
+        verbose_name_plural = _("архівні роботи")
+        ordering = ['due_date']
+
+    def __str__(self):
+        return self.assignment_title
@@ -0,0 +1,164 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Скільки повідомлень чекає на повільного підписника, поки найстаріші не відкидаються
+QUEUE_SIZE = 100
+# Через скільки мс браузер перепідключається після обриву потоку
+RETRY_MS = 3000
+
+
+def student_channel(student_id):
+    return f'student:{student_id}'
+
+
+def class_channel(class_id):
+    return f'class:{class_id}'
+
+
+class InProcessBroker:
+    """
+    Pub/sub у межах одного процесу. Публікація безпечна з будь-якого потоку
+    (сигнали синхронних представлень), підписники - asyncio-черги в циклі подій.
+    Для кількох воркерів потрібен RedisBroker.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # Цикл подій підписника вже закрито
+                pass
+
+    def subscribe(self, channels):
+        return InProcessSubscription(self, channels)
+
+    def _add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker._remove(self)
+        return False
+
+    def put(self, message):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Наступне повідомлення або None, якщо за timeout секунд нічого не прийшло"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class RedisBroker:
+    """Pub/sub через Redis: повідомлення доходять до підписників у всіх воркерах"""
+
+    prefix = 'lms:notify:'
+
+    def __init__(self, url=None):
+        import redis
+
+        self.url = url or settings.NOTIFICATION_REDIS_URL
+        self._client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self._client.publish(self.prefix + channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    def subscribe(self, channels):
+        return RedisSubscription(self, channels)
+
+
+class RedisSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = [broker.prefix + channel for channel in channels]
+
+    async def __aenter__(self):
+        from redis import asyncio as aioredis
+
+        self.client = aioredis.Redis.from_url(self.broker.url)
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+        return False
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+
+@cache
+def get_broker():
+    """Брокер з NOTIFICATION_BROKER, один на процес"""
+    return import_string(settings.NOTIFICATION_BROKER)()
+
+
+def notify(channel, event, **payload):
+    """Публікує подію після фіксації транзакції, щоб клієнт не прочитав ще не збережені дані"""
+    message = {'event': event, **payload}
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+
+def format_event(message):
+    """Повідомлення у форматі Server-Sent Events"""
+    data = json.dumps(message, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"event: {message['event']}\ndata: {data}\n\n"
+
+
+async def event_stream(channels):
+    """
+    Потік SSE для підписника. Під час простою надсилає коментарі-heartbeat, а через
+    NOTIFICATION_STREAM_LIFETIME закривається - браузер перепідключиться й отримає
+    актуальний набір каналів (наприклад, після запису на нове заняття).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.NOTIFICATION_STREAM_LIFETIME
+    yield f'retry: {RETRY_MS}\n\n'
+    async with get_broker().subscribe(channels) as subscription:
+        while loop.time() < deadline:
+            message = await subscription.get(timeout=settings.NOTIFICATION_HEARTBEAT)
+            yield ': keepalive\n\n' if message is None else format_event(message)
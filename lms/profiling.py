@@ -0,0 +1,259 @@
+import atexit
+import cProfile
+import itertools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+STACK = 'stack'
+CPROFILE = 'cprofile'
+HEADER = 'HTTP_X_PROFILE'
+TOKEN_SALT = 'lms.profiling'
+TOKEN_VALUE = 'profile'
+UNRESOLVED = '-'
+# Потоки, що зараз нічого не роблять (пул потоків, цикл подій), при семплюванні всіх потоків відкидаються
+IDLE_FILES = ('threading.py', 'selectors.py', 'queue.py', 'thread.py')
+
+
+def make_token():
+    """Значення заголовка X-Profile, з яким запит профілюється незалежно від частоти семплювання"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign(TOKEN_VALUE)
+
+
+def token_valid(value):
+    try:
+        return signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            value, max_age=settings.PROFILING_TOKEN_MAX_AGE) == TOKEN_VALUE
+    except signing.BadSignature:
+        return False
+
+
+_labels = {}
+
+
+def frame_label(code):
+    """'функція (модуль.py:рядок)' з шляхом відносно sys.path; кешується для об'єкта коду"""
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        prefixes = [path for path in sys.path if path and filename.startswith(path + os.sep)]
+        if prefixes:
+            filename = filename[len(max(prefixes, key=len)) + 1:]
+        label = _labels[code] = f'{code.co_name} ({filename}:{code.co_firstlineno})'
+    return label
+
+
+class StackSampler:
+    """
+    Фоновий потік, що кожні interval секунд знімає стеки потоку запиту (або всіх потоків,
+    якщо thread_id None) і рахує їх у форматі collapsed stacks: 'зовнішня;...;внутрішня' -> кількість
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='lms-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_id is not None and thread_id != self.thread_id):
+                    continue
+                if self.thread_id is None and frame.f_code.co_filename.endswith(IDLE_FILES):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(labels))] += 1
+
+
+class ProfileStore:
+    """Профілі процесу, зведені за іменем URL; періодично записуються в PROFILING_DIR/<pid>/"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stacks = defaultdict(Counter)
+        self.stats = {}
+        self.requests = Counter()
+        self.seconds = Counter()
+        # Перший профіль записується одразу, далі - не частіше PROFILING_FLUSH_INTERVAL
+        self.flushed_at = float('-inf')
+
+    def add(self, view_name, elapsed, stacks=None, profile=None):
+        with self.lock:
+            self.requests[view_name] += 1
+            self.seconds[view_name] += elapsed
+            if stacks is not None:
+                self.stacks[view_name].update(stacks)
+            if profile is not None:
+                if view_name in self.stats:
+                    self.stats[view_name].add(profile)
+                else:
+                    self.stats[view_name] = pstats.Stats(profile)
+            if time.monotonic() - self.flushed_at >= settings.PROFILING_FLUSH_INTERVAL:
+                self.flush()
+
+    def flush(self):
+        """Перезаписує файли процесу повними зведеними даними (викликається під self.lock)"""
+        if not self.requests:
+            return
+        directory = os.path.join(settings.PROFILING_DIR, str(os.getpid()))
+        os.makedirs(directory, exist_ok=True)
+        for view_name, stacks in self.stacks.items():
+            with open(os.path.join(directory, f'{view_name}.stacks'), 'w', encoding='utf-8') as file:
+                file.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+        for view_name, stats in self.stats.items():
+            stats.dump_stats(os.path.join(directory, f'{view_name}.prof'))
+        with open(os.path.join(directory, 'requests.json'), 'w', encoding='utf-8') as file:
+            json.dump({view_name: {'requests': count, 'seconds': round(self.seconds[view_name], 6)}
+                       for view_name, count in self.requests.items()}, file)
+        self.flushed_at = time.monotonic()
+
+
+store = ProfileStore()
+
+
+@atexit.register
+def _flush_on_exit():
+    with store.lock:
+        store.flush()
+
+
+class ProfilingMiddleware:
+    """
+    Профілює кожен PROFILING_SAMPLE_RATE-й запит і запити з підписаним заголовком X-Profile
+    (python manage.py dump_profiles --token). Для решти запитів - лише лічильник і перевірка заголовка.
+    Одночасно в процесі профілюється не більше одного запиту. Має стояти першим у MIDDLEWARE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.rate = settings.PROFILING_SAMPLE_RATE
+        self.counter = itertools.count(1)
+        self.active = threading.Lock()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def sampled(self, request):
+        if self.rate and next(self.counter) % self.rate == 0:
+            return True
+        value = request.META.get(HEADER)
+        return value is not None and token_valid(value)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled(request) or not self.active.acquire(blocking=False):
+            return self.get_response(request)
+        profiler, started = self.start(threading.get_ident()), time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(request, profiler, time.perf_counter() - started)
+        response['X-Profiled'] = settings.PROFILING_MODE
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled(request) or not self.active.acquire(blocking=False):
+            return await self.get_response(request)
+        # ORM і шаблони async-представлень виконуються в інших потоках (sync_to_async),
+        # тож семплюються всі зайняті потоки; cProfile бачить лише цикл подій
+        profiler, started = self.start(None), time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(request, profiler, time.perf_counter() - started)
+        response['X-Profiled'] = settings.PROFILING_MODE
+        return response
+
+    def start(self, thread_id):
+        if settings.PROFILING_MODE == CPROFILE:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(thread_id, settings.PROFILING_INTERVAL)
+            profiler.start()
+        return profiler
+
+    def finish(self, request, profiler, elapsed):
+        """Зупиняє профайлер, додає профіль до зведеного за іменем URL і звільняє місце для наступного"""
+        match = request.resolver_match
+        view_name = (match.view_name if match else None) or UNRESOLVED
+        try:
+            if isinstance(profiler, StackSampler):
+                store.add(view_name, elapsed, stacks=profiler.stop())
+            else:
+                profiler.disable()
+                store.add(view_name, elapsed, profile=profiler)
+        finally:
+            self.active.release()
+
+
+def load_profiles(view_name=None):
+    """Зведені профілі всіх процесів: ({view: Counter стеків}, {view: pstats.Stats}, {view: запити й секунди})"""
+    stacks, stats, requests = defaultdict(Counter), {}, defaultdict(lambda: {'requests': 0, 'seconds': 0.0})
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return stacks, stats, requests
+    for process in sorted(os.listdir(settings.PROFILING_DIR)):
+        directory = os.path.join(settings.PROFILING_DIR, process)
+        if not os.path.isdir(directory):
+            continue
+        for filename in sorted(os.listdir(directory)):
+            path = os.path.join(directory, filename)
+            name, extension = os.path.splitext(filename)
+            if extension == '.json':
+                with open(path, encoding='utf-8') as file:
+                    for view, totals in json.load(file).items():
+                        if view_name in (None, view):
+                            requests[view]['requests'] += totals['requests']
+                            requests[view]['seconds'] += totals['seconds']
+            elif view_name not in (None, name):
+                continue
+            elif extension == '.stacks':
+                with open(path, encoding='utf-8') as file:
+                    for line in file:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        stacks[name][stack] += int(count)
+            elif extension == '.prof':
+                if name in stats:
+                    stats[name].add(path)
+                else:
+                    stats[name] = pstats.Stats(path)
+    return stacks, stats, requests
+
+
+def top_functions(stacks, limit):
+    """[(функція, власні семпли, семпли разом із викликаними)] за власними семплами"""
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    return [(frame, count, total[frame]) for frame, count in own.most_common(limit)]
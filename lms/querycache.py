@@ -0,0 +1,234 @@
+import hashlib
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import cache as memoize, partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import models, transaction
+
+GENERATION_KEY = 'querycache:generation:{}'
+# Таблиці, з яких читає SELECT, і таблиця, в яку пише INSERT/UPDATE/DELETE (SQL, згенерований Django)
+READ_TABLES_RE = re.compile(r'\b(?:FROM|JOIN)\s+["`]?(\w+)', re.IGNORECASE)
+WRITE_TABLE_RE = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE)\s+["`]?(\w+)', re.IGNORECASE)
+QUOTED_NAME_RE = re.compile(r'["`](\w+)["`]')
+
+
+@memoize
+def tracked_tables():
+    """Таблиці моделей QUERY_CACHE_MODELS: лише для них ведуться покоління"""
+    return frozenset(apps.get_model(label)._meta.db_table for label in settings.QUERY_CACHE_MODELS)
+
+
+def generations(tables):
+    """Поточні покоління таблиць зі спільного кешу, одним get_many"""
+    keys = {table: GENERATION_KEY.format(table) for table in sorted(tables)}
+    values = cache.get_many(keys.values())
+    result = []
+    for table, key in keys.items():
+        if key not in values:
+            # Після рестарту кешу покоління не повинно збігтися зі старими ключами інших процесів
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+        result.append((table, values[key]))
+    return tuple(result)
+
+
+def bump(tables):
+    """Нове покоління таблиць: закешовані результати запитів до них більше не знаходяться"""
+    for table in tables:
+        try:
+            cache.incr(GENERATION_KEY.format(table))
+        except ValueError:
+            cache.add(GENERATION_KEY.format(table), time.time_ns(), None)
+    results.invalidations += len(tables)
+
+
+class QueryResultCache:
+    """LRU результатів запитів у пам'яті процесу з обмеженнями кількості записів і сумарного розміру"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.bypassed = self.evictions = self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key, data):
+        max_entries, max_bytes = settings.QUERY_CACHE_MAX_ENTRIES, settings.QUERY_CACHE_MAX_BYTES
+        if len(data) > max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self.entries[key] = data
+            self.size += len(data)
+            # Записи застарілих поколінь ніхто не читає, тож вони першими доходять до початку черги
+            while self.entries and (len(self.entries) > max_entries or self.size > max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = self.misses = self.bypassed = self.evictions = self.invalidations = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+results = QueryResultCache()
+
+
+def stats():
+    """Статистика кешу поточного процесу"""
+    return results.stats()
+
+
+def _written_in_transaction(connection):
+    """Таблиці, змінені в незакоміченій транзакції з'єднання: їхні рядки ще не бачать інші процеси"""
+    written = connection.__dict__.setdefault('querycache_written', set())
+    if not connection.in_atomic_block:
+        # Відкат не викликає on_commit, тож після виходу з транзакції список очищується тут
+        written.clear()
+    return written
+
+
+def _committed(connection, tables):
+    bump(tables)
+    _written_in_transaction(connection).difference_update(tables)
+
+
+def track_writes(execute, sql, params, many, context):
+    """
+    execute_wrapper: запис у відстежувану таблицю (save, delete, bulk_create, bulk_update, update)
+    збільшує її покоління одразу й ще раз після коміту, бо між ними інші процеси могли закешувати старі рядки
+    """
+    result = execute(sql, params, many, context)
+    match = WRITE_TABLE_RE.match(sql)
+    if match is None:
+        return result
+    tables = {match.group(1)}
+    if sql.lstrip()[:8].upper() == 'TRUNCATE':
+        # TRUNCATE "a", "b" ... CASCADE (flush у PostgreSQL) очищає кілька таблиць одразу
+        tables.update(QUOTED_NAME_RE.findall(sql))
+    tables &= tracked_tables()
+    if not tables:
+        return result
+    bump(tables)
+    connection = context['connection']
+    if connection.in_atomic_block:
+        written = _written_in_transaction(connection)
+        new = tables - written
+        written |= tables
+        if new:
+            transaction.on_commit(partial(_committed, connection, new), using=connection.alias)
+    return result
+
+
+def install(connection):
+    """Підключає track_writes до з'єднання (викликається з сигналу connection_created)"""
+    if track_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_writes)
+
+
+def _build(queryset, compiler):
+    """Об'єкти queryset (моделі, словники, кортежі) з рядків, які повертає compiler.execute_sql"""
+    clone = queryset._chain()
+    clone.query.get_compiler = lambda *args, **kwargs: compiler
+    return list(queryset._iterable_class(clone))
+
+
+def fetch(queryset):
+    """
+    Результати queryset з кешу або з БД із записом у кеш. None - запит не кешується
+    (таблиця без поколінь, незакомічені зміни, порожня умова), його виконує звичайний QuerySet.
+    Кешуються сирі рядки БД, а не моделі: кортежі розпаковуються в рази швидше за екземпляри моделей
+    """
+    if queryset._known_related_objects or settings.QUERY_CACHE_MAX_ENTRIES <= 0:
+        return None
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    try:
+        sql, params = compiler.as_sql()
+    except EmptyResultSet:
+        return None
+    tables = set(READ_TABLES_RE.findall(sql))
+    if not tables or not tables <= tracked_tables() or tables & _written_in_transaction(compiler.connection):
+        results.bypassed += 1
+        return None
+
+    # Покоління читаються до запиту: зміна під час нього лише зробить новий запис недосяжним
+    key = hashlib.sha256(repr((queryset.db, sql, params, generations(tables))).encode()).digest()
+    data = results.get(key)
+    if data is not None:
+        rows = pickle.loads(data)
+        compiler.execute_sql = lambda *args, **kwargs: [rows]
+        return _build(queryset, compiler)
+
+    compiler = queryset.query.get_compiler(using=queryset.db)
+    execute_sql, fetched = compiler.execute_sql, []
+
+    def recording_execute_sql(*args, **kwargs):
+        fetched.extend(row for chunk in execute_sql(*args, **kwargs) for row in chunk)
+        return [fetched]
+
+    compiler.execute_sql = recording_execute_sql
+    objects = _build(queryset, compiler)
+    try:
+        results.set(key, pickle.dumps(fetched, pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError):
+        # memoryview (bytea у PostgreSQL) не серіалізується - такий запит просто не кешується
+        pass
+    return objects
+
+
+class CachedQuerySet(models.QuerySet):
+    """QuerySet з необов'язковим кешем результатів: Course.objects.filter(...).cached()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cache_results = False
+
+    def cached(self):
+        """Результати беруться з кешу процесу, поки покоління таблиць запиту не зміниться"""
+        clone = self._chain()
+        clone._cache_results = True
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._cache_results = self._cache_results
+        return clone
+
+    def _fetch_all(self):
+        # prefetch_related виконує вже QuerySet._fetch_all поверх рядків із кешу
+        if self._result_cache is None and self._cache_results:
+            self._result_cache = fetch(self)
+        super()._fetch_all()
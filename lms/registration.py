@@ -0,0 +1,131 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.urls import reverse
+from django.utils import timezone
+
+from .dashboard import invalidate_fragments
+from .feed import invalidate_assignment_feed
+from .models import Class, Enrollment, WaitlistEntry
+from .notifications import notify, student_channel
+
+# Результати register() та drop()
+ENROLLED = 'enrolled'
+WAITLISTED = 'waitlisted'
+ALREADY_ENROLLED = 'already_enrolled'
+ALREADY_WAITLISTED = 'already_waitlisted'
+DROPPED = 'dropped'
+LEFT_WAITLIST = 'left_waitlist'
+NOT_REGISTERED = 'not_registered'
+CLOSED = 'closed'
+
+
+def _lock_class(class_id):
+    """
+    Блокує рядок заняття до кінця транзакції: усі зміни записів одного заняття йдуть по черзі,
+    тож підрахунок вільних місць і вставка не розходяться (PostgreSQL - SELECT ... FOR UPDATE,
+    SQLite - IMMEDIATE-транзакція профілю БД). of=('self',) не блокує спільний рядок семестру,
+    який менеджер за замовчуванням приєднує для фільтра, тож різні заняття не чекають одне одного.
+    Class.DoesNotExist, якщо заняття немає або його семестр закрито.
+    """
+    return Class.objects.select_for_update(of=('self',)).get(pk=class_id)
+
+
+def _free_seats(class_obj):
+    if class_obj.capacity is None:
+        return None
+    return max(class_obj.capacity - Enrollment.objects.filter(class_enrolled=class_obj).count(), 0)
+
+
+def register(student, class_id, now=None):
+    """Записує студента на заняття, а якщо місць немає - ставить у кінець черги"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        class_obj = _lock_class(class_id)
+        if not class_obj.is_registration_open(now):
+            return CLOSED
+        if Enrollment.objects.filter(student=student, class_enrolled=class_obj).exists():
+            return ALREADY_ENROLLED
+        if _free_seats(class_obj) != 0:
+            Enrollment.objects.create(student=student, class_enrolled=class_obj)
+            # Вільні місця при непорожній черзі бувають лише до promote_waitlist після зміни місткості
+            WaitlistEntry.objects.filter(student=student, class_obj=class_obj).delete()
+            return ENROLLED
+        _, created = WaitlistEntry.objects.get_or_create(student=student, class_obj=class_obj)
+        return WAITLISTED if created else ALREADY_WAITLISTED
+
+
+def drop(student, class_id, now=None):
+    """Скасовує запис (звільнене місце одразу отримує перший у черзі) або виходить із черги"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        class_obj = _lock_class(class_id)
+        if WaitlistEntry.objects.filter(student=student, class_obj=class_obj).delete()[0]:
+            return LEFT_WAITLIST
+        if not class_obj.is_registration_open(now):
+            # Після закриття реєстрації записи змінює лише адміністратор
+            return CLOSED
+        if not Enrollment.objects.filter(student=student, class_enrolled=class_obj).delete()[0]:
+            return NOT_REGISTERED
+        promoted = _promote(class_obj)
+    _announce_promoted(class_obj, promoted)
+    return DROPPED
+
+
+def promote_waitlist(class_id):
+    """Переводить перших у черзі на вільні місця (після збільшення місткості чи видалення записів)"""
+    with transaction.atomic():
+        class_obj = Class.all_objects.select_for_update().get(pk=class_id)
+        promoted = _promote(class_obj)
+    _announce_promoted(class_obj, promoted)
+    return promoted
+
+
+def _promote(class_obj):
+    """Викликається під блокуванням заняття. Повертає id переведених студентів"""
+    free = _free_seats(class_obj)
+    entries = WaitlistEntry.objects.filter(class_obj=class_obj).order_by('id')
+    entries = list(entries if free is None else entries[:free])
+    if not entries:
+        return []
+    student_ids = [entry.student_id for entry in entries]
+    Enrollment.objects.bulk_create([
+        Enrollment(student_id=student_id, class_enrolled=class_obj) for student_id in student_ids
+    ], ignore_conflicts=True)
+    WaitlistEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+    return student_ids
+
+
+def _announce_promoted(class_obj, student_ids):
+    """Уже після коміту й зняття блокування: bulk_create не надсилає post_save, тож стрічки й сповіщення - явно"""
+    if not student_ids:
+        return
+    invalidate_assignment_feed(student_ids)
+    invalidate_fragments('courses', student_ids)
+    title = f'Місце звільнилося: вас записано на {class_obj}'
+    url = reverse('class_registration')
+    for student_id in student_ids:
+        notify(student_channel(student_id), 'enrolled', title=title, url=url)
+
+
+def open_classes(now=None):
+    """Заняття активних семестрів з вікном реєстрації, що ще не закрилося, із кількістю записаних і черги"""
+    now = now or timezone.now()
+    waitlisted = WaitlistEntry.objects.filter(class_obj=OuterRef('pk')).order_by().values('class_obj').annotate(
+        total=Count('id')).values('total')
+    return Class.objects.filter(registration_opens_at__isnull=False).exclude(
+        registration_closes_at__lte=now
+    ).select_related('course', 'professor__user').annotate(
+        enrolled_count=Count('enrollment'),
+        waitlist_count=Subquery(waitlisted),
+    ).order_by('course__code', 'pk')
+
+
+def waitlist_positions(student):
+    """{id заняття: місце студента в черзі, починаючи з 1}"""
+    ahead = WaitlistEntry.objects.filter(
+        class_obj=OuterRef('class_obj'), id__lte=OuterRef('id')
+    ).order_by().values('class_obj').annotate(total=Count('id')).values('total')
+    return dict(
+        WaitlistEntry.objects.filter(student=student).annotate(position=Subquery(ahead))
+        .values_list('class_obj_id', 'position')
+    )
@@ -0,0 +1,289 @@
+"""
+Запускається автоперевіркою всередині пісочниці в окремому інтерпретаторі (python -I). Лише stdlib:
+Django тут недоступний і не потрібен.
+
+    python -I sandbox_runner.py <каталог> <ліміт CPU, с> <пам'ять, МБ> <розмір файлів, МБ>
+
+У каталозі лежать harness.py (тести викладача) і submission/ (робота студента). Запускач виконує
+тести, але сам не імпортує жодного файлу студента: модулі з submission/ підміняються проксі, а їхній
+код працює в дочірньому процесі (цей самий файл з --solution), з яким запускач обмінюється лише
+літералами Python (repr та ast.literal_eval). Підсумок запускач пише у свій stdout, якого дочірній
+процес не отримує, тож робота студента не може підмінити результат.
+"""
+import ast
+import builtins
+import importlib
+import importlib.abc
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import traceback
+import unittest
+
+MEGABYTE = 1024 * 1024
+MAX_REPLY = MEGABYTE
+PR_SET_DUMPABLE = 4
+SOLUTION_FLAG = '--solution'
+LITERAL_TYPES = (int, float, complex, str, bytes, bool, type(None))
+
+
+def limit_resources(cpu_seconds, memory_mb, file_mb):
+    try:
+        import resource
+    except ImportError:
+        # Windows: лишається лише тайм-аут батьківського процесу
+        return
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory_mb * MEGABYTE, memory_mb * MEGABYTE))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_mb * MEGABYTE, file_mb * MEGABYTE))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def forbid_tracing():
+    """Процес роботи має той самий uid: без цього він міг би читати пам'ять запускача через ptrace чи /proc"""
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0)
+    except (ImportError, OSError, AttributeError):
+        pass
+
+
+def is_literal(value):
+    """Значення, яке repr і ast.literal_eval передають без змін"""
+    if type(value) is float:
+        return value == value and value not in (float('inf'), float('-inf'))
+    if type(value) in LITERAL_TYPES:
+        return True
+    if type(value) in (list, tuple, set):
+        return all(is_literal(item) for item in value)
+    if type(value) is dict:
+        return all(is_literal(key) and is_literal(item) for key, item in value.items())
+    return False
+
+
+# Дочірній процес: код студента
+
+def serve_solution(requests_fd, replies_fd):
+    """Виконує запити запускача: import, getattr, виклики; результат - літерал або номер об'єкта"""
+    requests = os.fdopen(requests_fd, encoding='utf-8')
+    replies = os.fdopen(replies_fd, 'w', encoding='utf-8')
+    sys.stdin = open(os.devnull)
+    sys.path.insert(0, os.getcwd())
+    objects = []
+
+    def load(argument):
+        kind, value = argument
+        return objects[value] if kind == 'ref' else value
+
+    def dump(value):
+        if is_literal(value):
+            return 'value', value
+        objects.append(value)
+        return 'ref', len(objects) - 1
+
+    for line in requests:
+        try:
+            operation, ref, name, args, kwargs = ast.literal_eval(line)
+            args = [load(argument) for argument in args]
+            kwargs = {key: load(argument) for key, argument in kwargs.items()}
+            if operation == 'import':
+                value = importlib.import_module(name)
+            elif operation == 'getattr':
+                value = getattr(objects[ref], name)
+            elif operation == 'call':
+                value = objects[ref](*args, **kwargs)
+            else:
+                # Спеціальні методи шукаються на типі, як це робить сам Python
+                value = getattr(type(objects[ref]), name)(objects[ref], *args)
+            reply = dump(value)
+        except BaseException as error:
+            # Зокрема SystemExit з роботи: це помилка виклику, а не завершення процесу
+            reply = 'error', type(error).__name__, str(error)[:2000]
+        replies.write(repr(reply) + '\n')
+        replies.flush()
+
+
+# Запускач: тести викладача
+
+class SolutionError(Exception):
+    """Виняток роботи, тип якого не вбудований"""
+
+
+class Solution:
+    """Дочірній процес з кодом студента; запускається при першому імпорті модуля роботи"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.process = None
+
+    def start(self):
+        requests_read, self.requests = os.pipe()
+        self.replies, replies_write = os.pipe()
+        # stdout і stderr роботи - у журнал (stderr запускача), stdout запускача з підсумком не успадковується
+        self.process = subprocess.Popen(
+            [sys.executable, '-I', __file__, SOLUTION_FLAG, str(requests_read), str(replies_write)],
+            stdin=subprocess.DEVNULL, stdout=sys.stderr, stderr=sys.stderr,
+            pass_fds=(requests_read, replies_write), cwd=self.directory,
+        )
+        os.close(requests_read)
+        os.close(replies_write)
+        self.requests = os.fdopen(self.requests, 'w', encoding='utf-8')
+        self.replies = os.fdopen(self.replies, encoding='utf-8')
+
+    def request(self, operation, ref=None, name=None, args=(), kwargs=None):
+        if self.process is None:
+            self.start()
+        message = (operation, ref, name, [self.encode(arg) for arg in args],
+                   {key: self.encode(value) for key, value in (kwargs or {}).items()})
+        try:
+            self.requests.write(repr(message) + '\n')
+            self.requests.flush()
+        except BrokenPipeError:
+            pass
+        line = self.replies.readline(MAX_REPLY)
+        if not line.endswith('\n'):
+            code = self.process.poll()
+            raise RuntimeError(f'Процес роботи завершився (код {code})' if line == '' else 'Завелика відповідь роботи')
+        try:
+            reply = ast.literal_eval(line)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            raise RuntimeError('Некоректна відповідь процесу роботи') from None
+        return self.decode(reply)
+
+    def encode(self, value):
+        if isinstance(value, Remote):
+            return 'ref', object.__getattribute__(value, '_ref')
+        if not is_literal(value):
+            raise TypeError(f'У роботу можна передавати лише літерали Python, а не {type(value).__name__}')
+        return 'value', value
+
+    def decode(self, reply):
+        if reply[0] == 'value':
+            return reply[1]
+        if reply[0] == 'ref':
+            return Remote(self, reply[1])
+        _, name, message = reply
+        exception = getattr(builtins, name, None)
+        if isinstance(exception, type) and issubclass(exception, Exception):
+            raise exception(message)
+        raise SolutionError(f'{name}: {message}')
+
+    def close(self):
+        if self.process is not None:
+            self.requests.close()
+            self.process.kill()
+            self.process.wait()
+
+
+class Remote:
+    """Об'єкт у процесі роботи: атрибути, виклики й основні операції виконуються там"""
+
+    __slots__ = ('_solution', '_ref')
+
+    def __init__(self, solution, ref):
+        object.__setattr__(self, '_solution', solution)
+        object.__setattr__(self, '_ref', ref)
+
+    def __getattr__(self, name):
+        return self._solution.request('getattr', self._ref, name)
+
+    def __call__(self, *args, **kwargs):
+        return self._solution.request('call', self._ref, args=args, kwargs=kwargs)
+
+
+def _remote_method(name):
+    def method(self, *args):
+        return self._solution.request('method', self._ref, name, args)
+    method.__name__ = name
+    return method
+
+
+for _name in ('__repr__', '__str__', '__bool__', '__len__', '__iter__', '__next__', '__contains__', '__getitem__',
+              '__setitem__', '__delitem__', '__eq__', '__ne__', '__lt__', '__le__', '__gt__', '__ge__', '__hash__'):
+    setattr(Remote, _name, _remote_method(_name))
+
+
+class SolutionFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Модулі роботи (і їхні підмодулі) імпортуються як проксі до дочірнього процесу"""
+
+    def __init__(self, solution, names):
+        self.solution = solution
+        self.names = names
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname.partition('.')[0] in self.names:
+            return importlib.util.spec_from_loader(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        remote = self.solution.request('import', name=module.__name__)
+        module.__path__ = []
+        module.__getattr__ = remote.__getattr__
+
+
+def solution_modules(directory):
+    """Імена модулів роботи; модулі stdlib і harness не підміняються"""
+    names = set()
+    for entry in os.listdir(directory):
+        name, extension = os.path.splitext(entry)
+        if extension == '.py' or (not extension and os.path.isdir(os.path.join(directory, entry))):
+            names.add(name)
+    return {name for name in names if name.isidentifier()} - set(sys.stdlib_module_names) - {'harness'}
+
+
+def run_tests(harness_path):
+    stream = io.StringIO()
+    try:
+        spec = importlib.util.spec_from_file_location('harness', harness_path)
+        harness = importlib.util.module_from_spec(spec)
+        sys.modules['harness'] = harness
+        spec.loader.exec_module(harness)
+        suite = unittest.defaultTestLoader.loadTestsFromModule(harness)
+    except Exception as error:
+        # Найчастіше - синтаксична помилка чи відсутня функція в solution.py; кадри самого
+        # запускача й importlib студенту не потрібні
+        frames = [frame for frame in traceback.extract_tb(error.__traceback__) if frame.filename == harness_path]
+        message = ''.join(traceback.format_list(frames) + traceback.format_exception_only(error))
+        return {'total': 0, 'passed': 0, 'failed': [], 'error': message}
+    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(suite)
+    failed = [test.id().rsplit('.', 1)[-1] for test, _ in result.failures + result.errors]
+    total = result.testsRun - len(result.skipped)
+    return {
+        'total': total,
+        'passed': total - len(failed),
+        'failed': failed[:200],
+        'details': stream.getvalue()[-4000:],
+    }
+
+
+def main():
+    if sys.argv[1] == SOLUTION_FLAG:
+        serve_solution(int(sys.argv[2]), int(sys.argv[3]))
+        return
+    workdir, cpu_seconds, memory_mb, file_mb = sys.argv[1], *map(int, sys.argv[2:5])
+    # Підсумок - лише в цей дескриптор; print() тестів і все інше йде в журнал (stderr)
+    report = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+    forbid_tracing()
+    limit_resources(cpu_seconds, memory_mb, file_mb)
+
+    directory = os.path.join(workdir, 'submission')
+    solution = Solution(directory)
+    sys.meta_path.insert(0, SolutionFinder(solution, solution_modules(directory)))
+    try:
+        summary = run_tests(os.path.join(workdir, 'harness.py'))
+    finally:
+        solution.close()
+    report.write(json.dumps(summary))
+    report.close()
+
+
+if __name__ == '__main__':
+    main()
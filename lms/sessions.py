@@ -0,0 +1,48 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Ключ у даних сесії з часом (unix), до якого продовжено її термін дії
+EXPIRES_AT_KEY = '_lms_expires_at'
+
+
+class LazySessionRefreshMiddleware:
+    """
+    Ковзний термін дії сесії без запису на кожен запит.
+    Сесія зберігається (і cookie оновлюється) лише тоді, коли до закінчення терміну
+    лишається менше SESSION_REFRESH_THRESHOLD секунд; в інших запитах сесія лише читається з кешу.
+    Має стояти після SessionMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.refresh(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # Сесія вже завантажена під час запиту, тож тут немає звернень до БД
+        self.refresh(request)
+        return response
+
+    def refresh(self, request):
+        session = getattr(request, 'session', None)
+        # Не чіпаємо сесії, які в запиті не використовувались, і порожні (анонімні) сесії
+        if session is None or not session.accessed or session.is_empty():
+            return
+
+        now = time.time()
+        expires_at = session.get(EXPIRES_AT_KEY, 0)
+        if session.modified or expires_at - now < settings.SESSION_REFRESH_THRESHOLD:
+            session[EXPIRES_AT_KEY] = now + session.get_expiry_age()
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from .catalog import invalidate_catalog
+from .dashboard import invalidate_fragments
+from .digest import enqueue, enqueue_for_students
+from .feed import invalidate_assignment_feed
+from .models import (
+    Assignment, AutoGrader, Class, Course, CourseMaterial, Department, Enrollment, Faculty, GradingJob, Notification,
+    Professor, Semester, StudentSubmission
+)
+from .notifications import class_channel, notify, student_channel
+from .querycache import install as install_query_cache
+
+
+@receiver([post_save, post_delete], sender=StudentSubmission)
+def submission_changed(sender, instance, **kwargs):
+    """Здана або видалена робота змінює стрічку завдань і оцінки студента та чергу перевірки викладача"""
+    invalidate_assignment_feed([instance.student_id])
+    invalidate_fragments('grades', [instance.student_id])
+    invalidate_fragments('grading', Class.all_objects.filter(
+        assignment=instance.assignment_id).values_list('professor_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def assignment_changed(sender, instance, **kwargs):
+    """Нове чи змінене завдання змінює стрічки всіх студентів заняття"""
+    student_ids = Enrollment.objects.filter(
+        class_enrolled_id=instance.class_obj_id
+    ).values_list('student_id', flat=True)
+    invalidate_assignment_feed(student_ids)
+
+
+def announce_grade(submission):
+    """Push-сповіщення та дайджест про оцінку; також для оцінок, записаних bulk_update (автоперевірка)"""
+    invalidate_fragments('grades', [submission.student_id])
+    title = f'Оцінено: {submission.assignment.title}'
+    notify(
+        student_channel(submission.student_id), 'graded',
+        title=title,
+        grade=submission.grade,
+        max_points=submission.assignment.max_points,
+        url=reverse('student_grades'),
+    )
+    # Повторне збереження з тією ж оцінкою не створює нового листа
+    enqueue_for_students(
+        [submission.student_id], Notification.GRADE,
+        title=f'{title} - {submission.grade}/{submission.assignment.max_points}',
+        url=reverse('student_grades'),
+        dedup_key=f'grade:{submission.pk}:{submission.grade}',
+    )
+
+
+@receiver(pre_save, sender=StudentSubmission)
+def remember_previous_grade(sender, instance, **kwargs):
+    """Оцінка до збереження: повторне збереження з тією ж оцінкою не надсилає нового сповіщення"""
+    if instance.pk is not None and instance.grade is not None:
+        instance._previous_grade = StudentSubmission.all_objects.filter(
+            pk=instance.pk).values_list('grade', flat=True).first()
+
+
+@receiver(post_save, sender=StudentSubmission)
+def notify_submission_graded(sender, instance, created, **kwargs):
+    """Студент отримує push-сповіщення, коли його роботу оцінено або оцінку змінено"""
+    if created or instance.grade is None or instance.__dict__.pop('_previous_grade', None) == instance.grade:
+        return
+    announce_grade(instance)
+
+
+@receiver(post_save, sender=StudentSubmission)
+def queue_autograding(sender, instance, created, **kwargs):
+    """Нова робота з автоперевіркою одразу стає в чергу воркера autograde"""
+    if created and AutoGrader.objects.filter(assignment_id=instance.assignment_id, is_enabled=True).exists():
+        GradingJob.objects.create(submission=instance)
+
+
+@receiver(post_save, sender=Assignment)
+def notify_new_assignment(sender, instance, created, **kwargs):
+    """Нове завдання: одне push-повідомлення в канал заняття та дайджест кожному студенту"""
+    if not created:
+        return
+    title = f'Нове завдання: {instance.title}'
+    url = reverse('assignment_detail', args=[instance.pk])
+    notify(class_channel(instance.class_obj_id), 'assignment', title=title, due_date=instance.due_date, url=url)
+    enqueue(
+        Enrollment.objects.filter(class_enrolled_id=instance.class_obj_id).values_list('student__user_id', flat=True),
+        Notification.ASSIGNMENT, title=title, url=url, dedup_key=f'assignment:{instance.pk}',
+    )
+
+
+@receiver(post_save, sender=CourseMaterial)
+def notify_new_material(sender, instance, created, **kwargs):
+    """Новий матеріал заняття"""
+    if created:
+        notify(
+            class_channel(instance.class_obj_id), 'material',
+            title=f'Новий матеріал: {instance.title}',
+            url=reverse('class_materials', args=[instance.class_obj_id]),
+        )
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    """Запис на заняття чи його скасування змінює набір завдань і курсів студента"""
+    invalidate_assignment_feed([instance.student_id])
+    invalidate_fragments('courses', [instance.student_id])
+
+
+@receiver([post_save, post_delete], sender=Class)
+def class_changed(sender, instance, **kwargs):
+    """Список занять на панелі викладача; у студентів блок курсів оновиться за своїм TTL"""
+    invalidate_fragments('classes', [instance.professor_id])
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Class)
+@receiver([post_save, post_delete], sender=Department)
+@receiver([post_save, post_delete], sender=Faculty)
+@receiver([post_save, post_delete], sender=Professor)
+@receiver([post_save, post_delete], sender=Semester)
+def catalog_changed(sender, **kwargs):
+    """Фасети каталогу курсів залежать від курсів, занять, кафедр, викладачів і активних семестрів"""
+    invalidate_catalog()
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Застосовує SQLITE_PRAGMAS до кожного нового з'єднання з SQLite"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in pragmas.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+
+
+@receiver(connection_created)
+def track_query_cache_writes(sender, connection, **kwargs):
+    """Записи в таблиці QUERY_CACHE_MODELS через будь-яке з'єднання змінюють їхні покоління"""
+    install_query_cache(connection)
@@ -0,0 +1,201 @@
+import re
+import zipfile
+from array import array
+from collections import defaultdict
+from hashlib import blake2b
+from itertools import combinations
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import SimilarityPair, StudentSubmission, SubmissionFingerprint
+
+SHINGLE_SIZE = 5  # слів в одному шинглі
+NUM_PERM = 128  # довжина підпису (кошиків), степінь двійки
+BANDS = 32  # смуг LSH по ROWS значень; поріг кандидатів ~ (1/BANDS) ** (1/ROWS) = 0.42
+ROWS = NUM_PERM // BANDS
+MAX_TEXT_SIZE = 2 * 1024 * 1024
+
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_EMPTY = 1 << 32
+# Зсув значень, позичених порожнім кошиком у сусіда, щоб кошики не ставали копіями один одного
+_DENSIFY_STEP = 0x9E3779B1
+
+TEXT_SUFFIXES = {'.txt', '.md', '.py', '.java', '.c', '.cpp', '.h', '.cs', '.js', '.ts', '.html', '.css',
+                 '.sql', '.ipynb', '.json', '.csv', '.tex', '.rtf'}
+_WORD_RE = re.compile(r'\w+')
+
+
+def _xml_text(data):
+    return ' '.join(ElementTree.fromstring(data).itertext())
+
+
+def _zip_text(file):
+    """Текст з docx/odt або з текстових файлів усередині zip-архіву"""
+    parts = []
+    with zipfile.ZipFile(file) as archive:
+        for info in archive.infolist():
+            name = info.filename.lower()
+            if name in ('word/document.xml', 'content.xml'):
+                parts.append(_xml_text(archive.read(info)))
+            elif not info.is_dir() and any(name.endswith(suffix) for suffix in TEXT_SUFFIXES):
+                parts.append(archive.read(info)[:MAX_TEXT_SIZE].decode('utf-8', 'ignore'))
+    return '\n'.join(parts)
+
+
+def _pdf_text(file):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        # Без pypdf текст зі стиснених PDF не дістати: такі роботи лишаються без порівняння
+        return ''
+    return '\n'.join(page.extract_text() or '' for page in PdfReader(file).pages)
+
+
+def extract_text(field_file):
+    """Текст роботи за розширенням файлу; порожній рядок, якщо формат не підтримується"""
+    name = field_file.name.lower()
+    suffix = name[name.rfind('.'):] if '.' in name else ''
+    try:
+        with field_file.storage.open(field_file.name, 'rb') as file:
+            if suffix in TEXT_SUFFIXES:
+                return file.read(MAX_TEXT_SIZE).decode('utf-8', 'ignore')
+            if suffix in ('.zip', '.docx', '.odt'):
+                return _zip_text(file)
+            if suffix == '.pdf':
+                return _pdf_text(file)
+    except (OSError, zipfile.BadZipFile, ElementTree.ParseError, ValueError):
+        return ''
+    return ''
+
+
+def shingle_hashes(text):
+    """64-бітні хеші шинглів з SHINGLE_SIZE слів (регістр і пунктуація не враховуються)"""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return set()
+    span = min(SHINGLE_SIZE, len(words))
+    return {
+        int.from_bytes(blake2b(' '.join(words[i:i + span]).encode(), digest_size=8).digest(), 'little')
+        for i in range(len(words) - span + 1)
+    }
+
+
+def minhash(text):
+    """
+    MinHash з однією перестановкою: хеш шингла вибирає кошик молодшими бітами, кошик
+    зберігає мінімум решти бітів; порожні кошики позичають значення найближчого непорожнього
+    справа. Один прохід по шинглах замість NUM_PERM. Повертає (підпис у байтах, кількість шинглів);
+    функція верхнього рівня, щоб її можна було віддати в ProcessPool.
+    """
+    hashes = shingle_hashes(text)
+    if not hashes:
+        return b'', 0
+    bins = [_EMPTY] * NUM_PERM
+    for value in hashes:
+        index = value & (NUM_PERM - 1)
+        value = (value >> _BIN_BITS) & 0xFFFFFFFF
+        if value < bins[index]:
+            bins[index] = value
+    signature = array('I', bytes(4 * NUM_PERM))
+    for index in range(NUM_PERM):
+        offset = 0
+        while bins[(index + offset) % NUM_PERM] == _EMPTY:
+            offset += 1
+        signature[index] = (bins[(index + offset) % NUM_PERM] + offset * _DENSIFY_STEP) & 0xFFFFFFFF
+    return signature.tobytes(), len(hashes)
+
+
+def estimate_similarity(first, second):
+    """Частка збіжних позицій підписів - незміщена оцінка коефіцієнта Жаккара"""
+    first, second = array('I', first), array('I', second)
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+class LSHIndex:
+    """Підписи розбиваються на смуги; кандидати - пари, що збіглися хоча б в одній смузі"""
+
+    band_size = ROWS * array('I').itemsize
+
+    def __init__(self):
+        self.buckets = defaultdict(list)
+        self.signatures = {}
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band in range(BANDS):
+            start = band * self.band_size
+            self.buckets[band, signature[start:start + self.band_size]].append(key)
+
+    def candidates(self):
+        pairs = set()
+        for keys in self.buckets.values():
+            if len(keys) > 1:
+                pairs.update(combinations(sorted(keys), 2))
+        return pairs
+
+    def similar_pairs(self, threshold):
+        for first, second in self.candidates():
+            similarity = estimate_similarity(self.signatures[first], self.signatures[second])
+            if similarity >= threshold:
+                yield first, second, similarity
+
+
+def pending_submissions(limit):
+    """Роботи без підпису або із заміненим файлом"""
+    return list(
+        StudentSubmission.all_objects.exclude(fingerprint__file_name=F('file'))
+        .exclude(file='').only('pk', 'file', 'assignment').order_by('pk')[:limit]
+    )
+
+
+def fingerprint_submissions(submissions, map_func=map):
+    """Рахує підписи (map_func - map пулу процесів) і повертає id завдань, звіти яких застаріли"""
+    texts = [extract_text(submission.file) for submission in submissions]
+    results = list(map_func(minhash, texts))
+    with transaction.atomic():
+        SubmissionFingerprint.objects.filter(submission__in=submissions).delete()
+        SubmissionFingerprint.objects.bulk_create([
+            SubmissionFingerprint(submission=submission, file_name=submission.file.name,
+                                  signature=signature, shingle_count=shingle_count)
+            for submission, (signature, shingle_count) in zip(submissions, results)
+        ])
+    return {submission.assignment_id for submission in submissions}
+
+
+def rebuild_pairs(assignment, threshold=None, across_semesters=None):
+    """Перебудовує пари схожих робіт завдання через LSH-індекс. Повертає кількість пар"""
+    threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+    if across_semesters is None:
+        across_semesters = settings.SIMILARITY_ACROSS_SEMESTERS
+
+    fingerprints = SubmissionFingerprint.objects.filter(shingle_count__gt=0)
+    own = fingerprints.filter(submission__assignment=assignment)
+    if across_semesters:
+        # Те саме завдання курсу в інших семестрах (включно із закритими, доки їх не заархівовано)
+        fingerprints = fingerprints.filter(
+            submission__assignment__class_obj__course_id=assignment.class_obj.course_id,
+            submission__assignment__title=assignment.title,
+        )
+    else:
+        fingerprints = own
+
+    index = LSHIndex()
+    for submission_id, signature in fingerprints.values_list('submission_id', 'signature').iterator():
+        index.add(submission_id, bytes(signature))
+    own_ids = set(own.values_list('submission_id', flat=True)) if across_semesters else index.signatures.keys()
+
+    pairs = []
+    for first, second, similarity in index.similar_pairs(threshold):
+        if first not in own_ids:
+            first, second = second, first
+        if first in own_ids:
+            pairs.append(SimilarityPair(assignment=assignment, submission_id=first, matched_id=second,
+                                        similarity=similarity))
+
+    with transaction.atomic():
+        SimilarityPair.objects.filter(assignment=assignment).delete()
+        SimilarityPair.objects.bulk_create(pairs, batch_size=1000)
+    return len(pairs)
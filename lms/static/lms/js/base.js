@@ -0,0 +1,85 @@
+// Активация всплывающих подсказок
+document.addEventListener('DOMContentLoaded', function() {
+    var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
+    var tooltipList = tooltipTriggerList.map(function (tooltipTriggerEl) {
+        return new bootstrap.Tooltip(tooltipTriggerEl);
+    });
+
+    // Автоматическое скрытие alert сообщений через 5 секунд
+    setTimeout(function() {
+        var alerts = document.querySelectorAll('.alert');
+        alerts.forEach(function(alert) {
+            var bsAlert = new bootstrap.Alert(alert);
+            bsAlert.close();
+        });
+    }, 5000);
+
+    // Добавление анимации при загрузке страницы
+    document.querySelector('main').classList.add('fade-in');
+
+    // Подсветка активной ссылки в навигации
+    var currentUrl = window.location.pathname;
+    var navLinks = document.querySelectorAll('.navbar-nav .nav-link');
+
+    navLinks.forEach(function(link) {
+        if (link.getAttribute('href') === currentUrl) {
+            link.classList.add('active');
+        }
+    });
+});
+
+// Push-сповіщення: оцінки, нові завдання та матеріали (Server-Sent Events).
+// Адресу потоку шаблон передає через data-notifications-url на <body> лише для студентів і лише під ASGI.
+(function() {
+    var streamUrl = document.body.dataset.notificationsUrl;
+    if (!streamUrl || !window.EventSource) {
+        return;
+    }
+    var notifications = new EventSource(streamUrl);
+    ['graded', 'assignment', 'material'].forEach(function(eventName) {
+        notifications.addEventListener(eventName, function(event) {
+            var data = JSON.parse(event.data);
+            var container = document.getElementById('push-notifications');
+            var alert = document.createElement('div');
+            alert.className = 'alert alert-info alert-dismissible fade show shadow';
+            alert.setAttribute('role', 'alert');
+            var link = document.createElement('a');
+            link.href = data.url;
+            link.className = 'alert-link';
+            link.textContent = data.title;
+            alert.appendChild(link);
+            if (data.grade !== undefined) {
+                alert.appendChild(document.createTextNode(' - ' + data.grade + '/' + data.max_points));
+            }
+            var close = document.createElement('button');
+            close.type = 'button';
+            close.className = 'btn-close';
+            close.setAttribute('data-bs-dismiss', 'alert');
+            alert.appendChild(close);
+            container.appendChild(alert);
+        });
+    });
+})();
+
+// Функция для подтверждения действий
+function confirmAction(message) {
+    return confirm(message || 'Ви впевнені, що хочете виконати цю дію?');
+}
+
+// Панелі студента й викладача: блоки з data-fragment-url підвантажуються окремими запитами,
+// тож повільний блок не затримує решту сторінки
+document.querySelectorAll('[data-fragment-url]').forEach(function(placeholder) {
+    fetch(placeholder.dataset.fragmentUrl, {credentials: 'same-origin'})
+        .then(function(response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.text();
+        })
+        .then(function(html) {
+            placeholder.innerHTML = html;
+        })
+        .catch(function() {
+            placeholder.querySelector('.card-body').textContent = 'Не вдалося завантажити блок, оновіть сторінку';
+        });
+});
@@ -0,0 +1,55 @@
+from django import template
+from django.utils import timezone
+
+from lms.context_processors import get_request_now
+from lms.feed import bucket_boundaries, due_bucket
+
+register = template.Library()
+
+
+def _now(context):
+    """Час поточного запиту; поза запитом - один на рендеринг шаблону"""
+    request = getattr(context, 'request', None)
+    if request is not None:
+        return get_request_now(request)
+    return context.render_context.setdefault('lms_now', timezone.now())
+
+
+@register.filter
+def truncate_chars(value, max_length):
+    if len(value) > max_length:
+        return value[:max_length] + '...'
+    return value
+
+
+@register.filter
+def days_until(due_date, now=None):
+    """Днів до терміну; now - зазвичай request_now з контекстного процесора"""
+    if due_date:
+        delta = due_date - (now or timezone.now())
+        return delta.days
+    return None
+
+
+@register.filter
+def is_past_due(due_date, now=None):
+    if due_date:
+        return due_date < (now or timezone.now())
+    return False
+
+
+@register.simple_tag(takes_context=True)
+def due_states(context, items, key=None):
+    """
+    Одним проходом додає завданням due_state (кошик стрічки), days_left та is_past_due.
+    items - завдання або словники, в яких завдання лежить під ключем key:
+    {% due_states assignment_data key='assignment' as rows %}
+    """
+    now = _now(context)
+    boundaries = bucket_boundaries(now)
+    for item in items:
+        assignment = item[key] if key else item
+        assignment.due_state = due_bucket(assignment.due_date, now, boundaries)
+        assignment.days_left = (assignment.due_date - now).days
+        assignment.is_past_due = assignment.due_date < now
+    return items
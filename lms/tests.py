@@ -1,3 +1,1235 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time as time_module
+import zipfile
+from datetime import date, time, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.http import FileResponse, HttpResponse
+from django.template import Context, RequestContext, Template, engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.core.files.base import ContentFile
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import dashboard, profiling, querycache
+from .admin import EstimatedCountPaginator
+from .assets import IMMUTABLE, REVALIDATE, serve_static
+from .archive import archive_class, finish_semester
+from .autograder import SandboxResult, bwrap_available, claim_jobs, run_job, save_results
+from .catalog import catalog_page
+from .context_processors import get_request_now
+from .db_routing import PRIMARY, REPLICA, STICKY_COOKIE, ReplicaRouter, ReplicaStickinessMiddleware, read_replica
+from .digest import EmailChannel, FakeTelegramTransport, TelegramChannel, dispatch_batch, enqueue
+from .enrollment_import import (
+    ALREADY_ENROLLED, CLOSED_SEMESTER, NO_SEATS, UNKNOWN_CLASS, UNKNOWN_STUDENT, import_enrollments
+)
+from .feed import (
+    DUE_TODAY, LATER, OVERDUE, THIS_WEEK, bucket_boundaries, build_assignment_feed, due_bucket, get_assignment_feed
+)
+from .grade_stats import apply_linear_curve, apply_percentile_cutoffs, describe, reset_linear_curve
+from .notifications import InProcessBroker, class_channel, format_event, student_channel
+from .registration import (
+    CLOSED, DROPPED, ENROLLED, WAITLISTED, drop, promote_waitlist, register, waitlist_positions
+)
+from .sessions import EXPIRES_AT_KEY
+from .similarity import LSHIndex, minhash
+from .timetable import solve_semester
+from .zipstream import iter_zip
+from .models import (
+    ArchivedEnrollment, ArchivedSubmission, Assignment, AutoGrader, Class, Course, CourseMaterial, Department,
+    Enrollment, Faculty, GradeCurve, GradingJob, Notification, Professor, Room, Schedule, Semester, Student, StudentSubmission,
+    TelegramChat, WaitlistEntry
+)
+
+
+def make_department(name='Кафедра'):
+    return Department.objects.create(name=name, faculty=Faculty.objects.create(name='Факультет'))
+
+
+def make_professor(department, username='professor', **user_fields):
+    return Professor.objects.create(user=User.objects.create_user(username, **user_fields),
+                                    department=department, office='1')
+
+
+def make_student(faculty, username='student', student_id='S1', **user_fields):
+    return Student.objects.create(user=User.objects.create_user(username, **user_fields), student_id=student_id,
+                                  faculty=faculty, enrollment_date=date(2024, 9, 1))
+
+
+def make_course(department, code='C1', name='Курс', **fields):
+    return Course.objects.create(name=name, code=code, description='', credits=5, department=department, **fields)
+
+
+def make_class(course=None, professor=None, semester='Осінь 2024', **fields):
+    """Заняття; курс C1 і викладача, яких не передано, створює разом з кафедрою та факультетом"""
+    department = course.department if course else professor.department if professor else make_department()
+    if isinstance(semester, str):
+        semester = Semester.objects.get_or_create(name=semester)[0]
+    return Class.objects.create(
+        course=course or make_course(department), professor=professor or make_professor(department),
+        semester=semester, **{'schedule': '', 'classroom': '101', **fields},
+    )
+
+
+def faculty_of(class_obj):
+    return class_obj.course.department.faculty
+
+
+class SubmissionAnnotationTest(TestCase):
+    """Анотації StudentSubmissionQuerySet збігаються з обчисленнями в Python"""
+
+    @classmethod
+    def setUpTestData(cls):
+        class_obj = make_class()
+        student = make_student(faculty_of(class_obj))
+        due_date = timezone.now()
+        for title, max_points, grade, late in (('Вчасно', 100, 95, False), ('Запізно', 50, 30, True),
+                                               ('Без балів', 0, 5, False), ('Не оцінено', 10, None, True)):
+            assignment = Assignment.objects.create(title=title, description='', class_obj=class_obj,
+                                                   due_date=due_date, max_points=max_points)
+            submission = StudentSubmission.objects.create(student=student, assignment=assignment, file='s.pdf',
+                                                          grade=grade)
+            # submission_date - auto_now_add, тож запізнення задається після створення
+            StudentSubmission.objects.filter(pk=submission.pk).update(
+                submission_date=due_date + timedelta(hours=1 if late else -1))
+
+    def test_annotations_match_python(self):
+        expected = {
+            submission.assignment.title: (submission.is_late, submission.get_grade_percentage())
+            for submission in StudentSubmission.objects.select_related('assignment')
+        }
+        with self.assertNumQueries(1):
+            annotated = {
+                submission.assignment.title: submission
+                for submission in StudentSubmission.objects.select_related('assignment').with_grade_stats()
+            }
+        for title, submission in annotated.items():
+            with self.subTest(assignment=title):
+                self.assertEqual((submission.is_late, submission.get_grade_percentage()), expected[title])
+
+        self.assertEqual(annotated['Вчасно'].grade_class, 'success')
+        self.assertEqual(annotated['Запізно'].grade_class, 'warning')
+        # Нуль балів за завдання і робота без оцінки не дають відсотка
+        self.assertIsNone(annotated['Без балів'].percentage)
+        self.assertEqual(annotated['Не оцінено'].grade_class, 'secondary')
+
+    def test_late_filter(self):
+        late = StudentSubmission.objects.late().values_list('assignment__title', flat=True)
+        self.assertEqual(sorted(late), ['Запізно', 'Не оцінено'])
+
+
+class AssignmentFeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class()
+        cls.student = make_student(faculty_of(cls.class_obj))
+        Enrollment.objects.create(student=cls.student, class_enrolled=cls.class_obj)
+        # Середина дня за місцевим часом, щоб "сьогодні" і "цього тижня" не залежали від часу запуску
+        cls.now = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0)
+        cls.assignments = {
+            bucket: Assignment.objects.create(title=bucket, description='', class_obj=cls.class_obj,
+                                              due_date=cls.now + offset)
+            for bucket, offset in ((OVERDUE, -timedelta(hours=1)), (DUE_TODAY, timedelta(hours=3)),
+                                   (THIS_WEEK, timedelta(days=3)), (LATER, timedelta(days=30)))
+        }
+
+    def setUp(self):
+        cache.clear()
+
+    def test_buckets_match_python_and_expire_at_next_deadline(self):
+        feed, timeout = build_assignment_feed(self.student, self.now)
+        boundaries = bucket_boundaries(self.now)
+        for bucket, rows in feed['buckets'].items():
+            self.assertEqual([row['title'] for row in rows], [bucket])
+            self.assertEqual(due_bucket(rows[0]['due_date'], self.now, boundaries), bucket)
+        # Найближча зміна кошиків - термін завдання "сьогодні", а не північ
+        self.assertEqual(timeout, 3 * 60 * 60 + 1)
+
+    def test_cache_dropped_on_submission(self):
+        self.assertEqual(get_assignment_feed(self.student)['total'], 4)
+        with self.assertNumQueries(0):
+            get_assignment_feed(self.student)
+        StudentSubmission.objects.create(student=self.student, assignment=self.assignments[LATER], file='s.pdf')
+        self.assertEqual(get_assignment_feed(self.student)['total'], 3)
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        professor = make_professor(department)
+        cls.student = make_student(department.faculty)
+        for index in range(3):
+            class_obj = make_class(make_course(department, f'C{index}', f'Курс {index}'), professor)
+            # Студент бачить лише заняття, на які записаний
+            if index < 2:
+                Enrollment.objects.create(student=cls.student, class_enrolled=class_obj)
+
+    def setUp(self):
+        self.client.force_login(self.student.user)
+
+    def test_cursor_pagination_and_sparse_fields(self):
+        url = reverse('api_v1:resource', args=['classes'])
+        page = self.client.get(url, {'limit': 1, 'fields': 'id,course_code'}).json()
+        self.assertEqual(list(page['results'][0]), ['id', 'course_code'])
+        second = self.client.get(page['next']).json()
+        self.assertIsNone(second['next'])
+        self.assertEqual([row['course_code'] for row in page['results'] + second['results']], ['C0', 'C1'])
+
+        self.assertEqual(self.client.get(url, {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'не-курсор'}).status_code, 400)
+
+    def test_etag_and_authentication(self):
+        url = reverse('api_v1:resource', args=['courses'])
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 3)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class ClassConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class(schedule='Пн 08:30')
+        cls.course = cls.class_obj.course
+        cls.student = make_student(faculty_of(cls.class_obj))
+        Enrollment.objects.create(student=cls.student, class_enrolled=cls.class_obj)
+
+    def setUp(self):
+        self.client.force_login(self.student.user)
+        self.url = reverse('class_detail', args=[self.class_obj.id])
+        # ETag включає CSRF-токен, який з'являється в cookie після першої сторінки
+        self.client.get(self.url)
+
+    def assertNotModified(self, etag):
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def assertModified(self, etag):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_edits_of_existing_rows_change_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotModified(etag)
+
+        self.class_obj.classroom = '202'
+        self.class_obj.save()
+        etag = self.assertModified(etag)
+
+        self.course.description = 'Новий опис'
+        self.course.save()
+        etag = self.assertModified(etag)
+
+        assignment = Assignment.objects.create(title='Завдання', description='', class_obj=self.class_obj,
+                                               due_date=timezone.now())
+        etag = self.assertModified(etag)
+        assignment.title = 'Інша назва'
+        assignment.save()
+        etag = self.assertModified(etag)
+        self.assertNotModified(etag)
+
+    def test_no_304_without_access(self):
+        etag = self.client.get(self.url)['ETag']
+        Enrollment.objects.all().delete()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 403)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'PRAGMA лише для SQLite')
+class SqlitePragmasTest(TestCase):
+
+    def pragmas(self, *names):
+        new_connection = connections.create_connection('default')
+        self.addCleanup(new_connection.close)
+        with new_connection.cursor() as cursor:
+            return [cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in names]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234, 'busy_timeout': 4321, 'temp_store': 'MEMORY'})
+    def test_pragmas_applied_to_new_connections(self):
+        self.assertEqual(self.pragmas('cache_size', 'busy_timeout', 'temp_store'), [-1234, 4321, 2])
+
+
+@patch('lms.db_routing.replica_configured', return_value=True)
+class ReplicaRoutingTest(SimpleTestCase):
+
+    router = ReplicaRouter()
+
+    def setUp(self):
+        # Записи попередніх тестів у цьому потоці лишили прапорець запису: тест починається як новий запит
+        middleware = ReplicaStickinessMiddleware(None)
+        self.addCleanup(middleware.reset, middleware.process_request(RequestFactory().get('/')))
+
+    def reads_from(self):
+        return self.router.db_for_read(Course)
+
+    def test_reads_inside_read_replica_until_write(self, configured):
+        self.assertEqual(self.reads_from(), PRIMARY)
+        with read_replica():
+            self.assertEqual(self.reads_from(), REPLICA)
+        self.assertEqual(self.reads_from(), PRIMARY)
+
+        def view(request):
+            with read_replica():
+                before = self.reads_from()
+                self.router.db_for_write(Course)
+                return HttpResponse(f'{before} {self.reads_from()}')
+
+        middleware = ReplicaStickinessMiddleware(view)
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response.content.decode(), f'{REPLICA} {PRIMARY}')
+        # Після запису користувач читає з основної БД, поки діє cookie
+        cookie = response.cookies[STICKY_COOKIE].value
+        response = ReplicaStickinessMiddleware(lambda request: HttpResponse(read_replica()(self.reads_from)()))(
+            RequestFactory().get('/', HTTP_COOKIE=f'{STICKY_COOKIE}={cookie}'))
+        self.assertEqual(response.content.decode(), PRIMARY)
+
+    def test_decorated_view_used_concurrently(self, configured):
+        @read_replica()
+        def view(barrier):
+            barrier.wait(timeout=5)
+            return self.reads_from()
+
+        barrier, results = threading.Barrier(2), []
+        threads = [threading.Thread(target=lambda: results.append(view(barrier))) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [REPLICA, REPLICA])
+
+        @read_replica()
+        async def async_view():
+            await asyncio.sleep(0)
+            return self.reads_from()
+
+        async def overlapping():
+            return await asyncio.gather(async_view(), async_view())
+
+        self.assertEqual(asyncio.run(overlapping()), [REPLICA, REPLICA])
+        self.assertEqual(self.reads_from(), PRIMARY)
+
+
+class LazySessionRefreshTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student')
+
+    def saved_session(self):
+        """Чи записав запит сесію: тоді у відповіді з'являється cookie сесії"""
+        response = self.client.get(reverse('course_catalog'))
+        return settings.SESSION_COOKIE_NAME in response.cookies
+
+    def test_session_saved_only_near_expiry(self):
+        self.client.force_login(self.user)
+        self.assertTrue(self.saved_session())
+        self.assertFalse(self.saved_session())
+        self.assertFalse(self.saved_session())
+
+        session = self.client.session
+        session[EXPIRES_AT_KEY] = time_module.time() + settings.SESSION_REFRESH_THRESHOLD - 60
+        session.save()
+        self.assertTrue(self.saved_session())
+        self.assertFalse(self.saved_session())
+
+    def test_anonymous_session_not_created(self):
+        self.assertFalse(self.saved_session())
+
+
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class()
+        cls.student = make_student(faculty_of(cls.class_obj))
+        Enrollment.objects.create(student=cls.student, class_enrolled=cls.class_obj)
+        assignment = Assignment.objects.create(title='Лабораторна', description='', class_obj=cls.class_obj,
+                                               due_date=timezone.now(), max_points=10)
+        StudentSubmission.objects.create(student=cls.student, assignment=assignment, file='s.pdf', grade=8)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory(prefix='lms-test-media-')
+        self.addCleanup(media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.data = bytes(range(256)) * 1024
+        material = CourseMaterial(title='Лекція', class_obj=self.class_obj)
+        material.file.save('lecture.pdf', ContentFile(self.data))
+        self.url = reverse('download_material', args=[material.id])
+
+    def test_download_streams_file_under_wsgi_and_asgi(self):
+        self.client.force_login(self.student.user)
+        response = self.client.get(self.url)
+        # Під WSGI - FileResponse із синхронним ітератором, а не зібраний у пам'ять асинхронний
+        self.assertIsInstance(response, FileResponse)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertIn('lecture', response['Content-Disposition'])
+
+        async def download():
+            client = AsyncClient()
+            await client.aforce_login(self.student.user)
+            response = await client.get(self.url)
+            self.assertTrue(response.is_async)
+            self.assertEqual(response['Content-Length'], str(len(self.data)))
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(async_to_sync(download)(), self.data)
+
+    def test_download_and_grades_access(self):
+        outsider = make_student(self.student.faculty, 'outsider', 'S2')
+        self.client.force_login(outsider.user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('student_grades'))
+        self.assertContains(response, 'Лабораторна')
+        self.assertContains(response, '8/10')
+
+
+class NotificationStreamTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_student(Faculty.objects.create(name='Факультет'))
+
+    def test_stream_only_under_asgi(self):
+        self.client.force_login(self.student.user)
+        stream_url = reverse('notification_stream')
+        # Під WSGI сторінка не відкриває потік, а сам потік не займає робочий потік
+        self.assertNotContains(self.client.get(reverse('home')), 'data-notifications-url')
+        self.assertEqual(self.client.get(stream_url).status_code, 204)
+
+        async def home_page():
+            client = AsyncClient()
+            await client.aforce_login(self.student.user)
+            return await client.get(reverse('home'))
+
+        self.assertContains(async_to_sync(home_page)(), f'data-notifications-url="{stream_url}"')
+
+    def test_in_process_broker_delivers_to_subscribed_channels(self):
+        broker = InProcessBroker()
+
+        async def receive():
+            async with broker.subscribe([student_channel(1), class_channel(7)]) as subscription:
+                # Публікація з іншого потоку, як із сигналу синхронного представлення
+                await asyncio.to_thread(broker.publish, class_channel(8), {'event': 'material'})
+                await asyncio.to_thread(broker.publish, class_channel(7), {'event': 'assignment'})
+                message = await subscription.get(timeout=1)
+                return message, await subscription.get(timeout=0.01)
+
+        self.assertEqual(asyncio.run(receive()), ({'event': 'assignment'}, None))
+        self.assertEqual(broker._subscribers, {})
+        self.assertEqual(format_event({'event': 'graded', 'grade': 9}),
+                         'event: graded\ndata: {"event": "graded", "grade": 9}\n\n')
+
+
+class BrokenTelegramTransport(FakeTelegramTransport):
+
+    async def __aenter__(self):
+        raise ConnectionError('Bot API недоступний')
+
+
+class DigestTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f'student{index}', f's{index}@example.com') for index in range(2)]
+        for user in cls.users:
+            TelegramChat.objects.create(user=user, chat_id=user.username)
+            enqueue([user.pk], Notification.GRADE, 'Оцінено: Лабораторна', dedup_key='grade:1:9')
+
+    def setUp(self):
+        FakeTelegramTransport.outbox = []
+
+    def telegram(self, transport=FakeTelegramTransport):
+        return TelegramChannel(transport(), rate_limit=0)
+
+    def test_batches_and_min_interval(self):
+        channels = [EmailChannel(), self.telegram()]
+        self.assertEqual(dispatch_batch(channels, batch_size=1), 1)
+        self.assertEqual(dispatch_batch(channels, batch_size=1), 1)
+        self.assertEqual(dispatch_batch(channels, batch_size=1), 0)
+        self.assertEqual([message.to for message in mail.outbox], [['s0@example.com'], ['s1@example.com']])
+        self.assertEqual(len(FakeTelegramTransport.outbox), 2)
+
+        # Нова подія чекає, поки мине DIGEST_MIN_INTERVAL від попереднього дайджесту
+        enqueue([self.users[0].pk], Notification.DEADLINE, 'Термін здачі', dedup_key='deadline:1')
+        self.assertEqual(dispatch_batch(channels), 0)
+        later = timezone.now() + timedelta(seconds=settings.DIGEST_MIN_INTERVAL + 1)
+        self.assertEqual(dispatch_batch(channels, now=later), 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_channel_retried_without_resending_others(self):
+        with self.assertRaises(ConnectionError), self.assertLogs('lms.digest', 'ERROR'):
+            dispatch_batch([EmailChannel(), self.telegram(BrokenTelegramTransport)])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=False).exists())
+        self.assertEqual(set(Notification.objects.values_list('delivered_channels', flat=True)), {'email'})
+
+        self.assertEqual(dispatch_batch([EmailChannel(), self.telegram()]), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(len(FakeTelegramTransport.outbox), 2)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+
+    @patch('lms.signals.notify')
+    def test_grade_push_only_when_grade_changes(self, notify):
+        class_obj = make_class()
+        assignment = Assignment.objects.create(title='Лабораторна', description='', class_obj=class_obj,
+                                               due_date=timezone.now(), max_points=10)
+        notify.reset_mock()
+        student = Student.objects.create(user=self.users[0], student_id='S1', faculty=faculty_of(class_obj),
+                                         enrollment_date=date(2024, 9, 1))
+        submission = StudentSubmission.objects.create(student=student, assignment=assignment, file='s.pdf')
+
+        for grade, comment in ((8, ''), (8, 'Гарна робота'), (9, 'Гарна робота')):
+            submission.grade, submission.teacher_feedback = grade, comment
+            submission.save()
+        self.assertEqual([call.kwargs['grade'] for call in notify.call_args_list], [8, 9])
+
+
+class ProductionProfileTest(SimpleTestCase):
+
+    def import_settings(self, **environ):
+        return subprocess.run(
+            [sys.executable, '-c', 'import university_system.settings'], cwd=settings.BASE_DIR,
+            env={**os.environ, 'LMS_PRODUCTION': '1', **environ}, capture_output=True, text=True,
+        )
+
+    def test_allowed_hosts_required(self):
+        environ = {key: value for key, value in os.environ.items() if key != 'LMS_ALLOWED_HOSTS'}
+        with patch.dict(os.environ, environ, clear=True):
+            failed = self.import_settings()
+        self.assertNotEqual(failed.returncode, 0)
+        self.assertIn('LMS_ALLOWED_HOSTS', failed.stderr)
+        self.assertEqual(self.import_settings(LMS_ALLOWED_HOSTS='lms.example.edu').returncode, 0)
+
+    def test_templates_use_default_cached_loader(self):
+        self.assertIsInstance(engines['django'].engine.template_loaders[0], CachedLoader)
+
+    def test_hashed_static_cached_forever(self):
+        static_root = tempfile.TemporaryDirectory(prefix='lms-test-static-')
+        self.addCleanup(static_root.cleanup)
+        for name in ('base.0123abcd.css', 'base.css'):
+            with open(os.path.join(static_root.name, name), 'w') as file:
+                file.write('body {}')
+        request = RequestFactory().get('/')
+        with override_settings(STATIC_ROOT=static_root.name), \
+                patch('lms.assets.hashed_names', return_value={'base.0123abcd.css'}):
+            for name, cache_control in (('base.0123abcd.css', IMMUTABLE), ('base.css', REVALIDATE)):
+                response = serve_static(request, name)
+                response.close()
+                self.assertEqual(response['Cache-Control'], cache_control)
+
+
+class TemplateTagsTest(SimpleTestCase):
+
+    def test_due_states_use_one_now_per_request(self):
+        request = RequestFactory().get('/')
+        now = get_request_now(request)
+        assignments = [Assignment(title='Минуле', due_date=now - timedelta(hours=1)),
+                       Assignment(title='Пізніше', due_date=now + timedelta(days=30, hours=1))]
+        html = Template(
+            '{% load lms_filters %}{% due_states assignments as rows %}'
+            '{% for a in rows %}{{ a.title }}:{{ a.due_state }}:{{ a.days_left }}:{{ a.is_past_due }};{% endfor %}'
+            '{{ assignments.1.due_date|days_until:request_now }}'
+        ).render(RequestContext(request, {'assignments': assignments, 'request_now': now}))
+        self.assertEqual(html, 'Минуле:overdue:-1:True;Пізніше:later:30:False;30')
+
+    def test_due_states_with_key_and_filters(self):
+        assignment = Assignment(title='Завдання', due_date=timezone.now() + timedelta(days=3))
+        Template('{% load lms_filters %}{% due_states rows key="assignment" as rows %}').render(
+            Context({'rows': [{'assignment': assignment}]}))
+        self.assertEqual((assignment.due_state, assignment.is_past_due), (THIS_WEEK, False))
+        html = Template('{% load lms_filters %}{{ text|truncate_chars:5 }}|{{ none|days_until }}').render(
+            Context({'text': 'Алгоритми', 'none': None}))
+        self.assertEqual(html, 'Алгор...|None')
+
+
+class EnrollmentImportTest(TestCase):
+    """Масовий запис з CSV дотримується місткості та скидає блоки курсів"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class(capacity=2)
+        cls.students = [make_student(faculty_of(cls.class_obj), f'student{index}', f'S{index}') for index in range(4)]
+        Enrollment.objects.create(student=cls.students[0], class_enrolled=cls.class_obj)
+
+    def _csv(self, *student_ids):
+        rows = ''.join(f'{student_id},c1,Осінь 2024\n' for student_id in student_ids)
+        return io.StringIO('student_id,course_code,semester\n' + rows)
+
+    def test_rows_over_capacity_are_reported(self):
+        result = import_enrollments(self._csv('S0', 'S1', 'S2', 'S3', 'S9'), dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.summary(), {ALREADY_ENROLLED: 1, NO_SEATS: 2, UNKNOWN_STUDENT: 1})
+        self.assertEqual(Enrollment.objects.count(), 1)
+
+        key = dashboard.CACHE_KEY.format('courses', self.students[1].id)
+        cache.set(key, 'старий блок')
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_enrollments(self._csv('S1', 'S2'))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _, reason in result.skipped if reason == NO_SEATS], [3])
+        self.assertEqual(Enrollment.objects.count(), 2)
+        self.assertIsNone(cache.get(key))
+
+    def test_imported_student_leaves_waitlist(self):
+        for student in self.students[1:3]:
+            WaitlistEntry.objects.create(student=student, class_obj=self.class_obj)
+        self.assertEqual(import_enrollments(self._csv('S1')).created, 1)
+        self.assertEqual(list(WaitlistEntry.objects.values_list('student_id', flat=True)), [self.students[2].id])
+
+        # Звільнене місце дістається наступному в черзі, а не вже записаному
+        Enrollment.objects.filter(student=self.students[0]).delete()
+        self.assertEqual(promote_waitlist(self.class_obj.id), [self.students[2].id])
+        self.assertEqual(Enrollment.objects.count(), 2)
+
+    def test_unlimited_capacity(self):
+        Class.objects.filter(pk=self.class_obj.pk).update(capacity=None)
+        result = import_enrollments(self._csv('S1', 'S2', 'S3'))
+        self.assertEqual((result.created, result.skipped), (3, []))
+
+    def test_closed_semester_is_not_imported(self):
+        Semester.objects.create(name='Весна 2024', is_active=False)
+        Class.all_objects.filter(pk=self.class_obj.pk).update(semester='Весна 2024')
+        csv_file = io.StringIO('student_id,course_code,semester\nS1,C1,Весна 2024\nS1,C1,Літо 2024\n')
+        result = import_enrollments(csv_file)
+        self.assertEqual(result.summary(), {CLOSED_SEMESTER: 1, UNKNOWN_CLASS: 1})
+        self.assertFalse(Enrollment.all_objects.filter(student=self.students[1]).exists())
+
+
+class AdminChangelistQueryCountTest(TestCase):
+    """Кількість запитів списку в адмінці не залежить від кількості рядків"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.department = make_department()
+        cls.faculty = cls.department.faculty
+        Semester.objects.bulk_create([Semester(name='S0'), Semester(name='S1')])
+        cls.rows = 0
+        cls.add_rows(2)
+
+    @classmethod
+    def add_rows(cls, count):
+        """Кожен рядок - окремий ланцюжок пов'язаних об'єктів, щоб N+1 було видно"""
+        for _ in range(count):
+            n = cls.rows = cls.rows + 1
+            professor = make_professor(cls.department, f'professor{n}', first_name='Викладач', last_name=str(n))
+            class_obj = make_class(make_course(cls.department, f'C{n}', f'Курс {n}'), professor, f'S{n % 2}')
+            student = make_student(cls.faculty, f'student{n}', f'S{n}', first_name='Студент', last_name=str(n))
+            student_user = student.user
+            Enrollment.objects.create(student=student, class_enrolled=class_obj)
+            CourseMaterial.objects.create(title=f'Матеріал {n}', file='m.pdf', class_obj=class_obj)
+            Schedule.objects.create(class_obj=class_obj, day_of_week='MON', start_time=time(9),
+                                    end_time=time(10), classroom='101')
+            assignment = Assignment.objects.create(title=f'Завдання {n}', description='', class_obj=class_obj,
+                                                   due_date=timezone.now() + timedelta(days=n))
+            submission = StudentSubmission.objects.create(student=student, assignment=assignment, file='s.pdf')
+            submission.grade = 90
+            submission.save()
+            TelegramChat.objects.create(user=student_user, chat_id=str(n))
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_have_no_n_plus_one(self):
+        self.client.force_login(self.admin_user)
+        models = [model for model in admin.site._registry if model._meta.app_label == 'lms']
+        self.assertIn(Assignment, models)
+        self.assertIn(StudentSubmission, models)
+        # Перший запит прогріває кеш сесії, щоб він не потрапив у замір
+        self.client.get(reverse('admin:index'))
+
+        before = {model: self.changelist_queries(model) for model in models}
+        self.add_rows(5)
+        for model in models:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self.changelist_queries(model), before[model])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('student')
+        Notification.objects.bulk_create([
+            Notification(user=user, event=Notification.GRADE, title=str(i), dedup_key=str(i))
+            for i in range(5)
+        ])
+
+    def test_small_table_uses_exact_count(self):
+        paginator = EstimatedCountPaginator(Notification.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 5)
+
+    def test_large_unfiltered_table_uses_estimate(self):
+        queryset = Notification.objects.order_by('pk')
+        paginator = EstimatedCountPaginator(queryset, 2)
+        paginator.threshold = 0
+        with CaptureQueriesContext(connection) as queries:
+            self.assertGreaterEqual(paginator.count, 5)
+        self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+
+    def test_filtered_queryset_uses_exact_count(self):
+        paginator = EstimatedCountPaginator(Notification.objects.filter(title='1').order_by('pk'), 2)
+        paginator.threshold = 0
+        self.assertEqual(paginator.count, 1)
+
+
+class SemesterArchiveTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        cls.course = make_course(department)
+        cls.student = make_student(department.faculty)
+        cls.semester = Semester.objects.create(name='Осінь 2024', is_active=False)
+        cls.class_obj = make_class(cls.course, make_professor(department, last_name='Іванова'), cls.semester)
+        Enrollment.objects.create(student=cls.student, class_enrolled=cls.class_obj, grade='B')
+        assignment = Assignment.objects.create(title='Завдання', description='', class_obj=cls.class_obj,
+                                               due_date=timezone.now(), max_points=50)
+        StudentSubmission.objects.create(student=cls.student, assignment=assignment, file='s.pdf', grade=40)
+
+    def test_scoped_managers_hide_closed_semesters(self):
+        self.assertFalse(Class.objects.exists())
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse(StudentSubmission.objects.with_grade_stats().exists())
+        self.assertEqual(StudentSubmission.all_objects.count(), 1)
+        # Менеджер за замовчуванням (зв'язки, адмінка) бачить усі семестри
+        self.assertTrue(self.student.enrollment_set.exists())
+
+    def test_admin_edits_rows_of_closed_semester(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        enrollment = Enrollment.all_objects.get()
+        data = {'student': self.student.pk, 'class_enrolled': self.class_obj.pk, 'grade': 'A'}
+        response = self.client.post(reverse('admin:lms_enrollment_change', args=[enrollment.pk]), data)
+        self.assertRedirects(response, reverse('admin:lms_enrollment_changelist'))
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.grade, 'A')
+
+        # Повтор у закритому семестрі - помилка форми, а не IntegrityError
+        response = self.client.post(reverse('admin:lms_enrollment_add'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Enrollment.all_objects.count(), 1)
+        self.assertContains(response, 'errornote')
+
+    def test_archive_moves_rows_and_keeps_transcript(self):
+        self.assertEqual(archive_class(Class.all_objects.select_related('professor__user').get()), (1, 1))
+        self.assertTrue(finish_semester(self.semester))
+        self.assertFalse(Enrollment.all_objects.exists())
+        self.assertFalse(StudentSubmission.all_objects.exists())
+
+        archived = ArchivedEnrollment.objects.get()
+        self.assertEqual((archived.course, archived.grade, archived.points, archived.max_points),
+                         (self.course, 'B', 40, 50))
+        self.assertEqual(ArchivedSubmission.objects.get().enrollment, archived)
+
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('student_transcript'))
+        self.assertContains(response, 'Осінь 2024')
+        self.assertContains(response, '40/50')
+
+
+class SimilarityIndexTest(SimpleTestCase):
+
+    def test_lsh_finds_only_near_duplicates(self):
+        words = [f'слово{i}' for i in range(400)]
+        original = ' '.join(words)
+        edited = ' '.join(words[:390] + ['інше'] * 10)
+        unrelated = ' '.join(reversed(words))
+
+        index = LSHIndex()
+        for key, text in (('original', original), ('edited', edited), ('unrelated', unrelated)):
+            signature, shingle_count = minhash(text)
+            self.assertGreater(shingle_count, 0)
+            index.add(key, signature)
+
+        pairs = list(index.similar_pairs(0.5))
+        self.assertEqual([(first, second) for first, second, _ in pairs], [('edited', 'original')])
+        self.assertGreater(pairs[0][2], 0.8)
+
+    def test_empty_text_has_no_signature(self):
+        self.assertEqual(minhash(' ... '), (b'', 0))
+
+
+HARNESS = b"""import unittest
+from solution import add
+
+
+class AddTest(unittest.TestCase):
+    def test_positive(self):
+        self.assertEqual(add(1, 2), 3)
+
+    def test_negative(self):
+        self.assertEqual(add(-1, -2), -3)
+"""
+
+
+STACK_HARNESS = b"""import unittest
+import solution
+
+
+class StackTest(unittest.TestCase):
+    def test_push_pop(self):
+        stack = solution.Stack()
+        stack.push([1, 2])
+        stack.push('x')
+        self.assertEqual(len(stack), 2)
+        self.assertEqual(stack.pop(), 'x')
+        self.assertEqual(list(stack), [[1, 2]])
+
+    def test_empty(self):
+        with self.assertRaises(IndexError):
+            solution.Stack().pop()
+"""
+
+
+class AutoGraderTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory(prefix='lms-test-media-')
+        self.addCleanup(media.cleanup)
+        # Без bwrap у тестовому оточенні - порожня обгортка; процеси запускача й роботи від неї не залежать
+        media_settings = override_settings(MEDIA_ROOT=media.name,
+                                           AUTOGRADER_SANDBOX=None if bwrap_available() else 'env')
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        department = make_department()
+        class_obj = make_class(make_course(department, 'PY101', 'Python'), semester='Весна 2024')
+        self.assignment = Assignment.objects.create(title='Додавання', description='', class_obj=class_obj,
+                                                    due_date=timezone.now(), max_points=10)
+        self.grader = AutoGrader(assignment=self.assignment, timeout=5)
+        self.grader.harness.save('harness.py', ContentFile(HARNESS))
+        self.faculty = department.faculty
+
+    def submit(self, username, source):
+        student = make_student(self.faculty, username, username)
+        submission = StudentSubmission(student=student, assignment=self.assignment)
+        submission.file.save('solution.py', ContentFile(source))
+        return submission
+
+    def test_submissions_are_queued_run_and_graded(self):
+        correct = self.submit('s1', b'def add(a, b):\n    return a + b\n')
+        partial = self.submit('s2', b'def add(a, b):\n    return abs(a) + abs(b)\n')
+        broken = self.submit('s3', b'def add(a, b)\n')
+        self.assertEqual(GradingJob.objects.filter(status=GradingJob.QUEUED).count(), 3)
+
+        jobs = claim_jobs(10)
+        self.assertEqual(save_results([(job, run_job(job)) for job in jobs]), 3)
+
+        for submission, grade in ((correct, 10), (partial, 5), (broken, 0)):
+            submission.refresh_from_db()
+            self.assertEqual(submission.grade, grade)
+            self.assertIsNotNone(submission.graded_at)
+        self.assertIn('test_negative', partial.teacher_feedback)
+        self.assertIn('SyntaxError', broken.teacher_feedback)
+        self.assertFalse(GradingJob.objects.exclude(status=GradingJob.DONE).exists())
+
+    def test_report_cannot_be_forged(self):
+        forged = json.dumps({'total': 2, 'passed': 2, 'failed': []})
+        submission = self.submit('s1', (
+            'import os, sys\n'
+            f'sys.__stdout__.write({forged!r} + "\\n")\n'
+            'sys.__stdout__.flush()\n'
+            'os._exit(0)\n'
+        ).encode())
+        save_results([(job, run_job(job)) for job in claim_jobs(10)])
+        submission.refresh_from_db()
+        self.assertEqual(submission.grade, 0)
+        self.assertIn(forged, GradingJob.objects.get().log)
+
+    def test_objects_stay_in_solution_process(self):
+        self.grader.harness.save('harness.py', ContentFile(STACK_HARNESS))
+        submission = self.submit('s1', (
+            b'class Stack:\n'
+            b'    def __init__(self):\n'
+            b'        self.items = []\n'
+            b'    def push(self, item):\n'
+            b'        self.items.append(item)\n'
+            b'    def pop(self):\n'
+            b'        return self.items.pop()\n'
+            b'    def __len__(self):\n'
+            b'        return len(self.items)\n'
+            b'    def __iter__(self):\n'
+            b'        return iter(self.items)\n'
+        ))
+        save_results([(job, run_job(job)) for job in claim_jobs(10)])
+        submission.refresh_from_db()
+        self.assertEqual((submission.grade, GradingJob.objects.get().passed), (10, 2))
+
+    def test_grader_deleted_while_queued(self):
+        submissions = [self.submit(f's{index}', b'def add(a, b):\n    return a + b\n') for index in range(2)]
+        self.grader.delete()
+        jobs = claim_jobs(10)
+        results = [SandboxResult(error='boom'), SandboxResult(report={'total': 2, 'passed': 2, 'failed': []})]
+        self.assertEqual(save_results(list(zip(jobs, results))), 0)
+        self.assertEqual(set(GradingJob.objects.values_list('status', flat=True)), {GradingJob.FAILED})
+        for submission in submissions:
+            submission.refresh_from_db()
+            self.assertIsNone(submission.grade)
+
+    def test_refuses_to_run_without_sandbox(self):
+        self.submit('s1', b'def add(a, b):\n    return a + b\n')
+        with override_settings(AUTOGRADER_SANDBOX=None), patch('lms.autograder.bwrap_available', return_value=None):
+            with self.assertRaises(CommandError):
+                call_command('autograde', '--once', stdout=io.StringIO())
+            with self.assertLogs('lms.autograder', 'ERROR'):
+                self.assertIn('bwrap', run_job(claim_jobs(10)[0]).error)
+
+
+class ZipStreamTest(SimpleTestCase):
+
+    def test_streamed_archive_is_valid(self):
+        def missing():
+            raise FileNotFoundError
+
+        data = bytes(range(256)) * 1024
+        chunks = list(iter_zip([
+            ('S1.py', (2024, 9, 1, 10, 0, 0), lambda: io.BytesIO(data)),
+            ('S2.zip', (2024, 9, 1, 10, 0, 0), missing),
+            ('manifest.csv', (2024, 9, 2, 0, 0, 0), b'student_id\nS1\n'),
+        ]))
+        self.assertGreater(len(chunks), 2)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.namelist(), ['S1.py', 'manifest.csv'])
+            self.assertEqual(archive.read('S1.py'), data)
+
+
+class GradeStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class()
+        cls.professor = cls.class_obj.professor
+        cls.assignment = Assignment.objects.create(title='Завдання', description='', class_obj=cls.class_obj,
+                                                   due_date=timezone.now(), max_points=100)
+        for index, grade in enumerate([40, 50, 60, 70, 80]):
+            student = make_student(faculty_of(cls.class_obj), f'student{index}', f'S{index}')
+            Enrollment.objects.create(student=student, class_enrolled=cls.class_obj)
+            StudentSubmission.objects.create(student=student, assignment=cls.assignment, file='s.py', grade=grade)
+
+    def test_describe(self):
+        stats = describe([40, 50, 60, 70, 80])
+        self.assertEqual((stats['mean'], stats['median'], stats['min'], stats['max']), (60, 60, 40, 80))
+        self.assertAlmostEqual(stats['stdev'], 200 ** 0.5)
+        self.assertEqual(stats['percentiles']['p25'], 50)
+        self.assertEqual(sum(stats['histogram']), 5)
+        self.assertEqual(stats['histogram'][8], 1)
+
+    def test_linear_curve_is_recomputed_from_raw_grades_and_reset(self):
+        self.assertEqual(apply_linear_curve(self.assignment, 70), 5)
+        apply_linear_curve(self.assignment, 75)
+        grades = StudentSubmission.objects.order_by('grade').values_list('grade', 'raw_grade')
+        self.assertEqual(list(grades), [(55, 40), (65, 50), (75, 60), (85, 70), (95, 80)])
+
+        self.assertEqual(reset_linear_curve(self.assignment), 5)
+        self.assertEqual(sorted(StudentSubmission.objects.values_list('grade', flat=True)), [40, 50, 60, 70, 80])
+        self.assertFalse(StudentSubmission.objects.filter(raw_grade__isnull=False).exists())
+
+    @patch('lms.signals.notify')
+    def test_reset_curve_announces_restored_grades(self, notify):
+        apply_linear_curve(self.assignment, 60)
+        StudentSubmission.objects.filter(grade=40).update(grade=45)
+        key = dashboard.CACHE_KEY.format('grades', StudentSubmission.objects.get(grade=45).student_id)
+        cache.set(key, 'старий блок')
+        notify.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reset_linear_curve(self.assignment), 5)
+        # Решта оцінок після кривої зі зсувом 0 не змінилася, тож і сповіщати нема про що
+        self.assertEqual([call.kwargs['grade'] for call in notify.call_args_list], [40])
+        self.assertIsNone(cache.get(key))
+
+    def test_percentile_cutoffs_replace_fixed_thresholds(self):
+        curve = apply_percentile_cutoffs(self.class_obj, {'A': 20, 'B': 20, 'C': 20, 'D': 20})
+        self.assertEqual([cutoff for cutoff, _ in curve.cutoffs()], [72, 64, 56, 48])
+
+        self.client.force_login(self.professor.user)
+        response = self.client.get(reverse('grade_statistics', args=[self.class_obj.id]))
+        letters = [row['letter'] for row in response.context['student_rows']]
+        self.assertEqual(letters, ['A', 'B', 'C', 'D', 'F'])
+        self.assertEqual(GradeCurve.objects.get().class_obj, self.class_obj)
+
+
+class RegistrationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.class_obj = make_class(capacity=2, registration_opens_at=timezone.now() - timedelta(hours=1))
+        cls.students = [make_student(faculty_of(cls.class_obj), f'student{index}', f'S{index}') for index in range(4)]
+
+    def test_waitlist_is_promoted_in_order(self):
+        outcomes = [register(student, self.class_obj.id) for student in self.students]
+        self.assertEqual(outcomes, [ENROLLED, ENROLLED, WAITLISTED, WAITLISTED])
+        self.assertEqual(waitlist_positions(self.students[3]), {self.class_obj.id: 2})
+
+        self.assertEqual(drop(self.students[0], self.class_obj.id), DROPPED)
+        enrolled = set(Enrollment.objects.values_list('student_id', flat=True))
+        self.assertEqual(enrolled, {self.students[1].id, self.students[2].id})
+        self.assertEqual(waitlist_positions(self.students[3]), {self.class_obj.id: 1})
+
+    def test_closed_registration(self):
+        Class.objects.filter(pk=self.class_obj.pk).update(registration_closes_at=timezone.now())
+        self.assertEqual(register(self.students[0], self.class_obj.id), CLOSED)
+        self.assertFalse(Enrollment.objects.exists() or WaitlistEntry.objects.exists())
+
+        self.client.force_login(self.students[0].user)
+        response = self.client.post(reverse('register_for_class', args=[self.class_obj.id]), follow=True)
+        self.assertContains(response, 'Реєстрацію на це заняття закрито')
+
+
+class CourseCatalogTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        faculty = Faculty.objects.create(name='Факультет')
+        cls.departments = [Department.objects.create(name=f'Кафедра {index}', faculty=faculty) for index in range(2)]
+        professor = make_professor(cls.departments[0])
+        for code, name, department, credits in (('CS101', 'Алгоритми', 0, 5), ('CS102', 'Бази даних', 0, 4),
+                                                ('MA101', 'Алгебра', 1, 5)):
+            course = Course.objects.create(name=name, code=code, description='', credits=credits,
+                                           department=cls.departments[department])
+            if code != 'MA101':
+                make_class(course, professor)
+
+    def test_facets_and_prefix_search(self):
+        page, facets = catalog_page({'q': 'алг'}, 1)
+        self.assertEqual([course.code for course in page], ['CS101', 'MA101'])
+        self.assertEqual({option['label']: option['count'] for option in facets['credits']}, {'5': 2})
+
+        # Фасет не звужується власним фільтром, щоб можна було обрати іншу кафедру
+        page, facets = catalog_page({'department': str(self.departments[0].pk), 'semester': 'Осінь 2024'}, 1)
+        self.assertEqual(page.paginator.count, 2)
+        self.assertEqual(facets['department'], [
+            {'value': str(self.departments[0].pk), 'label': 'Кафедра 0', 'count': 2},
+        ])
+        self.assertEqual(facets['semester'], [{'value': 'Осінь 2024', 'label': 'Осінь 2024', 'count': 2}])
+
+    def test_cache_invalidated_on_course_change(self):
+        response = self.client.get(reverse('course_catalog'), {'q': 'cs'})
+        self.assertEqual(response.context['courses'].paginator.count, 2)
+        # Повторний запит: фасети й id сторінки з кешу, лишається вибірка самих курсів
+        with self.assertNumQueries(1):
+            self.client.get(reverse('course_catalog'), {'q': 'cs'})
+
+        Course.objects.create(name='Компілятори', code='CS201', description='', credits=5,
+                              department=self.departments[0])
+        response = self.client.get(reverse('course_catalog'), {'q': 'cs'})
+        self.assertEqual(response.context['courses'].paginator.count, 3)
+        self.assertContains(response, 'CS201')
+
+
+@override_settings(TIMETABLE_DAYS=['MON', 'TUE'], TIMETABLE_PERIODS=[('08:30', '09:50'), ('10:05', '11:25')])
+class TimetableTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        department = make_department()
+        course = make_course(department)
+        professors = [make_professor(department, f'professor{index}') for index in range(2)]
+        cls.classes = [
+            make_class(course, professor, classroom='-', sessions_per_week=sessions)
+            for professor, sessions in ((professors[0], 2), (professors[0], 1), (professors[1], 1))
+        ]
+        student = make_student(department.faculty)
+        for class_obj in cls.classes:
+            Enrollment.objects.create(student=student, class_enrolled=class_obj)
+        # Одна аудиторія на чотири слоти: розклад без збігів займає кожен слот рівно один раз
+        Room.objects.create(name='A', capacity=30)
+        cls.fixed = Schedule.objects.create(class_obj=cls.classes[2], day_of_week='TUE', start_time=time(10, 5),
+                                            end_time=time(11, 25), classroom='A')
+
+    def test_incremental_solve_keeps_fixed_classes(self):
+        first, second, fixed = self.classes
+        before, after = solve_semester('Осінь 2024', [first.id, second.id], time_limit=5, seed=1)
+        self.assertEqual(before['unplaced'], 3)
+        self.assertEqual(after, dict.fromkeys(after, 0))
+
+        slots = set(Schedule.objects.values_list('day_of_week', 'start_time'))
+        self.assertEqual(len(slots), 4)
+        self.assertEqual(Schedule.objects.get(class_obj=fixed).pk, self.fixed.pk)
+        self.assertEqual(Schedule.objects.filter(class_obj=first).values('day_of_week').distinct().count(), 2)
+        first.refresh_from_db()
+        self.assertRegex(first.schedule, r'^Пн \d\d:\d\d-\d\d:\d\d, Вт \d\d:\d\d-\d\d:\d\d$')
+        self.assertEqual(first.classroom, 'A')
+
+    def test_solve_resets_dashboard_fragments(self):
+        first, second, fixed = self.classes
+        keys = [dashboard.CACHE_KEY.format('classes', first.professor_id),
+                dashboard.CACHE_KEY.format('classes', fixed.professor_id),
+                dashboard.CACHE_KEY.format('courses', Enrollment.objects.first().student_id)]
+        cache.set_many(dict.fromkeys(keys, 'старий блок'))
+        with self.captureOnCommitCallbacks(execute=True):
+            solve_semester('Осінь 2024', [first.id, second.id], time_limit=1, seed=1)
+        # Викладач незачеплених занять свій блок зберігає
+        self.assertEqual(cache.get_many(keys), {keys[1]: 'старий блок'})
+
+
+# TransactionTestCase: у TestCase усе виконується в незакоміченій транзакції, а її рядки кеш не зберігає
+@override_settings(QUERY_CACHE_MAX_ENTRIES=2)
+class QueryCacheTest(TransactionTestCase):
+
+    def setUp(self):
+        querycache.results.clear()
+        self.department = make_department()
+        self.course = make_course(self.department, 'CS101', 'Алгоритми')
+
+    def courses(self):
+        return list(Course.objects.select_related('department').order_by('code').cached())
+
+    def test_results_cached_until_table_changes(self):
+        self.assertEqual(self.courses(), [self.course])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.courses()[0].department.name, 'Кафедра')
+
+        # update() не надсилає сигналів, але покоління таблиці все одно змінюється
+        Course.objects.filter(pk=self.course.pk).update(name='Графи')
+        self.assertEqual(self.courses()[0].name, 'Графи')
+
+        with transaction.atomic():
+            Course.objects.create(name='Бази даних', code='CS102', description='', credits=4,
+                                  department=self.department)
+            self.assertEqual(len(self.courses()), 2)
+        self.assertEqual(len(self.courses()), 2)
+
+        stats = querycache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['bypassed']), (1, 3, 1))
+
+    def test_lru_eviction(self):
+        self.courses()
+        list(Faculty.objects.cached())
+        self.courses()  # тепер найсвіжіший
+        list(Department.objects.cached())
+        with self.assertNumQueries(0):
+            self.courses()
+        self.assertEqual(querycache.stats()['evictions'], 1)
+        with self.assertNumQueries(1):
+            list(Faculty.objects.cached())
+
+    def test_disabled_without_shared_generations(self):
+        code = 'from university_system import settings; print(settings.QUERY_CACHE_MAX_ENTRIES)'
+        environ = {key: value for key, value in os.environ.items()
+                   if key not in ('LMS_REDIS_URL', 'LMS_QUERY_CACHE_MAX_ENTRIES')}
+        for redis_url, entries in (('', '0'), ('redis://localhost:6379/0', '2000')):
+            output = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True,
+                                    env={**environ, 'LMS_REDIS_URL': redis_url}, text=True)
+            self.assertEqual(output.stdout.strip(), entries)
+
+
+class DashboardFragmentTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        class_obj = make_class()
+        cls.student = make_student(faculty_of(class_obj))
+        Enrollment.objects.create(student=cls.student, class_enrolled=class_obj)
+        assignment = Assignment.objects.create(class_obj=class_obj, title='Лабораторна', description='',
+                                               due_date=timezone.now() + timedelta(days=3), max_points=10)
+        cls.submission = StudentSubmission.objects.create(student=cls.student, assignment=assignment,
+                                                          file='student_submissions/work.txt')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student.user)
+
+    def test_fragment_cached_until_grade(self):
+        response = self.client.get(reverse('student_dashboard'))
+        grades_url = reverse('dashboard_fragment', args=['grades'])
+        self.assertContains(response, grades_url)
+
+        self.assertContains(self.client.get(grades_url), 'Оцінок ще немає')
+        # З кешу: лише користувач і профіль студента
+        with self.assertNumQueries(2):
+            self.client.get(grades_url)
+
+        self.submission.grade = 9
+        self.submission.save()
+        self.assertContains(self.client.get(grades_url), '9/10')
+
+    def test_fragment_built_from_primary(self):
+        reads_from = []
+
+        def render_fragment(name, profile):
+            with patch('lms.db_routing.replica_configured', return_value=True):
+                reads_from.append(ReplicaRouter().db_for_read(Course))
+            return ''
+
+        with patch('lms.dashboard.render_fragment', side_effect=render_fragment):
+            self.client.get(reverse('dashboard_fragment', args=['grades']))
+        self.assertEqual(reads_from, [PRIMARY])
+
+    def test_fragment_of_other_role(self):
+        self.assertEqual(self.client.get(reverse('dashboard_fragment', args=['grading'])).status_code, 403)
+        self.assertEqual(self.client.get(reverse('dashboard_fragment', args=['unknown'])).status_code, 404)
+
+
+class ProfilingTest(TestCase):
+
+    def setUp(self):
+        profiles = tempfile.TemporaryDirectory(prefix='lms-test-profiles-')
+        self.addCleanup(profiles.cleanup)
+        self.dir = profiles.name
+        profiling_settings = override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=0,
+                                               PROFILING_MODE='cprofile', PROFILING_DIR=self.dir,
+                                               PROFILING_FLUSH_INTERVAL=0)
+        profiling_settings.enable()
+        self.addCleanup(profiling_settings.disable)
+        store = profiling.store
+        profiling.store = profiling.ProfileStore()
+        self.addCleanup(setattr, profiling, 'store', store)
+
+    def test_signed_header_profiles_request(self):
+        self.assertNotIn('X-Profiled', self.client.get(reverse('course_catalog')))
+        self.assertNotIn('X-Profiled', self.client.get(reverse('course_catalog'), HTTP_X_PROFILE='profile:forged'))
+        response = self.client.get(reverse('course_catalog'), HTTP_X_PROFILE=profiling.make_token())
+        self.assertEqual(response['X-Profiled'], 'cprofile')
+
+        output = io.StringIO()
+        call_command('dump_profiles', output=self.dir, limit=5, stdout=output)
+        self.assertIn('course_catalog: запитів 1', output.getvalue())
+        self.assertIn('course_catalog.prof', output.getvalue())
+
+    def test_stack_sampler(self):
+        def busy_loop():
+            started = time_module.perf_counter()
+            while time_module.perf_counter() - started < 0.05:
+                pass
+
+        sampler = profiling.StackSampler(threading.get_ident(), 0.002)
+        sampler.start()
+        busy_loop()
+        stacks = sampler.stop()
+        self.assertTrue(stacks)
+        frame, own, inclusive = profiling.top_functions(stacks, 1)[0]
+        self.assertTrue(frame.startswith('busy_loop '))
@@ -0,0 +1,438 @@
+import random
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from datetime import time as clock
+from itertools import combinations
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .dashboard import invalidate_fragments
+from .models import Class, Enrollment, Room, Schedule
+
+# Ціна збігу двох пар в одному слоті: кожен спільний студент - 1
+PROFESSOR_WEIGHT = 1000  # викладач не може вести дві пари одночасно
+SAME_SLOT_WEIGHT = 1000  # дві пари одного заняття в одному слоті
+SAME_DAY_WEIGHT = 5      # дві пари одного заняття в один день - небажано, але можливо
+NO_ROOM_WEIGHT = 1000    # пара без вільної аудиторії потрібного розміру
+# Скільки конфліктних пар табу-пошук оцінює на кожній ітерації
+SAMPLE_SIZE = 20
+# Табу-пошук зупиняється, якщо стільки ітерацій поспіль не покращили найкращий розклад
+STALE_ITERATIONS = 50000
+
+REPORT_LABELS = {
+    'students': 'збіги студентів',
+    'professors': 'збіги викладачів',
+    'same_day': 'пари заняття в один день',
+    'no_room': 'пари без аудиторії',
+    'room_clashes': 'подвійно зайняті аудиторії',
+    'unplaced': 'пари без слота',
+}
+DAY_LABELS = {'MON': 'Пн', 'TUE': 'Вт', 'WED': 'Ср', 'THU': 'Чт', 'FRI': 'Пт', 'SAT': 'Сб'}
+
+Slot = namedtuple('Slot', 'day start end')
+
+
+def time_slots():
+    """Сітка слотів тижня з налаштувань: TIMETABLE_DAYS × TIMETABLE_PERIODS"""
+    periods = [(clock.fromisoformat(start), clock.fromisoformat(end)) for start, end in settings.TIMETABLE_PERIODS]
+    return [Slot(day, start, end) for day in settings.TIMETABLE_DAYS for start, end in periods]
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def slot_for(slots, day, start, end):
+    """Індекс слота сітки, що найбільше перекривається з парою; None, якщо пара поза сіткою"""
+    best, best_overlap = None, 0
+    for index, slot in enumerate(slots):
+        if slot.day != day:
+            continue
+        overlap = min(_minutes(end), _minutes(slot.end)) - max(_minutes(start), _minutes(slot.start))
+        if overlap > best_overlap:
+            best, best_overlap = index, overlap
+    return best
+
+
+class Timetable:
+    """
+    Граф конфліктів семестру: вершина - одна пара заняття, вага ребра - ціна збігу двох пар
+    в одному слоті. Розклад - розфарбування графа слотами, де кожна пара ще й отримує аудиторію.
+
+    Суміжність зберігається по заняттях (масиви сусідів і ваг), а не по парах, і для кожної пари
+    ведеться таблиця conflict[пара][слот] - ціна, якби пара стояла в цьому слоті. Переставлення
+    пари оновлює таблиці сусідів за O(степінь), тож оцінка ходу - це лише перегляд одного рядка.
+    """
+
+    def __init__(self, classes, enrollments, slots, rooms=(), placed=None, movable=None):
+        """
+        classes - [(id заняття, id викладача, пар на тиждень, кількість місць)];
+        enrollments - пари (id заняття, id студента);
+        rooms - [(назва, місткість)], без аудиторій розподіляються лише слоти;
+        placed - наявний розклад {id заняття: [(індекс слота або None, аудиторія)]};
+        movable - id занять, які можна переставляти (None - усі); решта лише займає слоти й аудиторії
+        """
+        placed = placed or {}
+        self.slots = list(slots)
+        by_day = defaultdict(list)
+        for index, slot in enumerate(self.slots):
+            by_day[slot.day].append(index)
+        self.same_day = [by_day[slot.day] for slot in self.slots]
+
+        rooms = sorted(rooms, key=lambda room: (room[1], room[0]))
+        self.room_names = [name for name, _ in rooms]
+        self.room_capacity = [capacity for _, capacity in rooms]
+        self.use_rooms = bool(rooms)
+        room_index = {name: index for index, name in enumerate(self.room_names)}
+        # room_used[слот][аудиторія] - кількість пар в аудиторії в цьому слоті
+        self.room_used = [bytearray(len(rooms)) for _ in self.slots]
+
+        self.class_ids = [row[0] for row in classes]
+        position = {class_id: index for index, class_id in enumerate(self.class_ids)}
+        self.sessions_of, self.session_class, self.size = [], array('l'), array('l')
+        self.movable = bytearray()
+        initial = []
+        for index, (class_id, _, sessions, size) in enumerate(classes):
+            existing = placed.get(class_id, [])
+            is_movable = movable is None or class_id in movable
+            own = []
+            for number in range(sessions if is_movable else len(existing)):
+                own.append(len(self.session_class))
+                self.session_class.append(index)
+                self.size.append(size or 0)
+                self.movable.append(is_movable)
+                initial.append(existing[number] if number < len(existing) else (None, None))
+            self.sessions_of.append(own)
+
+        self._build_edges(classes, enrollments, position)
+
+        count = len(self.session_class)
+        self.slot = array('l', [-1]) * count
+        self.room = array('l', [-1]) * count
+        self.conflict = [array('l', [0]) * len(self.slots) for _ in range(count)]
+        for session, (slot, room_name) in enumerate(initial):
+            if slot is None:
+                continue
+            room = room_index.get(room_name, -1)
+            if self.movable[session] and self.use_rooms and (
+                    room < 0 or self.room_used[slot][room] or self.room_capacity[room] < self.size[session]):
+                room = self._free_room(session, slot)
+            self._place(session, slot, room)
+
+    def _build_edges(self, classes, enrollments, position):
+        """Ребра між заняттями: кількість спільних студентів плюс PROFESSOR_WEIGHT за спільного викладача"""
+        by_student = defaultdict(list)
+        for class_id, student_id in enrollments:
+            if class_id in position:
+                by_student[student_id].append(position[class_id])
+        shared = Counter()
+        for class_list in by_student.values():
+            class_list.sort()
+            shared.update(combinations(class_list, 2))
+
+        by_professor = defaultdict(list)
+        for index, row in enumerate(classes):
+            by_professor[row[1]].append(index)
+        same_professor = set()
+        for class_list in by_professor.values():
+            same_professor.update(combinations(class_list, 2))
+
+        neighbours = [[] for _ in classes]
+        for first, second in shared.keys() | same_professor:
+            students = shared.get((first, second), 0)
+            weight = students + (PROFESSOR_WEIGHT if (first, second) in same_professor else 0)
+            neighbours[first].append((second, weight, students))
+            neighbours[second].append((first, weight, students))
+        self.neighbour_class = [array('l', (edge[0] for edge in edges)) for edges in neighbours]
+        self.neighbour_weight = [array('l', (edge[1] for edge in edges)) for edges in neighbours]
+        self.neighbour_students = [array('l', (edge[2] for edge in edges)) for edges in neighbours]
+
+    def _spread(self, session, slot, sign):
+        """Додає (sign=1) чи прибирає (sign=-1) внесок пари в слоті до таблиць конфліктів сусідів"""
+        conflict, sessions_of = self.conflict, self.sessions_of
+        own_class = self.session_class[session]
+        for other, weight in zip(self.neighbour_class[own_class], self.neighbour_weight[own_class]):
+            weight *= sign
+            for neighbour in sessions_of[other]:
+                conflict[neighbour][slot] += weight
+        for sibling in sessions_of[own_class]:
+            if sibling != session:
+                row = conflict[sibling]
+                row[slot] += sign * SAME_SLOT_WEIGHT
+                for same in self.same_day[slot]:
+                    row[same] += sign * SAME_DAY_WEIGHT
+
+    def _place(self, session, slot, room):
+        self.slot[session], self.room[session] = slot, room
+        if room >= 0:
+            self.room_used[slot][room] += 1
+        self._spread(session, slot, 1)
+
+    def _unplace(self, session):
+        slot, room = self.slot[session], self.room[session]
+        self._spread(session, slot, -1)
+        if room >= 0:
+            self.room_used[slot][room] -= 1
+        self.slot[session] = self.room[session] = -1
+
+    def _free_room(self, session, slot):
+        """Найменша вільна в слоті аудиторія, куди вміщується заняття; -1, якщо такої немає"""
+        return self.room_used[slot].find(0, bisect_left(self.room_capacity, self.size[session]))
+
+    def _penalty(self, session):
+        """Ціна розставленої пари в її поточному слоті"""
+        no_room = NO_ROOM_WEIGHT if self.use_rooms and self.room[session] < 0 and self.movable[session] else 0
+        return self.conflict[session][self.slot[session]] + no_room
+
+    def _conflicted(self, sessions):
+        """Пари з ненульовою ціною (те саме, що _penalty > 0, але без виклику на кожну пару)"""
+        conflict, slot, room = self.conflict, self.slot, self.room
+        return [session for session in sessions
+                if conflict[session][slot[session]] > 0 or (self.use_rooms and room[session] < 0)]
+
+    def cost(self):
+        """Сумарна ціна розкладу; кожен збіг двох пар рахується один раз"""
+        placed = [session for session, slot in enumerate(self.slot) if slot >= 0]
+        pairs = sum(self.conflict[session][self.slot[session]] for session in placed)
+        no_room = sum(1 for session in placed if self.movable[session] and self.room[session] < 0)
+        return pairs // 2 + (NO_ROOM_WEIGHT * no_room if self.use_rooms else 0)
+
+    def solve(self, time_limit=60, seed=None, max_stale=STALE_ITERATIONS):
+        """Жадібно розставляє пари без слота, потім покращує розклад табу-пошуком. Повертає ціну"""
+        rng = random.Random(seed)
+        deadline = time.monotonic() + time_limit
+        self._greedy(rng)
+        return self._tabu_search(rng, deadline, max_stale)
+
+    def _greedy(self, rng):
+        """
+        Жадібне розфарбування в порядку Уелша-Пауелла: спершу заняття з найбільшою сумарною вагою
+        ребер і найбільші. Кожна пара йде в найдешевший слот, де є аудиторія, а серед рівних -
+        у найменш завантажений, щоб лишити простір табу-пошуку.
+        """
+        degree = [sum(weights) for weights in self.neighbour_weight]
+        pending = [session for session, slot in enumerate(self.slot) if slot < 0 and self.movable[session]]
+        pending.sort(key=lambda session: (
+            -degree[self.session_class[session]], -self.size[session], rng.random()))
+        load = [0] * len(self.slots)
+        for slot in self.slot:
+            if slot >= 0:
+                load[slot] += 1
+
+        for session in pending:
+            row = self.conflict[session]
+            order = sorted(range(len(self.slots)), key=lambda slot: (row[slot], load[slot]))
+            chosen, room = order[0], -1
+            if self.use_rooms:
+                for slot in order:
+                    if row[slot] >= row[order[0]] + NO_ROOM_WEIGHT:
+                        break
+                    room = self._free_room(session, slot)
+                    if room >= 0:
+                        chosen = slot
+                        break
+            self._place(session, chosen, room)
+            load[chosen] += 1
+
+    def _best_move(self, session, iteration, cost, best_cost, tabu, order):
+        """Найкращий дозволений хід пари: (зміна ціни, слот, аудиторія) або None"""
+        current, row = self.slot[session], self.conflict[session]
+        penalty = self._penalty(session)
+        for slot in sorted(order, key=row.__getitem__):
+            if slot == current:
+                continue
+            delta = row[slot] - penalty
+            if tabu.get((session, slot), 0) > iteration and cost + delta >= best_cost:
+                continue
+            room = self._free_room(session, slot) if self.use_rooms else -1
+            if room >= 0 or not self.use_rooms:
+                return delta, slot, room
+        return None
+
+    def _tabu_search(self, rng, deadline, max_stale):
+        """
+        Табу-пошук мінімальних конфліктів (у дусі TabuCol): з вибірки конфліктних пар робиться
+        найкращий хід - переставлення в слот з вільною аудиторією, навіть якщо це погіршує розклад.
+        Повернення пари в щойно покинутий слот заборонене на кілька ітерацій, якщо це не дає
+        нового найкращого розкладу. Наприкінці відновлюється найкращий знайдений розклад.
+        """
+        slot_count = len(self.slots)
+        # Обхід слотів з випадкового зсуву: серед рівних за ціною немає переваги першим
+        rotations = [list(range(start, slot_count)) + list(range(start)) for start in range(slot_count)]
+        movable = [session for session in range(len(self.slot)) if self.movable[session]]
+        cost = best_cost = self.cost()
+        best_slot, best_room = array('l', self.slot), array('l', self.room)
+        tabu, candidates = {}, []
+        iteration = stale = 0
+
+        while best_cost > 0 and stale < max_stale:
+            iteration += 1
+            if iteration % 64 == 0 and time.monotonic() > deadline:
+                break
+            if iteration % 100 == 1:
+                candidates = self._conflicted(movable)
+                if not candidates:
+                    break
+                tabu = {move: until for move, until in tabu.items() if until > iteration}
+
+            best_move = None
+            for session in rng.sample(candidates, min(len(candidates), SAMPLE_SIZE)):
+                if not self._penalty(session):
+                    continue
+                move = self._best_move(session, iteration, cost, best_cost, tabu,
+                                       rotations[rng.randrange(slot_count)])
+                if move is not None and (best_move is None or move[0] < best_move[0]):
+                    best_move = move + (session,)
+            if best_move is None:
+                stale += 1
+                continue
+
+            delta, target, room, session = best_move
+            current = self.slot[session]
+            self._unplace(session)
+            self._place(session, target, room)
+            cost += delta
+            tabu[session, current] = iteration + rng.randint(0, 9) + int(0.6 * len(candidates))
+            if cost < best_cost:
+                best_cost, stale = cost, 0
+                best_slot, best_room = array('l', self.slot), array('l', self.room)
+            else:
+                stale += 1
+
+        if cost > best_cost:
+            changed = [session for session in movable
+                       if self.slot[session] != best_slot[session] or self.room[session] != best_room[session]]
+            for session in changed:
+                self._unplace(session)
+            for session in changed:
+                self._place(session, best_slot[session], best_room[session])
+        return best_cost
+
+    def report(self):
+        """Конфлікти розкладу за видами"""
+        slot, sessions_of = self.slot, self.sessions_of
+        students = professors = same_day = 0
+        for own_class, sessions in enumerate(sessions_of):
+            own_slots = [slot[session] for session in sessions if slot[session] >= 0]
+            if not own_slots:
+                continue
+            days = [self.slots[index].day for index in own_slots]
+            same_day += len(days) - len(set(days))
+            for other, weight, shared in zip(self.neighbour_class[own_class], self.neighbour_weight[own_class],
+                                             self.neighbour_students[own_class]):
+                if other < own_class:
+                    continue
+                overlaps = sum(own_slots.count(slot[session]) for session in sessions_of[other] if slot[session] >= 0)
+                students += shared * overlaps
+                if weight > shared:
+                    professors += overlaps
+        movable = [session for session in range(len(slot)) if self.movable[session]]
+        return {
+            'students': students,
+            'professors': professors,
+            'same_day': same_day,
+            'no_room': sum(1 for session in movable if slot[session] >= 0 and self.room[session] < 0)
+            if self.use_rooms else 0,
+            'room_clashes': sum(max(used - 1, 0) for rooms in self.room_used for used in rooms),
+            'unplaced': sum(1 for session in movable if slot[session] < 0),
+        }
+
+    def assignments(self):
+        """{id заняття: [(Slot, назва аудиторії або None)]} для занять, які можна переставляти"""
+        result = {}
+        for own_class, sessions in enumerate(self.sessions_of):
+            if not sessions or not self.movable[sessions[0]]:
+                continue
+            placed = sorted((self.slot[session], self.room[session]) for session in sessions
+                            if self.slot[session] >= 0)
+            result[self.class_ids[own_class]] = [
+                (self.slots[slot], self.room_names[room] if room >= 0 else None) for slot, room in placed
+            ]
+        return result
+
+
+def format_report(report):
+    return ', '.join(f'{label}: {report[key]}' for key, label in REPORT_LABELS.items())
+
+
+def unscheduled_classes(semester):
+    """id занять семестру, у яких пар у Schedule не стільки, скільки sessions_per_week"""
+    return list(Class.all_objects.filter(semester=semester).annotate(
+        scheduled=Count('class_schedules')
+    ).exclude(scheduled=F('sessions_per_week')).values_list('id', flat=True))
+
+
+def load_timetable(semester, class_ids=None):
+    """
+    Розклад семестру з БД. class_ids - заняття, які можна переставляти (None - усі);
+    пари решти занять лишаються на місці й займають слоти, викладачів і аудиторії.
+    Семестр може бути ще не активним: розклад складають до його початку.
+    """
+    slots = time_slots()
+    rows = Class.all_objects.filter(semester=semester).annotate(enrolled=Count('enrollment')).values_list(
+        'id', 'professor_id', 'sessions_per_week', 'capacity', 'enrolled').order_by('id')
+    # Розмір заняття - більше з кількості записаних і місткості: на місця ще можуть записатися
+    classes = [(class_id, professor_id, sessions, max(capacity or 0, enrolled))
+               for class_id, professor_id, sessions, capacity, enrolled in rows]
+    enrollments = Enrollment.all_objects.filter(class_enrolled__semester=semester).values_list(
+        'class_enrolled_id', 'student_id').order_by()
+    placed = defaultdict(list)
+    schedules = Schedule.objects.filter(class_obj__semester=semester).values_list(
+        'class_obj_id', 'day_of_week', 'start_time', 'end_time', 'classroom').order_by('class_obj_id', 'id')
+    for class_id, day, start, end, classroom in schedules.iterator():
+        placed[class_id].append((slot_for(slots, day, start, end), classroom))
+    rooms = Room.objects.values_list('name', 'capacity')
+    return Timetable(classes, enrollments.iterator(), slots, rooms, placed,
+                     movable=None if class_ids is None else set(class_ids))
+
+
+def save_timetable(timetable):
+    """
+    Замінює пари переставлених занять одним записом: Schedule видаляються й створюються заново,
+    а Class.schedule/classroom отримують текст на кшталт "Пн 08:30-09:50, Ср 10:05-11:25" для сторінок,
+    які показують розклад рядком. Без аудиторій у Room пари лишаються в аудиторії заняття.
+    """
+    assignments = timetable.assignments()
+    classrooms, professor_ids = {}, set()
+    for class_id, classroom, professor_id in Class.all_objects.filter(pk__in=assignments).values_list(
+            'id', 'classroom', 'professor_id'):
+        classrooms[class_id] = classroom
+        professor_ids.add(professor_id)
+    schedules, classes, now = [], [], timezone.now()
+    for class_id, sessions in assignments.items():
+        rooms = []
+        for slot, room in sessions:
+            room = room or classrooms[class_id]
+            schedules.append(Schedule(class_obj_id=class_id, day_of_week=slot.day, start_time=slot.start,
+                                      end_time=slot.end, classroom=room))
+            if room not in rooms:
+                rooms.append(room)
+        text = ', '.join(f'{DAY_LABELS[slot.day]} {slot.start:%H:%M}-{slot.end:%H:%M}' for slot, _ in sessions)
+        # bulk_update не заповнює auto_now, а від updated_at залежить ETag сторінки заняття
+        classes.append(Class(pk=class_id, schedule=text[:100], classroom=', '.join(rooms)[:50], updated_at=now))
+    with transaction.atomic():
+        Schedule.objects.filter(class_obj_id__in=assignments).delete()
+        Schedule.objects.bulk_create(schedules, batch_size=1000)
+        Class.all_objects.bulk_update(classes, ['schedule', 'classroom', 'updated_at'], batch_size=1000)
+        # bulk_update не надсилає post_save: розклад видно в блоках занять викладачів і курсів студентів
+        student_ids = set(Enrollment.all_objects.filter(class_enrolled_id__in=assignments).values_list(
+            'student_id', flat=True))
+        transaction.on_commit(lambda: invalidate_fragments('classes', professor_ids))
+        transaction.on_commit(lambda: invalidate_fragments('courses', student_ids))
+    return len(schedules)
+
+
+def solve_semester(semester, class_ids=None, time_limit=60, seed=None, dry_run=False):
+    """Складає розклад семестру й зберігає його (крім dry_run). Повертає (конфлікти до, конфлікти після)"""
+    timetable = load_timetable(semester, class_ids)
+    before = timetable.report()
+    timetable.solve(time_limit=time_limit, seed=seed)
+    after = timetable.report()
+    if not dry_run:
+        save_timetable(timetable)
+    return before, after
@@ -13,29 +13,46 @@ urlpatterns = [
     # Dashboard
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('professor/dashboard/', views.professor_dashboard, name='professor_dashboard'),
+    path('dashboard/<slug:fragment>/', views.dashboard_fragment, name='dashboard_fragment'),
+    path('staff/query-cache/', views.query_cache_stats, name='query_cache_stats'),
 
     # Курсы и классы
+    path('courses/catalog/', views.course_catalog, name='course_catalog'),
     path('classes/', views.class_list, name='class_list'),
     path('class/<int:class_id>/', views.class_detail, name='class_detail'),
     path('class/<int:class_id>/materials/', views.class_materials, name='class_materials'),
     path('class/<int:class_id>/materials/upload/', views.upload_course_material, name='upload_course_material'),
+    path('material/<int:material_id>/download/', views.download_material, name='download_material'),
 
     # Задания
     path('class/<int:class_id>/assignments/', views.class_assignments, name='class_assignments'),
     path('class/<int:class_id>/assignments/create/', views.create_assignment, name='create_assignment'),
     path('assignment/<int:assignment_id>/', views.assignment_detail, name='assignment_detail'),
+    path('assignment/<int:assignment_id>/file/', views.download_assignment_file, name='download_assignment_file'),
     path('assignment/<int:assignment_id>/submit/', views.submit_assignment, name='submit_assignment'),
     path('assignment/<int:assignment_id>/submissions/', views.assignment_submissions, name='assignment_submissions'),
+    path('assignment/<int:assignment_id>/submissions/download/', views.download_all_submissions,
+         name='download_all_submissions'),
+    path('assignment/<int:assignment_id>/similarity/', views.similarity_report, name='similarity_report'),
+    path('assignment/<int:assignment_id>/autograder/', views.assignment_autograder, name='assignment_autograder'),
     path('submission/<int:submission_id>/grade/', views.grade_submission, name='grade_submission'),
+    path('submission/<int:submission_id>/file/', views.download_submission, name='download_submission'),
 
     # Студенческие маршруты
     path('student/courses/', views.student_courses, name='student_courses'),
+    path('student/transcript/', views.student_transcript, name='student_transcript'),
+    path('student/registration/', views.class_registration, name='class_registration'),
+    path('class/<int:class_id>/register/', views.register_for_class, name='register_for_class'),
+    path('class/<int:class_id>/drop/', views.drop_class, name='drop_class'),
     path('student/assignments/', views.student_assignments, name='student_assignments'),
+    path('student/assignments/feed/', views.assignment_feed, name='assignment_feed'),
     path('student/grades/', views.student_grades, name='student_grades'),
+    path('student/notifications/', views.notification_stream, name='notification_stream'),
 
     # Маршруты для управления оценками преподавателем
     path('professor/grades/', views.professor_grades, name='professor_grades'),
     path('professor/grades/course/<int:course_id>/student/<int:student_id>/',
          views.student_course_grades, name='student_course_grades'),
     path('professor/grades/set-final-grade/', views.set_final_grade, name='set_final_grade'),
+    path('professor/grades/class/<int:class_id>/statistics/', views.grade_statistics, name='grade_statistics'),
 ]
\ No newline at end of file
@@ -1,19 +1,42 @@
-from django.shortcuts import render, get_object_or_404, redirect
+import asyncio
+import csv
+import io
+import mimetypes
+import os
+import re
+from itertools import groupby
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.models import User
 from django.contrib.auth import logout
-from django.http import HttpResponseForbidden
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db import models
-from django.db.models import Avg, Count, Q
+from django.utils.http import content_disposition_header
+from django.db.models import Avg, Count, Q, Sum
 from django.contrib import messages
 from .models import (
     Student, Professor, Class, Enrollment, CourseMaterial,
-    Assignment, StudentSubmission, Course, Faculty, Department
+    Assignment, StudentSubmission, Course, Faculty, Department, ArchivedEnrollment,
+    SimilarityPair, SubmissionFingerprint, AutoGrader, GradingJob, GradeCurve, GRADE_CLASS_THRESHOLDS,
+    LETTER_CUTOFFS
 )
+from .autograder import enqueue_submissions
+from .conditional import class_condition
+from .db_routing import read_replica
+from .feed import get_assignment_feed
+from .grade_stats import (
+    DEFAULT_LETTER_SHARES, apply_linear_curve, apply_percentile_cutoffs, assignment_scores, class_percentages,
+    curved_assignments, describe, letter_grade, reset_linear_curve, z_scores
+)
+from . import catalog, dashboard, querycache, registration
+from .notifications import class_channel, event_stream, student_channel
+from .zipstream import aiter_zip, iter_zip
 from .forms import (
     UserEditForm, CourseMaterialForm, AssignmentForm,
-    StudentSubmissionForm, GradeSubmissionForm
+    StudentSubmissionForm, GradeSubmissionForm, AutoGraderForm, LinearCurveForm, LetterSharesForm
 )
 
 
@@ -85,127 +108,156 @@ def edit_profile(request):
     return render(request, 'lms/edit_profile.html', {'form': form})
 
 
+async def _aget_profile(request, model, *related):
+    """Профіль (Student/Professor) поточного користувача для async-представлень або None"""
+    user = await request.auser()
+    return await model.objects.select_related('user', *related).filter(user=user).afirst()
+
+
+async def _arender(request, template_name, context):
+    # Шаблони (base.html) ліниво звертаються до request.user, тож рендеринг іде в потоці
+    return await sync_to_async(render)(request, template_name, context)
+
+
 @login_required
-def student_dashboard(request):
-    """Панель управления студента"""
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+@read_replica()
+async def student_dashboard(request):
+    """Панель студента: лише оболонка, блоки підвантажує dashboard_fragment"""
+    student = await _aget_profile(request, Student, 'faculty')
+    if student is None:
         return HttpResponseForbidden("Доступ запрещен")
 
-    # Получаем зачисления студента
-    enrollments = Enrollment.objects.filter(student=student).select_related('class_enrolled')
-    enrolled_classes = [enrollment.class_enrolled for enrollment in enrollments]
+    return await _arender(request, 'lms/student_dashboard.html', {'student': student})
 
-    # Получаем задания для классов студента
-    assignments = Assignment.objects.filter(class_obj__in=enrolled_classes)
 
-    # Получаем отправленные задания
-    submitted_assignments = StudentSubmission.objects.filter(
-        student=student,
-        assignment__in=assignments
-    ).values_list('assignment', flat=True)
+@login_required
+def dashboard_fragment(request, fragment):
+    """
+    Окремий блок панелі студента чи викладача з власним кешем (lms.dashboard). Без read_replica:
+    блок кешується на свій TTL, тож відставання репліки в ньому трималося б до кінця TTL
+    """
+    if fragment not in dashboard.FRAGMENTS:
+        raise Http404
+    profile_model = dashboard.FRAGMENTS[fragment].profile_model
+    profile = profile_model.objects.filter(user=request.user).first()
+    if profile is None:
+        return HttpResponseForbidden("Доступ заборонено")
+    return HttpResponse(dashboard.render_fragment(fragment, profile))
 
-    context = {
-        'student': student,
-        'enrolled_courses': enrolled_classes,
-        'recent_assignments': assignments.order_by('-due_date')[:5],
-        'submitted_assignments': submitted_assignments,
-        'pending_assignments': assignments.exclude(id__in=submitted_assignments),
-    }
 
-    return render(request, 'lms/student_dashboard.html', context)
+@login_required
+def assignment_feed(request):
+    """Стрічка термінів здачі студента у форматі JSON"""
+    try:
+        student = request.user.student
+    except Student.DoesNotExist:
+        return HttpResponseForbidden("Доступ запрещен")
+
+    return JsonResponse(get_assignment_feed(student))
 
 
 @login_required
-def professor_dashboard(request):
-    """Панель управления преподавателя"""
-    try:
-        professor = request.user.professor
-    except Professor.DoesNotExist:
+async def notification_stream(request):
+    """Server-Sent Events: оцінки, нові завдання та матеріали замість періодичного оновлення сторінок"""
+    if not isinstance(request, ASGIRequest):
+        # Під WSGI потік буде зібрано повністю до відправлення: робочий потік зайнятий
+        # NOTIFICATION_STREAM_LIFETIME, а події приходять лише в кінці. 204 зупиняє перепідключення EventSource
+        return HttpResponse(status=204)
+    student = await _aget_profile(request, Student)
+    if student is None:
         return HttpResponseForbidden("Доступ запрещен")
 
-    # Получаем классы преподавателя
-    professor_classes = Class.objects.filter(professor=professor)
+    channels = [student_channel(student.pk)] + [
+        class_channel(class_id) async for class_id in
+        Enrollment.objects.filter(student=student).values_list('class_enrolled_id', flat=True)
+    ]
 
-    # Получаем задания
-    assignments = Assignment.objects.filter(class_obj__in=professor_classes)
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Вимикає буферизацію відповіді в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-    # Получаем отправленные работы
-    submissions = StudentSubmission.objects.filter(assignment__in=assignments)
 
-    context = {
-        'professor': professor,
-        'classes': professor_classes,
-        'assignments_count': assignments.count(),
-        'submissions_count': submissions.count(),
-        'pending_submissions_count': submissions.filter(grade__isnull=True).count(),
-    }
+@login_required
+@read_replica()
+async def professor_dashboard(request):
+    """Панель викладача: лише оболонка, блоки підвантажує dashboard_fragment"""
+    professor = await _aget_profile(request, Professor, 'department__faculty')
+    if professor is None:
+        return HttpResponseForbidden("Доступ запрещен")
 
-    return render(request, 'lms/professor_dashboard.html', context)
+    return await _arender(request, 'lms/professor_dashboard.html', {'professor': professor})
 
 
 @login_required
-def professor_grades(request):
+@read_replica()
+async def professor_grades(request):
     """Управління оцінками для викладача"""
-    try:
-        professor = request.user.professor
-    except Professor.DoesNotExist:
+    professor = await _aget_profile(request, Professor)
+    if professor is None:
         return HttpResponseForbidden("Доступ заборонено")
 
     # Отримуємо курси викладача
-    courses = Class.objects.filter(professor=professor).select_related('course')
+    courses = [
+        course_class async for course_class in
+        Class.objects.filter(professor=professor).select_related('course', 'grade_curve')
+    ]
+    class_ids = [course_class.id for course_class in courses]
+
+    # Кількість завдань по заняттях
+    assignment_counts = {
+        row['class_obj']: row['total'] async for row in
+        Assignment.objects.filter(class_obj__in=class_ids)
+        .values('class_obj').annotate(total=Count('id'))
+    }
+
+    # Статистика робіт по парах (студент, заняття) одним згрупованим запитом
+    submission_stats = {
+        (row['student'], row['assignment__class_obj']): row async for row in
+        StudentSubmission.objects.filter(assignment__class_obj__in=class_ids)
+        .values('student', 'assignment__class_obj')
+        .annotate(
+            submitted_count=Count('id'),
+            average_grade=Avg('grade'),
+            achieved_points=Sum('grade'),
+            max_points_sum=Sum('assignment__max_points', filter=Q(grade__isnull=False)),
+        )
+    }
+
+    # Отримуємо студентів усіх курсів
+    enrollments_by_class = {}
+    async for enrollment in Enrollment.objects.filter(class_enrolled__in=class_ids).select_related('student__user'):
+        enrollments_by_class.setdefault(enrollment.class_enrolled_id, []).append(enrollment)
 
     course_data = []
     for course_class in courses:
         course = course_class.course
-
-        # Отримуємо студентів курсу
-        enrollments = Enrollment.objects.filter(class_enrolled=course_class).select_related('student__user')
+        total_assignments = assignment_counts.get(course_class.id, 0)
 
         students_data = []
-        for enrollment in enrollments:
+        for enrollment in enrollments_by_class.get(course_class.id, []):
             student = enrollment.student
+            stats = submission_stats.get((student.id, course_class.id), {})
 
             # Перевіряємо, чи є фінальна оцінка
             if enrollment.grade:
                 final_grade = enrollment.grade
                 final_grade_class = get_grade_class(convert_grade_to_percentage(final_grade))
                 average_grade = None  # Не показуємо середній бал, якщо є фінальна оцінка
+            elif stats.get('max_points_sum'):
+                # Розраховуємо на основі оцінених завдань
+                average_grade = stats['average_grade']
+                percentage = (stats['achieved_points'] / stats['max_points_sum']) * 100
+                final_grade = calculate_final_grade(percentage, course_class.letter_cutoffs)
+                final_grade_class = get_grade_class(percentage)
             else:
-                # Розраховуємо на основі завдань
-                assignments = Assignment.objects.filter(class_obj=course_class)
-                submissions = StudentSubmission.objects.filter(
-                    student=student,
-                    assignment__in=assignments
-                )
-
-                graded_submissions = submissions.exclude(grade__isnull=True)
-                if graded_submissions.exists():
-                    average_grade = graded_submissions.aggregate(Avg('grade'))['grade__avg']
-                    max_points_sum = sum(sub.assignment.max_points for sub in graded_submissions)
-                    achieved_points = sum(sub.grade for sub in graded_submissions)
-
-                    if max_points_sum > 0:
-                        percentage = (achieved_points / max_points_sum) * 100
-                        final_grade = calculate_final_grade(percentage)
-                        final_grade_class = get_grade_class(percentage)
-                    else:
-                        final_grade = "Н/Д"
-                        final_grade_class = "secondary"
-                else:
-                    average_grade = None
-                    final_grade = "Н/Д"
-                    final_grade_class = "secondary"
+                average_grade = stats.get('average_grade')
+                final_grade = "Н/Д"
+                final_grade_class = "secondary"
 
             # Статистика
-            assignments = Assignment.objects.filter(class_obj=course_class)
-            submissions = StudentSubmission.objects.filter(
-                student=student,
-                assignment__in=assignments
-            )
-            submitted_count = submissions.count()
-            total_assignments = assignments.count()
+            submitted_count = stats.get('submitted_count', 0)
             completion_percentage = (submitted_count / total_assignments * 100) if total_assignments > 0 else 0
 
             students_data.append({
@@ -221,6 +273,7 @@ def professor_grades(request):
 
         course_data.append({
             'id': course.id,
+            'class_id': course_class.id,
             'name': course.name,
             'students': students_data
         })
@@ -229,10 +282,10 @@ def professor_grades(request):
         'courses': course_data
     }
 
-    return render(request, 'lms/professor_grades.html', context)
-
+    return await _arender(request, 'lms/professor_grades.html', context)
 
 @login_required
+@read_replica()
 def student_course_grades(request, course_id, student_id):
     """Детальные оценки студента по конкретному курсу"""
     try:
@@ -244,7 +297,7 @@ def student_course_grades(request, course_id, student_id):
     student = get_object_or_404(Student, id=student_id)
 
     # Проверяем, что преподаватель ведет этот курс
-    course_class = get_object_or_404(Class, course=course, professor=professor)
+    course_class = get_object_or_404(Class.objects, course=course, professor=professor)
 
     # Получаем все задания курса и работы студента
     assignments = Assignment.objects.filter(class_obj=course_class)
@@ -254,7 +307,7 @@ def student_course_grades(request, course_id, student_id):
     ).select_related('assignment')
 
     # Получаем финальную оценку из Enrollment
-    enrollment = get_object_or_404(Enrollment, student=student, class_enrolled=course_class)
+    enrollment = get_object_or_404(Enrollment.objects, student=student, class_enrolled=course_class)
 
     context = {
         'course': course,
@@ -282,10 +335,10 @@ def set_final_grade(request):
             course = get_object_or_404(Course, id=course_id)
 
             # Проверяем, что преподаватель ведет этот курс
-            course_class = get_object_or_404(Class, course=course, professor=professor)
+            course_class = get_object_or_404(Class.objects, course=course, professor=professor)
 
             # Сохраняем финальную оценку в модель Enrollment
-            enrollment = get_object_or_404(Enrollment, student=student, class_enrolled=course_class)
+            enrollment = get_object_or_404(Enrollment.objects, student=student, class_enrolled=course_class)
             enrollment.grade = final_grade
             enrollment.save()
 
@@ -297,6 +350,99 @@ def set_final_grade(request):
     return redirect('professor_grades')
 
 
+def _histogram_bars(counts, low, high):
+    """Стовпчики гістограми для шаблону: підпис інтервалу, кількість і висота у % від найвищого"""
+    tallest = max(counts) or 1
+    width = (high - low) / len(counts)
+    return [{
+        'label': f'{low + index * width:g}-{low + (index + 1) * width:g}',
+        'count': count,
+        'height': count * 100 / tallest,
+    } for index, count in enumerate(counts)]
+
+
+@login_required
+def grade_statistics(request, class_id):
+    """Розподіл оцінок заняття й криві: лінійна для завдання, межі літер за процентилями для заняття"""
+    class_obj = get_object_or_404(Class.objects.select_related('course', 'grade_curve'), id=class_id)
+
+    if not hasattr(request.user, 'professor') or class_obj.professor_id != request.user.professor.id:
+        return HttpResponseForbidden("Доступ заборонено")
+
+    curve_form = LinearCurveForm(request.POST if 'curve' in request.POST else None, class_obj=class_obj)
+    shares_form = LetterSharesForm(request.POST if 'cutoffs' in request.POST else None, initial={
+        f'share_{letter.lower()}': share for letter, share in DEFAULT_LETTER_SHARES.items()
+    })
+
+    if request.method == 'POST':
+        if 'curve' in request.POST and curve_form.is_valid():
+            changed = apply_linear_curve(
+                curve_form.cleaned_data['assignment'],
+                curve_form.cleaned_data['target_mean'],
+                curve_form.cleaned_data['target_stdev'],
+            )
+            messages.success(request, f'Криву застосовано, змінено оцінок: {changed}')
+            return redirect('grade_statistics', class_id=class_id)
+        if 'reset_curve' in request.POST:
+            assignment = get_object_or_404(Assignment.objects, id=request.POST['reset_curve'], class_obj=class_obj)
+            messages.success(request, f'Повернуто оцінок до кривої: {reset_linear_curve(assignment)}')
+            return redirect('grade_statistics', class_id=class_id)
+        if 'cutoffs' in request.POST and shares_form.is_valid():
+            if apply_percentile_cutoffs(class_obj, shares_form.shares()) is None:
+                messages.warning(request, 'Оцінених робіт ще немає')
+            else:
+                messages.success(request, 'Межі оцінок розраховано за процентилями')
+            return redirect('grade_statistics', class_id=class_id)
+        if 'reset_cutoffs' in request.POST:
+            GradeCurve.objects.filter(class_obj=class_obj).delete()
+            messages.success(request, 'Повернуто стандартні межі оцінок')
+            return redirect('grade_statistics', class_id=class_id)
+
+    # Бали всіх завдань одним запитом, статистика - у пам'яті
+    scores = assignment_scores(class_obj)
+    curved = curved_assignments(class_obj)
+    assignment_data = []
+    for assignment in Assignment.objects.filter(class_obj=class_obj).order_by('due_date'):
+        summary = describe(scores.get(assignment.id), 0, assignment.max_points)
+        assignment_data.append({
+            'assignment': assignment,
+            'stats': summary,
+            'bars': _histogram_bars(summary['histogram'], 0, assignment.max_points) if summary else [],
+            'is_curved': assignment.id in curved,
+        })
+
+    cutoffs = class_obj.letter_cutoffs
+    student_ids, percentages = class_percentages(class_obj)
+    summary = describe(percentages)
+    students = Student.objects.select_related('user').in_bulk(student_ids)
+    student_rows = sorted((
+        {
+            'student': students[student_id],
+            'percentage': percentage,
+            'z_score': z_score,
+            'letter': letter_grade(percentage, cutoffs),
+        }
+        for student_id, percentage, z_score in zip(student_ids, percentages, z_scores(percentages))
+    ), key=lambda row: -row['percentage'])
+    letter_counts = {letter: 0 for letter in 'ABCDF'}
+    for row in student_rows:
+        letter_counts[row['letter']] += 1
+
+    return render(request, 'lms/grade_statistics.html', {
+        'class_obj': class_obj,
+        'assignment_data': assignment_data,
+        'summary': summary,
+        'bars': _histogram_bars(summary['histogram'], 0, 100) if summary else [],
+        'student_rows': student_rows,
+        'scale_rows': [(letter, threshold, letter_counts[letter]) for threshold, letter in cutoffs]
+                      + [('F', None, letter_counts['F'])],
+        'is_custom_scale': cutoffs is not LETTER_CUTOFFS,
+        'letter_counts': letter_counts,
+        'curve_form': curve_form,
+        'shares_form': shares_form,
+    })
+
+
 @login_required
 def class_list(request):
     """Список всех классов"""
@@ -304,17 +450,18 @@ def class_list(request):
         enrollments = Enrollment.objects.filter(student=request.user.student)
         classes = [enrollment.class_enrolled for enrollment in enrollments]
     elif hasattr(request.user, 'professor'):
-        classes = Class.objects.filter(professor=request.user.professor)
+        classes = Class.objects.filter(professor=request.user.professor).select_related('course').cached()
     else:
-        classes = Class.objects.all()
+        classes = Class.objects.select_related('course').cached()
 
     return render(request, 'lms/class_list.html', {'classes': classes})
 
 
 @login_required
+@class_condition
 def class_detail(request, class_id):
     """Детальная информация о классе"""
-    class_obj = get_object_or_404(Class, id=class_id)
+    class_obj = get_object_or_404(Class.objects.cached(), id=class_id)
 
     # Проверка доступа
     if hasattr(request.user, 'student'):
@@ -323,26 +470,28 @@ def class_detail(request, class_id):
 
     context = {
         'class_obj': class_obj,
-        'materials': CourseMaterial.objects.filter(class_obj=class_obj),
-        'assignments': Assignment.objects.filter(class_obj=class_obj),
+        'materials': CourseMaterial.objects.filter(class_obj=class_obj).cached(),
+        'assignments': Assignment.objects.filter(class_obj=class_obj).cached(),
     }
 
     return render(request, 'lms/class_detail.html', context)
 
 
 @login_required
-def class_materials(request, class_id):
+@class_condition
+async def class_materials(request, class_id):
     """Материалы класса"""
-    class_obj = get_object_or_404(Class, id=class_id)
+    class_obj = await aget_object_or_404(Class.objects.select_related('course').cached(), id=class_id)
 
     # Проверка доступа
-    if hasattr(request.user, 'student'):
-        if not Enrollment.objects.filter(student=request.user.student, class_enrolled=class_obj).exists():
+    user = await request.auser()
+    if await Student.objects.filter(user=user).aexists():
+        if not await Enrollment.objects.filter(student__user=user, class_enrolled=class_obj).aexists():
             return HttpResponseForbidden("Доступ запрещен")
 
-    materials = CourseMaterial.objects.filter(class_obj=class_obj)
+    materials = [material async for material in CourseMaterial.objects.filter(class_obj=class_obj).cached()]
 
-    return render(request, 'lms/class_materials.html', {
+    return await _arender(request, 'lms/class_materials.html', {
         'class_obj': class_obj,
         'materials': materials
     })
@@ -351,7 +500,7 @@ def class_materials(request, class_id):
 @login_required
 def upload_course_material(request, class_id):
     """Загрузка материала курса"""
-    class_obj = get_object_or_404(Class, id=class_id)
+    class_obj = get_object_or_404(Class.objects, id=class_id)
 
     # Только преподаватель может загружать материалы
     if not hasattr(request.user, 'professor') or class_obj.professor != request.user.professor:
@@ -374,16 +523,17 @@ def upload_course_material(request, class_id):
 
 
 @login_required
+@class_condition
 def class_assignments(request, class_id):
     """Список заданий класса"""
-    class_obj = get_object_or_404(Class, id=class_id)
+    class_obj = get_object_or_404(Class.objects.cached(), id=class_id)
 
     # Проверка доступа
     if hasattr(request.user, 'student'):
         if not Enrollment.objects.filter(student=request.user.student, class_enrolled=class_obj).exists():
             return HttpResponseForbidden("Доступ запрещен")
 
-    assignments = Assignment.objects.filter(class_obj=class_obj)
+    assignments = Assignment.objects.filter(class_obj=class_obj).cached()
 
     # Для студентов получаем отправленные задания
     submitted_assignments = []
@@ -403,7 +553,7 @@ def class_assignments(request, class_id):
 @login_required
 def create_assignment(request, class_id):
     """Создание нового задания"""
-    class_obj = get_object_or_404(Class, id=class_id)
+    class_obj = get_object_or_404(Class.objects, id=class_id)
 
     # Только преподаватель может создавать задания
     if not hasattr(request.user, 'professor') or class_obj.professor != request.user.professor:
@@ -428,7 +578,7 @@ def create_assignment(request, class_id):
 @login_required
 def assignment_detail(request, assignment_id):
     """Детальная информация о задании"""
-    assignment = get_object_or_404(Assignment, id=assignment_id)
+    assignment = get_object_or_404(Assignment.objects.select_related('class_obj').cached(), id=assignment_id)
 
     # Проверка доступа
     if hasattr(request.user, 'student'):
@@ -460,7 +610,7 @@ def assignment_detail(request, assignment_id):
 @login_required
 def submit_assignment(request, assignment_id):
     """Отправка задания студентом"""
-    assignment = get_object_or_404(Assignment, id=assignment_id)
+    assignment = get_object_or_404(Assignment.objects, id=assignment_id)
 
     # Только студент может отправлять задания
     try:
@@ -506,24 +656,85 @@ def submit_assignment(request, assignment_id):
 @login_required
 def assignment_submissions(request, assignment_id):
     """Список отправленных работ для задания"""
-    assignment = get_object_or_404(Assignment, id=assignment_id)
+    assignment = get_object_or_404(Assignment.objects, id=assignment_id)
 
     # Только преподаватель курса может просматривать отправки
     if not hasattr(request.user, 'professor') or assignment.class_obj.professor != request.user.professor:
         return HttpResponseForbidden("Доступ запрещен")
 
-    submissions = StudentSubmission.objects.filter(assignment=assignment).select_related('student')
+    submissions = StudentSubmission.objects.filter(assignment=assignment).select_related('student__user')
 
     return render(request, 'lms/assignment_submissions.html', {
         'assignment': assignment,
-        'submissions': submissions
+        'submissions': submissions,
+        'similar_count': SimilarityPair.objects.filter(assignment=assignment).count(),
+    })
+
+
+@login_required
+def assignment_autograder(request, assignment_id):
+    """Налаштування автоперевірки завдання та стан її черги"""
+    assignment = get_object_or_404(Assignment.objects, id=assignment_id)
+
+    if not hasattr(request.user, 'professor') or assignment.class_obj.professor_id != request.user.professor.id:
+        return HttpResponseForbidden("Доступ заборонено")
+
+    grader = AutoGrader.objects.filter(assignment=assignment).first()
+    submissions = StudentSubmission.objects.filter(assignment=assignment)
+
+    if request.method == 'POST' and 'regrade' in request.POST and grader:
+        queued = enqueue_submissions(submissions)
+        messages.success(request, f'Поставлено в чергу робіт: {queued}')
+        return redirect('assignment_autograder', assignment_id=assignment_id)
+
+    form = AutoGraderForm(request.POST or None, request.FILES or None, instance=grader)
+    if request.method == 'POST' and form.is_valid():
+        grader = form.save(commit=False)
+        grader.assignment = assignment
+        grader.save()
+        messages.success(request, 'Автоперевірку збережено')
+        return redirect('assignment_autograder', assignment_id=assignment_id)
+
+    jobs = GradingJob.objects.filter(submission__assignment=assignment)
+    return render(request, 'lms/assignment_autograder.html', {
+        'assignment': assignment,
+        'grader': grader,
+        'form': form,
+        'status_counts': dict(jobs.values_list('status').annotate(count=Count('id')).order_by()),
+        'recent_jobs': jobs.select_related('submission__student__user').order_by('-queued_at')[:20],
+    })
+
+
+@login_required
+@read_replica()
+def similarity_report(request, assignment_id):
+    """Звіт про схожі роботи завдання (пари рахує воркер detect_similarity)"""
+    assignment = get_object_or_404(Assignment.objects.select_related('class_obj__course'), id=assignment_id)
+
+    if not hasattr(request.user, 'professor') or assignment.class_obj.professor_id != request.user.professor.id:
+        return HttpResponseForbidden("Доступ заборонено")
+
+    pairs = SimilarityPair.objects.filter(assignment=assignment).select_related(
+        'submission__student__user', 'matched__student__user', 'matched__assignment__class_obj'
+    )
+    total = StudentSubmission.objects.filter(assignment=assignment).count()
+    fingerprints = SubmissionFingerprint.objects.filter(submission__assignment=assignment).aggregate(
+        done=Count('id'), unreadable=Count('id', filter=Q(shingle_count=0)),
+    )
+
+    return render(request, 'lms/similarity_report.html', {
+        'assignment': assignment,
+        'pairs': pairs,
+        'total': total,
+        'pending': total - fingerprints['done'],
+        'unreadable': fingerprints['unreadable'],
     })
 
 
 @login_required
 def grade_submission(request, submission_id):
     """Оценка отправленной работы"""
-    submission = get_object_or_404(StudentSubmission, id=submission_id)
+    submission = get_object_or_404(StudentSubmission.objects, id=submission_id)
 
     # Только преподаватель курса может оценивать работы
     if not hasattr(request.user, 'professor') or submission.assignment.class_obj.professor != request.user.professor:
@@ -534,6 +745,9 @@ def grade_submission(request, submission_id):
         if form.is_valid():
             graded_submission = form.save(commit=False)
             graded_submission.graded_at = timezone.now()
+            if 'grade' in form.changed_data:
+                # Оцінку виставлено вручну: попередня крива до неї не стосується
+                graded_submission.raw_grade = None
             graded_submission.save()
             return redirect('assignment_submissions', assignment_id=submission.assignment.id)
     else:
@@ -545,6 +759,88 @@ def grade_submission(request, submission_id):
     })
 
 
+REGISTRATION_MESSAGES = {
+    registration.ENROLLED: (messages.SUCCESS, 'Вас записано на заняття'),
+    registration.WAITLISTED: (messages.INFO, 'Місць немає: вас додано до черги'),
+    registration.ALREADY_ENROLLED: (messages.INFO, 'Ви вже записані на це заняття'),
+    registration.ALREADY_WAITLISTED: (messages.INFO, 'Ви вже в черзі на це заняття'),
+    registration.DROPPED: (messages.SUCCESS, 'Запис скасовано'),
+    registration.LEFT_WAITLIST: (messages.SUCCESS, 'Вас видалено з черги'),
+    registration.NOT_REGISTERED: (messages.WARNING, 'Ви не записані на це заняття'),
+    registration.CLOSED: (messages.ERROR, 'Реєстрацію на це заняття закрито'),
+}
+
+
+@login_required
+def class_registration(request):
+    """Самостійний запис студента на заняття з обмеженою кількістю місць"""
+    try:
+        student = request.user.student
+    except Student.DoesNotExist:
+        return HttpResponseForbidden("Доступ заборонено")
+
+    now = timezone.now()
+    enrolled_ids = set(Enrollment.objects.filter(student=student).values_list('class_enrolled_id', flat=True))
+    positions = registration.waitlist_positions(student)
+    classes = list(registration.open_classes(now))
+    for class_obj in classes:
+        class_obj.is_open = class_obj.is_registration_open(now)
+        class_obj.is_enrolled = class_obj.id in enrolled_ids
+        class_obj.waitlist_position = positions.get(class_obj.id)
+        class_obj.seats_left = (
+            None if class_obj.capacity is None else max(class_obj.capacity - class_obj.enrolled_count, 0)
+        )
+
+    return render(request, 'lms/class_registration.html', {'classes': classes})
+
+
+def _registration_action(request, class_id, action):
+    if request.method != 'POST':
+        return redirect('class_registration')
+    try:
+        student = request.user.student
+    except Student.DoesNotExist:
+        return HttpResponseForbidden("Доступ заборонено")
+    try:
+        outcome = action(student, class_id)
+    except Class.DoesNotExist:
+        raise Http404("Заняття не знайдено")
+    level, message = REGISTRATION_MESSAGES[outcome]
+    messages.add_message(request, level, message)
+    return redirect('class_registration')
+
+
+@login_required
+def register_for_class(request, class_id):
+    """Запис на заняття або в чергу"""
+    return _registration_action(request, class_id, registration.register)
+
+
+@login_required
+def drop_class(request, class_id):
+    """Скасування запису або вихід із черги"""
+    return _registration_action(request, class_id, registration.drop)
+
+
+@staff_member_required
+def query_cache_stats(request):
+    """Статистика кешу результатів запитів процесу, що обслужив запит"""
+    return JsonResponse({'pid': os.getpid(), **querycache.stats()})
+
+
+def course_catalog(request):
+    """Каталог курсів: фасетні фільтри з кількостями та пошук за початком коду чи назви"""
+    filters = catalog.parse_filters(request.GET)
+    courses, facets = catalog.catalog_page(filters, request.GET.get('page'))
+    return render(request, 'lms/course_catalog.html', {
+        'courses': courses,
+        'facets': facets,
+        'filters': filters,
+        'facets_key': catalog.cache_key(filters),
+        'page_range': courses.paginator.get_elided_page_range(courses.number),
+    })
+
+
 @login_required
 def student_courses(request):
     """Курсы студента"""
@@ -561,6 +857,31 @@ def student_courses(request):
 
 
 @login_required
+@read_replica()
+def student_transcript(request):
+    """Залікова книжка за архівовані семестри (лише перегляд)"""
+    try:
+        student = request.user.student
+    except Student.DoesNotExist:
+        return HttpResponseForbidden("Доступ заборонено")
+
+    enrollments = ArchivedEnrollment.objects.filter(student=student).select_related(
+        'semester', 'course'
+    ).prefetch_related('submissions').order_by('-semester__start_date', 'semester__name', 'course__code')
+
+    semesters = []
+    for semester, rows in groupby(enrollments, key=lambda enrollment: enrollment.semester):
+        rows = list(rows)
+        for row in rows:
+            row.percentage = row.points / row.max_points * 100 if row.points and row.max_points else 0
+            row.final_grade = row.grade or (calculate_final_grade(row.percentage) if row.points is not None else "Н/Д")
+        semesters.append({'semester': semester, 'enrollments': rows})
+
+    return render(request, 'lms/student_transcript.html', {'semesters': semesters})
+
+
+@login_required
+@read_replica()
 def student_assignments(request):
     """Задания студента"""
     try:
@@ -569,34 +890,32 @@ def student_assignments(request):
         return HttpResponseForbidden("Доступ запрещен")
 
     # Получаем классы студента
-    enrollments = Enrollment.objects.filter(student=student)
-    class_ids = [enrollment.class_enrolled.id for enrollment in enrollments]
+    class_ids = Enrollment.objects.filter(student=student).values_list('class_enrolled_id', flat=True)
 
     # Получаем задания для этих классов
     assignments = Assignment.objects.filter(class_obj_id__in=class_ids).select_related('class_obj__course')
 
-    # Получаем отправленные задания и создаем словарь для быстрого доступа
+    # Отправки студента с анотациями is_late/percentage/grade_class из БД
     submitted_assignments = StudentSubmission.objects.filter(
         student=student,
         assignment__in=assignments
-    ).select_related('assignment')
+    ).with_grade_stats()
 
     # Создаем словарь для быстрого доступа к отправкам по ID задания
-    submission_dict = {}
-    for submission in submitted_assignments:
-        submission_dict[submission.assignment_id] = submission
+    submission_dict = {submission.assignment_id: submission for submission in submitted_assignments}
 
     # Создаем список данных для отображения
     assignment_data = []
     for assignment in assignments:
         submission = submission_dict.get(assignment.id)
+        is_graded = submission is not None and submission.grade is not None
         assignment_data.append({
             'assignment': assignment,
             'submission': submission,
             'is_submitted': submission is not None,
-            'is_graded': submission and submission.grade is not None,
-            'grade_display': f"{submission.grade}/{assignment.max_points}" if submission and submission.grade else None,
-            'percentage': (submission.grade / assignment.max_points * 100) if submission and submission.grade else None,
+            'is_graded': is_graded,
+            'grade_display': f"{submission.grade}/{assignment.max_points}" if is_graded else None,
+            'percentage': submission.percentage if is_graded else None,
         })
 
     # Статистика
@@ -618,75 +937,62 @@ def student_assignments(request):
 
 
 @login_required
-def student_grades(request):
+@read_replica()
+async def student_grades(request):
     """Оцінки студента"""
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
+    student = await _aget_profile(request, Student)
+    if student is None:
         return HttpResponseForbidden("Доступ заборонено")
 
-    # Отримуємо всі відправлені роботи студента
+    # Отримуємо всі відправлені роботи студента з відсотками, обчисленими в БД
     submissions = StudentSubmission.objects.filter(student=student).select_related(
         'assignment__class_obj__course'
-    ).order_by('-submission_date')
-
-    # Розраховуємо статистику
-    total_submissions = submissions.count()
-    graded_submissions = submissions.exclude(grade__isnull=True)
-
-    if graded_submissions.exists():
-        average_grade = graded_submissions.aggregate(Avg('grade'))['grade__avg']
-        # Розраховуємо процент успішних робіт (оцінка >= 60%)
-        successful_submissions = graded_submissions.filter(
-            grade__gte=models.F('assignment__max_points') * 0.6
-        ).count()
-        success_rate = (successful_submissions / total_submissions * 100) if total_submissions > 0 else 0
-    else:
-        average_grade = 0
-        success_rate = 0
-
-    pending_grades = submissions.filter(grade__isnull=True).count()
-
-    # Розраховуємо процент для кожного submission
-    graded_submissions_list = []
-    for submission in submissions:
-        if submission.grade and submission.assignment.max_points:
-            percentage = (submission.grade / submission.assignment.max_points) * 100
-        else:
-            percentage = None
-
-        graded_submissions_list.append({
-            'submission': submission,
-            'percentage': percentage,
-            'grade_class': get_grade_class(percentage) if percentage else 'secondary'
-        })
+    ).with_grade_stats().order_by('-submission_date')
+
+    # Розраховуємо статистику одним агрегатним запитом
+    stats = await submissions.aaggregate(
+        total=Count('id'),
+        graded=Count('id', filter=Q(grade__isnull=False)),
+        average=Avg('grade'),
+        # Успішні роботи (оцінка >= 60%)
+        successful=Count('id', filter=Q(percentage__gte=60)),
+    )
+    total_submissions = stats['total']
+    average_grade = stats['average']
+    success_rate = (stats['successful'] / total_submissions * 100) if total_submissions > 0 else 0
+    pending_grades = total_submissions - stats['graded']
 
     # Отримуємо оцінки за курсами
-    course_grades = calculate_course_grades(student)
+    course_grades = await acalculate_course_grades(student)
 
     context = {
-        'submissions': graded_submissions_list,
+        'submissions': [submission async for submission in submissions],
         'course_grades': course_grades,
         'total_submissions': total_submissions,
         'average_grade': round(average_grade, 1) if average_grade else 0,
         'success_rate': round(success_rate, 1) if success_rate else 0,
         'pending_grades': pending_grades,
-        'graded_count': graded_submissions.count(),
+        'graded_count': stats['graded'],
     }
 
-    return render(request, 'lms/student_grades.html', context)
+    return await _arender(request, 'lms/student_grades.html', context)
 
 
-def calculate_course_grades(student):
+async def acalculate_course_grades(student):
     """Розраховує оцінки за курсами для студента"""
+    # Бали за оцінені роботи студента, згруповані за курсом, одним запитом
+    points_by_course = {
+        row['assignment__class_obj__course']: row async for row in
+        StudentSubmission.objects.filter(student=student, grade__isnull=False)
+        .values('assignment__class_obj__course')
+        .annotate(achieved_points=Sum('grade'), max_points_sum=Sum('assignment__max_points'))
+    }
+
     course_grades = []
 
     # Отримуємо всі курси студента
-    enrollments = Enrollment.objects.filter(student=student).select_related(
-        'class_enrolled__course'
-    )
-
-    for enrollment in enrollments:
+    async for enrollment in Enrollment.objects.filter(student=student).select_related(
+            'class_enrolled__course', 'class_enrolled__grade_curve'):
         course = enrollment.class_enrolled.course
 
         # Перевіряємо, чи є фінальна оцінка в Enrollment
@@ -695,28 +1001,11 @@ def calculate_course_grades(student):
             final_grade = enrollment.grade
             percentage = convert_grade_to_percentage(final_grade)
         else:
-            # Інакше розраховуємо на основі завдань
-            # Отримуємо всі завдання для цього курсу
-            assignments = Assignment.objects.filter(class_obj__course=course)
-
-            # Отримуємо всі роботи студента для цього курсу
-            course_submissions = StudentSubmission.objects.filter(
-                student=student,
-                assignment__in=assignments
-            )
-
-            # Розраховуємо середню оцінку
-            graded_submissions = course_submissions.exclude(grade__isnull=True)
-            if graded_submissions.exists():
-                max_points_sum = sum(sub.assignment.max_points for sub in graded_submissions)
-                achieved_points = sum(sub.grade for sub in graded_submissions)
-
-                if max_points_sum > 0:
-                    percentage = (achieved_points / max_points_sum) * 100
-                    final_grade = calculate_final_grade(percentage)
-                else:
-                    final_grade = "Н/Д"
-                    percentage = 0
+            # Інакше розраховуємо на основі оцінених завдань курсу
+            points = points_by_course.get(course.id)
+            if points and points['max_points_sum'] > 0:
+                percentage = (points['achieved_points'] / points['max_points_sum']) * 100
+                final_grade = calculate_final_grade(percentage, enrollment.class_enrolled.letter_cutoffs)
             else:
                 final_grade = "Н/Д"
                 percentage = 0
@@ -743,7 +1032,6 @@ def calculate_course_grades(student):
 
     return course_grades
 
-
 def convert_grade_to_percentage(grade):
     """Конвертує буквенну оцінку у відсоток для відображення"""
     grade_percentage_map = {
@@ -756,29 +1044,153 @@ def convert_grade_to_percentage(grade):
     return grade_percentage_map.get(grade, 0)
 
 
-def calculate_final_grade(percentage):
-    """Конвертує процент у буквенну оцінку"""
-    if percentage >= 90:
-        return "A"
-    elif percentage >= 80:
-        return "B"
-    elif percentage >= 70:
-        return "C"
-    elif percentage >= 60:
-        return "D"
-    else:
-        return "F"
+def calculate_final_grade(percentage, cutoffs=LETTER_CUTOFFS):
+    """Конвертує процент у буквенну оцінку за межами заняття (Class.letter_cutoffs)"""
+    return letter_grade(percentage, cutoffs)
 
 
 def get_grade_class(percentage):
     """Возвращает CSS класс для оценки на основе процента"""
-    if percentage >= 90:
-        return 'success'
-    elif percentage >= 80:
-        return 'primary'
-    elif percentage >= 70:
-        return 'info'
-    elif percentage >= 60:
-        return 'warning'
-    else:
-        return 'danger'
\ No newline at end of file
+    for threshold, css_class in GRADE_CLASS_THRESHOLDS:
+        if percentage >= threshold:
+            return css_class
+    return 'danger'
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def _astream_file(field_file):
+    """Читає файл частинами у фоновому потоці, не блокуючи цикл подій"""
+    file = await asyncio.to_thread(field_file.storage.open, field_file.name, 'rb')
+    try:
+        while chunk := await asyncio.to_thread(file.read, DOWNLOAD_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _afile_response(request, field_file):
+    """
+    Потокова відповідь з файлом. Під ASGI файл читається асинхронно, і повільний клієнт не займає
+    робочий потік; під WSGI асинхронний ітератор було б спершу зібрано в пам'ять, тож там - FileResponse
+    """
+    if not field_file:
+        raise Http404("Файл не знайдено")
+    filename = os.path.basename(field_file.name)
+    if not isinstance(request, ASGIRequest):
+        try:
+            file = await asyncio.to_thread(field_file.storage.open, field_file.name, 'rb')
+        except OSError:
+            raise Http404("Файл не знайдено")
+        return FileResponse(file, as_attachment=True, filename=filename)
+
+    try:
+        size = await asyncio.to_thread(field_file.storage.size, field_file.name)
+    except OSError:
+        raise Http404("Файл не знайдено")
+
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+    response = StreamingHttpResponse(_astream_file(field_file), content_type=content_type)
+    response['Content-Length'] = str(size)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+async def _acan_access_class(user, class_id):
+    """Доступ до файлів заняття: персонал, викладач заняття або записаний студент"""
+    if user.is_staff:
+        return True
+    return await Class.objects.filter(
+        Q(professor__user=user) | Q(enrollment__student__user=user), pk=class_id
+    ).aexists()
+
+
+@login_required
+async def download_material(request, material_id):
+    """Завантаження матеріалу курсу"""
+    material = await aget_object_or_404(CourseMaterial.objects, id=material_id)
+    if not await _acan_access_class(await request.auser(), material.class_obj_id):
+        return HttpResponseForbidden("Доступ запрещен")
+    return await _afile_response(request, material.file)
+
+
+@login_required
+async def download_assignment_file(request, assignment_id):
+    """Завантаження файлу завдання"""
+    assignment = await aget_object_or_404(Assignment.objects, id=assignment_id)
+    if not await _acan_access_class(await request.auser(), assignment.class_obj_id):
+        return HttpResponseForbidden("Доступ запрещен")
+    return await _afile_response(request, assignment.assignment_file)
+
+
+@login_required
+async def download_submission(request, submission_id):
+    """Завантаження роботи студента: автор роботи або викладач заняття"""
+    user = await request.auser()
+    submission = await aget_object_or_404(StudentSubmission.objects, id=submission_id)
+    if not user.is_staff and not await StudentSubmission.objects.filter(
+            Q(student__user=user) | Q(assignment__class_obj__professor__user=user), pk=submission.pk
+    ).aexists():
+        return HttpResponseForbidden("Доступ запрещен")
+    return await _afile_response(request, submission.file)
+
+
+def _submission_archive_entries(submissions, max_points):
+    """Файли робіт під іменами за student_id, а наприкінці - manifest.csv з відмітками про запізнення й оцінками"""
+    missing = set()
+    names = {}
+    for submission in submissions:
+        suffix = os.path.splitext(submission.file.name)[1].lower()
+        names[submission.pk] = re.sub(r'[^\w.-]', '_', submission.student.student_id) + suffix
+
+        def open_file(field_file=submission.file, pk=submission.pk):
+            try:
+                return field_file.storage.open(field_file.name, 'rb')
+            except OSError:
+                missing.add(pk)
+                raise
+
+        local_date = timezone.localtime(submission.submission_date)
+        yield names[submission.pk], local_date.timetuple()[:6], open_file
+
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(['student_id', 'last_name', 'first_name', 'file', 'submitted_at', 'late',
+                     'grade', 'max_points', 'graded_at'])
+    for submission in submissions:
+        writer.writerow([
+            submission.student.student_id,
+            submission.student.user.last_name,
+            submission.student.user.first_name,
+            '' if submission.pk in missing else names[submission.pk],
+            timezone.localtime(submission.submission_date).isoformat(timespec='minutes'),
+            int(submission.is_late),
+            '' if submission.grade is None else submission.grade,
+            max_points,
+            timezone.localtime(submission.graded_at).isoformat(timespec='minutes') if submission.graded_at else '',
+        ])
+    # BOM, щоб Excel відкрив кирилицю без майстра імпорту
+    yield 'manifest.csv', timezone.localtime().timetuple()[:6], manifest.getvalue().encode('utf-8-sig')
+
+
+@login_required
+async def download_all_submissions(request, assignment_id):
+    """Усі роботи завдання одним ZIP, що формується на льоту: пам'ять стала, тимчасового архіву немає"""
+    user = await request.auser()
+    assignment = await aget_object_or_404(Assignment.objects.select_related('class_obj__course'), id=assignment_id)
+    if not user.is_staff and not await Class.objects.filter(
+            pk=assignment.class_obj_id, professor__user=user).aexists():
+        return HttpResponseForbidden("Доступ заборонено")
+
+    submissions = [
+        submission async for submission in StudentSubmission.objects.filter(assignment=assignment)
+        .exclude(file='').select_related('student__user').with_is_late().order_by('student__student_id')
+    ]
+    entries = _submission_archive_entries(submissions, assignment.max_points)
+    # Під WSGI асинхронний ітератор було б спершу зібрано в список, тобто весь архів у пам'яті
+    chunks = aiter_zip(entries) if isinstance(request, ASGIRequest) else iter_zip(entries)
+    response = StreamingHttpResponse(chunks, content_type='application/zip')
+    filename = f'{assignment.class_obj.course.code}_{assignment.pk}_submissions.zip'
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
@@ -0,0 +1,70 @@
+import asyncio
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+# Уже стиснені формати пишуться без повторного стиснення: економія CPU без втрати розміру
+STORED_SUFFIXES = {'.zip', '.rar', '.7z', '.gz', '.pdf', '.docx', '.xlsx', '.pptx', '.odt', '.ods',
+                   '.jpg', '.jpeg', '.png', '.gif', '.mp4', '.mp3'}
+
+
+class _Sink:
+    """Приймач без seek(): zipfile пише розміри й CRC у дескриптор після даних кожного файлу"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_zip(entries):
+    """
+    Генерує ZIP-архів частинами, не тримаючи його ні в пам'яті, ні на диску.
+    entries - (ім'я в архіві, дата (рік, місяць, день, год, хв, с), відкривач файлу або bytes);
+    відкривач, що кидає OSError, пропускає файл.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w') as archive:
+        for name, date_time, source in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            suffix = name[name.rfind('.'):].lower() if '.' in name else ''
+            info.compress_type = zipfile.ZIP_STORED if suffix in STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            if isinstance(source, bytes):
+                archive.writestr(info, source)
+            else:
+                try:
+                    file = source()
+                except OSError:
+                    continue
+                # force_zip64: розмір наперед невідомий, а файли можуть перевищувати 4 ГБ
+                with file, archive.open(info, 'w', force_zip64=True) as target:
+                    while chunk := file.read(CHUNK_SIZE):
+                        target.write(chunk)
+                        if data := sink.drain():
+                            yield data
+            if data := sink.drain():
+                yield data
+    # Центральний каталог записується при закритті архіву
+    if data := sink.drain():
+        yield data
+
+
+async def aiter_zip(entries):
+    """Асинхронна обгортка: читання й стиснення кожної частини - у фоновому потоці"""
+    chunks = iter_zip(entries)
+    while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+        yield chunk
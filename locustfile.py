@@ -0,0 +1,68 @@
+"""
+Навантажувальний сценарій Locust для LMS.
+
+Облікові записи створює команда populate_db. Приклад запуску:
+    locust -f locustfile.py --host http://127.0.0.1:8000
+"""
+import random
+import re
+
+from locust import HttpUser, between, task
+
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class LmsUser(HttpUser):
+    abstract = True
+    wait_time = between(1, 3)
+    usernames = []
+    password = ''
+
+    def on_start(self):
+        response = self.client.get('/login/')
+        token = CSRF_RE.search(response.text).group(1)
+        self.client.post('/login/', {
+            'username': random.choice(self.usernames),
+            'password': self.password,
+            'csrfmiddlewaretoken': token,
+        }, headers={'Referer': self.host + '/login/'})
+
+
+class StudentUser(LmsUser):
+    weight = 4
+    usernames = ['student1', 'student2', 'student3', 'student4']
+    password = 'student123'
+
+    @task(4)
+    def dashboard(self):
+        self.client.get('/student/dashboard/')
+
+    @task(3)
+    def assignments(self):
+        self.client.get('/student/assignments/')
+
+    @task(3)
+    def grades(self):
+        self.client.get('/student/grades/')
+
+    @task(2)
+    def assignment_feed(self):
+        self.client.get('/student/assignments/feed/')
+
+    @task(2)
+    def courses(self):
+        self.client.get('/student/courses/')
+
+
+class ProfessorUser(LmsUser):
+    weight = 1
+    usernames = ['professor1', 'professor2', 'professor3']
+    password = 'professor123'
+
+    @task(3)
+    def dashboard(self):
+        self.client.get('/professor/dashboard/')
+
+    @task(2)
+    def grades(self):
+        self.client.get('/professor/grades/')
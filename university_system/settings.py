@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+
+from django.core.exceptions import ImproperlyConfigured
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,10 +24,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-9r7!gx^b-5r0me^4z%_!5r03#psq0d_zf+@(k6$f4d^s0n&6th'
 
+# Профіль розгортання: LMS_PRODUCTION=1 вимикає DEBUG і вмикає хешовану статику
+# (перед запуском: python manage.py collectstatic)
+PRODUCTION = os.environ.get('LMS_PRODUCTION') == '1'
+
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+if PRODUCTION:
+    # Без явного списку хостів Django довіряв би будь-якому заголовку Host (підміна посилань у листах)
+    if not os.environ.get('LMS_ALLOWED_HOSTS'):
+        raise ImproperlyConfigured('LMS_PRODUCTION=1 потребує LMS_ALLOWED_HOSTS, напр. lms.example.edu')
+    ALLOWED_HOSTS = os.environ['LMS_ALLOWED_HOSTS'].split(',')
+else:
+    ALLOWED_HOSTS = []
 
 
 # Application definition
@@ -41,13 +53,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'lms.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'lms.sessions.LazySessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'lms.db_routing.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'university_system.urls'
@@ -62,7 +77,10 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'lms.context_processors.request_now',
+                'lms.context_processors.push_notifications',
             ],
+            # loaders не задано: з Django 4.1 шаблони й так кешує cached.Loader (з DEBUG - з перевіркою змін)
         },
     },
 ]
@@ -73,12 +91,159 @@ WSGI_APPLICATION = 'university_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Профіль БД задається змінними оточення:
+#   LMS_DB_ENGINE=sqlite (за замовчуванням) або postgres
+DB_ENGINE = os.environ.get('LMS_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgres':
+    # Вбудований пул з'єднань Django 5.1+ (psycopg 3) несумісний з CONN_MAX_AGE,
+    # тому постійні з'єднання використовуються лише з вимкненим пулом
+    DB_POOL = os.environ.get('LMS_DB_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'university_system'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('LMS_DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('LMS_DB_POOL_MIN', '2')),
+                    'max_size': int(os.environ.get('LMS_DB_POOL_MAX', '20')),
+                    'timeout': 10,
+                },
+            } if DB_POOL else {},
+        }
+    }
+    SQLITE_PRAGMAS = {}
+    if os.environ.get('POSTGRES_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['POSTGRES_REPLICA_HOST'],
+            'PORT': os.environ.get('POSTGRES_REPLICA_PORT', DATABASES['default']['PORT']),
+        }
+else:
+    # Налаштований режим SQLite (LMS_SQLITE_TUNED=0 вимикає): WAL дозволяє читати
+    # під час запису, а IMMEDIATE-транзакції чекають на блокування замість помилки
+    SQLITE_TUNED = os.environ.get('LMS_SQLITE_TUNED', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('LMS_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            } if SQLITE_TUNED else {},
+        }
+    }
+    # Застосовуються до кожного нового з'єднання (lms.signals.tune_sqlite_connection)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+        'mmap_size': 134217728,  # 128 МБ
+        'cache_size': -20000,  # ~20 МБ (від'ємне значення - у кілобайтах)
+        'temp_store': 'MEMORY',
+    } if SQLITE_TUNED else {}
+    # Локальна репліка: копія основного файлу, яку оновлює команда sync_replica
+    if os.environ.get('LMS_SQLITE_REPLICA_PATH'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'NAME': os.environ['LMS_SQLITE_REPLICA_PATH'],
+        }
+
+if 'replica' in DATABASES:
+    # У тестах репліка - це та сама БД
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Читання зі звітних представлень ідуть на репліку (lms.db_routing.read_replica)
+DATABASE_ROUTERS = ['lms.db_routing.ReplicaRouter']
+# Скільки секунд після запису користувач читає лише з основної БД
+REPLICA_STICKY_SECONDS = int(os.environ.get('LMS_REPLICA_STICKY_SECONDS', '5'))
+
+
+# Кеш (сесії, стрічки завдань). Для кількох процесів потрібен спільний Redis: LMS_REDIS_URL
+if os.environ.get('LMS_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['LMS_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
+
+# Кеш результатів запитів у пам'яті кожного процесу (QuerySet.cached(), lms.querycache).
+# Покоління таблиць зберігаються в CACHES: лише зі спільним Redis зміна в одному процесі (воркері чи
+# команді manage.py) скидає кеш усіх. LocMemCache у кожного процесу свій, а записи LRU не мають TTL,
+# тож без LMS_REDIS_URL кеш за замовчуванням вимкнено
+QUERY_CACHE_MODELS = [
+    'lms.Faculty', 'lms.Department', 'lms.Course', 'lms.Class', 'lms.CourseMaterial', 'lms.Assignment',
+    # Менеджери за замовчуванням приєднують семестр для фільтра активних
+    'lms.Semester',
+]
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get(  # 0 вимикає кеш
+    'LMS_QUERY_CACHE_MAX_ENTRIES', '2000' if os.environ.get('LMS_REDIS_URL') else '0'))
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('LMS_QUERY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Профілювання запитів (lms.profiling.ProfilingMiddleware, python manage.py dump_profiles). Профілюється
+# кожен PROFILING_SAMPLE_RATE-й запит (0 - лише запити з підписаним заголовком X-Profile)
+PROFILING_ENABLED = os.environ.get('LMS_PROFILING') == '1'
+PROFILING_SAMPLE_RATE = int(os.environ.get('LMS_PROFILING_SAMPLE_RATE', '0'))
+PROFILING_MODE = os.environ.get('LMS_PROFILING_MODE', 'stack')  # stack - семплер стеків, cprofile - cProfile
+PROFILING_INTERVAL = 0.005  # секунд між знімками стеків
+PROFILING_DIR = os.environ.get('LMS_PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_FLUSH_INTERVAL = 10  # секунд між записами зведених профілів процесу на диск
+PROFILING_TOKEN_MAX_AGE = 24 * 60 * 60
+
+# Push-сповіщення (SSE, потрібен ASGI-сервер). Без Redis брокер працює в межах одного процесу
+NOTIFICATION_REDIS_URL = os.environ.get('LMS_REDIS_URL')
+NOTIFICATION_BROKER = os.environ.get(
+    'LMS_NOTIFICATION_BROKER',
+    'lms.notifications.RedisBroker' if NOTIFICATION_REDIS_URL else 'lms.notifications.InProcessBroker',
+)
+NOTIFICATION_HEARTBEAT = 15  # секунд між keepalive-коментарями
+NOTIFICATION_STREAM_LIFETIME = 10 * 60  # після цього браузер перепідключається
+
+# Дайджести сповіщень (python manage.py send_digests)
+SITE_URL = os.environ.get('LMS_SITE_URL', 'http://127.0.0.1:8000')
+EMAIL_BACKEND = os.environ.get('LMS_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('LMS_DEFAULT_FROM_EMAIL', 'lms@university.local')
+TELEGRAM_BOT_TOKEN = os.environ.get('LMS_TELEGRAM_BOT_TOKEN', '')
+TELEGRAM_TRANSPORT = 'lms.digest.BotApiTransport'
+TELEGRAM_RATE_LIMIT = 30  # повідомлень на секунду
+NOTIFICATION_CHANNELS = ['lms.digest.EmailChannel']
+if TELEGRAM_BOT_TOKEN:
+    NOTIFICATION_CHANNELS.append('lms.digest.TelegramChannel')
+# Не частіше одного дайджесту на користувача за цей час (секунд); події між ними накопичуються
+DIGEST_MIN_INTERVAL = int(os.environ.get('LMS_DIGEST_MIN_INTERVAL', str(15 * 60)))
+
+# Пошук схожих робіт (python manage.py detect_similarity)
+SIMILARITY_THRESHOLD = float(os.environ.get('LMS_SIMILARITY_THRESHOLD', '0.5'))  # оцінка коефіцієнта Жаккара
+# Порівнювати також з роботами того самого завдання курсу в інших семестрах
+SIMILARITY_ACROSS_SEMESTERS = os.environ.get('LMS_SIMILARITY_ACROSS_SEMESTERS') == '1'
+
+# Автоперевірка (python manage.py autograde). Без змінної - bwrap (окремі простори імен, uid nobody,
+# файлова система лише для читання); власна обгортка, напр. "nsjail -Mo --quiet --", має дати не меншу
+# ізоляцію. Без жодної пісочниці воркер не запускається
+AUTOGRADER_SANDBOX = os.environ.get('LMS_AUTOGRADER_SANDBOX')
+
+# Складання розкладу (python manage.py solve_timetable): сітка слотів - дні тижня × пари
+TIMETABLE_DAYS = os.environ.get('LMS_TIMETABLE_DAYS', 'MON,TUE,WED,THU,FRI').split(',')
+TIMETABLE_PERIODS = [
+    ('08:30', '09:50'), ('10:05', '11:25'), ('11:55', '13:15'),
+    ('13:25', '14:45'), ('14:55', '16:15'), ('16:25', '17:45'),
+]
+# Обмеження часу (секунд) на всю дію адмінки: пошук займає CPU воркера просто під час HTTP-запиту,
+# тож ліміт малий - дія для кількох занять. Повний семестр - команда з --time-limit
+TIMETABLE_ADMIN_TIME_LIMIT = float(os.environ.get('LMS_TIMETABLE_ADMIN_TIME_LIMIT', '3'))
 
 
 # Password validation
@@ -116,6 +281,17 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+if PRODUCTION:
+    # Імена файлів містять хеш вмісту, тож браузер може кешувати їх назавжди
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    }
+
+# Віддавати статику через Django (lms.assets.serve_static), якщо перед ним немає nginx
+SERVE_STATIC = os.environ.get('LMS_SERVE_STATIC') == '1'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -133,4 +309,9 @@ LOGOUT_REDIRECT_URL = '/'  # после выхода перенаправлят
 
 # Настройки сессии (опционально, но рекомендуется)
 SESSION_COOKIE_AGE = 1209600  # 2 недели в секундах
-SESSION_SAVE_EVERY_REQUEST = True  # обновление времени сессии при каждом запросе
\ No newline at end of file
+# Сесії читаються з кешу, а в БД пишуться лише при зміні (cached_db).
+# Ковзний термін дії продовжує lms.sessions.LazySessionRefreshMiddleware: не на кожен
+# запит, а коли до закінчення лишається менше SESSION_REFRESH_THRESHOLD (не частіше разу на добу)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = SESSION_COOKIE_AGE - 24 * 60 * 60
\ No newline at end of file